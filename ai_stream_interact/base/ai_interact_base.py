@@ -1,24 +1,41 @@
 import os
 import re
+import json
+import math
 import time
 import queue
-import inspect
+import itertools
+import functools
 import threading
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from types import GeneratorType
-from typing import Callable, Union, Tuple, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Union, Tuple, List, Dict
 
-from PIL import Image
 from rich import print
 from rich.panel import Panel
+from rich.table import Table
+from rich.console import Group
 from rich.prompt import Prompt
 from rich.console import Console
 from rich.markdown import Markdown
-from pynput import keyboard
-from dotenv import load_dotenv
+import numpy as np
 
 from ai_stream_interact.streamer import Streamer
+from ai_stream_interact.multi_streamer import MultiStreamer, _parse_cam_indexes
+from ai_stream_interact.sources import SourceConfig, open_source
+from ai_stream_interact.pipeline import DetectPipeline, PipelineConfig
 from ai_stream_interact.utils import img_utils
+from ai_stream_interact.utils.frame_selection import _select_frames
+from ai_stream_interact.utils.scene_change import AutoDetectConfig, SceneChangeDetector
+from ai_stream_interact.utils.response_cache import ResponseCache, ResponseCacheConfig
+from ai_stream_interact.utils.single_flight import SingleFlight, SingleFlightConfig
+from ai_stream_interact.utils.session_log import SessionRecorder
+from ai_stream_interact.utils.shared_frames import FrameEncoderPool, FrameRef, _release_refs
+from ai_stream_interact.utils.prefilter import LocalPrefilter, PrefilterConfig, PrefilterResult
+from ai_stream_interact.utils.detect_parser import DetectResponseParser, FieldEvent
+from ai_stream_interact.utils.metrics import metrics
+from ai_stream_interact.utils.rate_limiter import CancelToken, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
 
 
 # Styles
@@ -28,24 +45,67 @@ STYLE_USER_PROMPT = "bold #6765e6"
 STYLE_SUCCESS_MESSAGES = "bold green"
 STYLE_WARNING_MESSAGES = "bold red"
 
+# How detects are built when streaming from several cameras
+MULTI_CAMERA_MULTIVIEW = "multiview"  # a single detect with every camera
+MULTI_CAMERA_FANOUT = "fanout"  # one detect per camera, run concurrently
+MULTI_VIEW_PROMPT = (
+    "The images below come from {ncameras} cameras looking at the same scene at the same moments. "
+    "Each camera's images follow its label, use all views together to answer."
+)
+
+# How detects show the stream in clip mode
+CLIP_MODE_MOSAIC = "mosaic"  # a single contact sheet image of the clip's frames
+CLIP_MODE_VIDEO = "video"  # a short video clip
+CLIP_PROMPTS = {
+    CLIP_MODE_MOSAIC: (
+        "Each image below is a contact sheet of {nframes} frames evenly spaced over the last {duration:g} seconds of video, "
+        "in time order from left to right & top to bottom."
+    ),
+    CLIP_MODE_VIDEO: "Each video below shows the last {duration:g} seconds of the stream ({nframes} frames).",
+}
+CLIP_DELTA_PROMPT = " Tiles after the first only show what changed since the previous frame, unchanged areas are gray."
+
 
 @dataclass
 class InteractionFramesConfig:
     nframes_interact: str  # number of video frames to use for ai interaction
     frame_capture_interval: float  # n seconds to sleep between capturing frames
-
-
-def interact_on_key(key: str) -> Callable:
-    """Do action on key press"""
+    img_format: str = "jpeg"  # jpeg, png or webp
+    img_quality: int = 90  # 0-100, compression effort for png
+    max_edge: int = None  # max longest edge in pixels
+    crop: Union[str, Tuple[int, int, int, int]] = None  # "center" or (x, y, width, height)
+    frame_selection_window: float = None  # n seconds to pick the best frames from
+    frame_selection_candidates: int = 24  # max frames of the window that are scored
+    frame_diversity_weight: float = 0.5  # sharpness (0) to variety (1)
+    encoder_processes: int = 0  # encode frames out of shared memory
+    clip_mode: str = None  # CLIP_MODE_MOSAIC or CLIP_MODE_VIDEO
+    clip_duration: float = 3.0  # n seconds of stream history in a clip
+    clip_frames: int = 9  # frames sampled evenly over the clip duration
+    clip_max_edge: int = 1024
+    clip_delta: bool = False  # mosaic tiles only keep changed pixels
+    clip_video_format: str = "webm"  # video clip encoding, webm (vp8) or mp4 (mp4v)
+
+
+def interact_on_key(key: str, prompts_user: bool = False) -> Callable:
+    """Do action on key press. Handlers that prompt the user block until answered thus run on their own thread, not the handler pool."""
     def on_key_press(func: Callable) -> Callable:
-        def wrapper(self, key_pressed: str) -> None:
-            """on_press_function"""
-            if hasattr(key_pressed, 'char') and key_pressed.char == (key):
-                func(self)
-        return wrapper
+        func._interact_key = key
+        func._prompts_user = prompts_user
+        return func
     return on_key_press
 
 
+def _collect_key_handlers(cls: type) -> Dict[str, str]:
+    """Maps each key to the name of the method decorated with interact_on_key for it, child classes taking precedence."""
+    key_handlers = {}
+    for klass in reversed(cls.__mro__):
+        for name, member in vars(klass).items():
+            key = getattr(member, "_interact_key", None)
+            if key is not None:
+                key_handlers[key] = name
+    return key_handlers
+
+
 class AIStreamInteractBase:
     """Base class for Model Interactions. The class implements the basis for the cli menu and model interactions
     The below methods are to be implemented in child classes per each model's API:
@@ -53,12 +113,27 @@ class AIStreamInteractBase:
         - _ai_interact: should implement the most basic interaction for a given model where it takes a prompt input (and potentially other **kwargs for model configs) and returns the model's repsponse.
         - _ai_interactive_mode: Same as the base _ai_interact but should keep track of chat history.
         - _ai_detect_object: should implement a function that does object detection in an image and returns either a string or a Generator (for streaming models).
+        - _repair_detect_output (optional): should rewrite a detect response that doesn't follow the detect format, e.g. with a cheap text only call.
     """
 
+    _requires_api_key = True  # False for local backends, skips the api key prompt
+    _records_history = True  # False when routed, the router records the winning backend's turns
+
     def __init__(
         self,
         interaction_frames_config: InteractionFramesConfig,
-        tts_model_name: str
+        tts_model_name: str,
+        pipeline_config: PipelineConfig = None,
+        auto_detect_config: AutoDetectConfig = None,
+        response_cache_config: ResponseCacheConfig = None,
+        use_response_cache: bool = True,
+        single_flight_config: SingleFlightConfig = None,
+        use_single_flight: bool = True,
+        multi_camera_mode: str = MULTI_CAMERA_MULTIVIEW,
+        source_config: SourceConfig = None,
+        prefilter_config: PrefilterConfig = None,
+        max_detect_repairs: int = 1,
+        record_session: str = None
     ) -> None:
         self._console_interface = Console(style=STYLE_INTERFACE)
         self._console_model_output = Console(style=STYLE_MODEL_OUTPUT)
@@ -66,13 +141,36 @@ class AIStreamInteractBase:
         self._console_success = Console(style=STYLE_SUCCESS_MESSAGES)
         self._console_warning = Console(style=STYLE_WARNING_MESSAGES)
         self._interaction_frames_config = interaction_frames_config
-        self._key_listeners = []
+        self._pipeline_config = pipeline_config
+        self._auto_detect_config = auto_detect_config or AutoDetectConfig()
+        self._auto_detect_running = False
+        self._source_ended = threading.Event()  # a headless source ran out, start returns & the app shuts down normally
+        self._multi_camera_mode = multi_camera_mode
+        self._source_config = source_config or SourceConfig()
+        self._prefilter = LocalPrefilter(prefilter_config) if prefilter_config else None
+        self._max_detect_repairs = max_detect_repairs
+        self._detection_listeners: List[Callable[[FieldEvent], None]] = []
+        self._response_cache = ResponseCache(response_cache_config) if use_response_cache else None
+        self._single_flight = SingleFlight(single_flight_config) if use_single_flight else None
+        self._encoder_pool = None
+        self._session_recorder = None
+        if record_session:  # every detect's frames, prompt & streamed response are logged there for replays
+            self._session_recorder = SessionRecorder(record_session, config={
+                "backend": type(self).__module__,
+                "interaction_frames": asdict(interaction_frames_config),
+                "multi_camera_mode": multi_camera_mode
+            })
+        self._key_listener = None
+        self._key_handling_enabled = False
+        self._key_handler_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="key-handler")
+        self._key_prompt_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="key-prompt")  # one prompt at a time
         self._api_key_dot_env_name = "GEMINI_API_KEY"
+        self._tts_ready = threading.Event()
         if tts_model_name:
-            from ai_stream_interact.tts.coqui_ai import TextToSpeechCoqui  # import here only if using tts as it's a bit of a slow import
-            self._tts = TextToSpeechCoqui(tts_model_name)
             self._running_with_speech_synthesis = True
             self._speech_synthesis_queue = queue.Queue()
+            # the tts model takes a while to load thus it's warmed up in the background while the user goes through the menus
+            threading.Thread(target=self._load_tts, args=(tts_model_name,), daemon=True).start()
         else:
             self._running_with_speech_synthesis = False
 
@@ -92,22 +190,145 @@ class AIStreamInteractBase:
         """To be implemented per model."""
         raise NotImplementedError()
 
+    def _repair_detect_output(self, raw_output: str) -> str:
+        """To be implemented per model (optional)."""
+        raise NotImplementedError()
+
+    def add_detection_listener(self, listener: Callable[[FieldEvent], None]) -> None:
+        """Calls listener with each field of every detect result (label, description, confidence) as soon as it's parsed."""
+        self._detection_listeners.append(listener)
+
+    def _dispatch_detection_event(self, event: FieldEvent) -> None:
+        for listener in self._detection_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                self._console_warning.print(f"Detection listener failed: {e!r}")
+
+    def _new_detect_parser(self, custom_base_prompt: str = None) -> DetectResponseParser:
+        """Parser for a detect's streamed output, None for custom prompts as their output is free form."""
+        if custom_base_prompt:
+            return None
+        return DetectResponseParser(
+            on_event=self._dispatch_detection_event,
+            repair=self._repair_detect_output,
+            max_repairs=self._max_detect_repairs
+        )
+
+    def _request_key(self, images: List[Union[img_utils.EncodedImage, str]], custom_base_prompt: str = None) -> str:
+        """Response cache & single flight key of a detect apart from its frames: backend, config, prompt & text parts."""
+        models_config = getattr(self, "_models_config", None)
+        return "\n".join([
+            type(self).__module__,
+            json.dumps(asdict(self._interaction_frames_config), sort_keys=True),
+            json.dumps(asdict(models_config), sort_keys=True) if models_config is not None else "",
+            custom_base_prompt or "",
+            *(part for part in images if isinstance(part, str))
+        ])
+
+    def _ai_detect_object_cached(
+        self,
+        images: List[img_utils.EncodedImage],
+        custom_base_prompt: str = None,
+        frame_hashes: List[int] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        supersede: bool = False
+    ) -> GeneratorType:
+        """Same as _ai_detect_object but served from the response cache or a concurrent identical call when possible."""
+        request_key = self._request_key(images, custom_base_prompt)
+        on_complete = None
+        if self._response_cache is not None and frame_hashes is not None:
+            cached_chunks = self._response_cache.get(request_key, frame_hashes)
+            if cached_chunks is not None:
+                metrics.inc("response_cache_hits_total")
+                yield from cached_chunks
+                return
+            on_complete = functools.partial(self._response_cache.put, request_key, frame_hashes)
+
+        def call(cancel_token: CancelToken = None) -> GeneratorType:
+            return metrics.timed_stream(self._ai_detect_object(images, custom_base_prompt, priority, cancel_token), "model_detect")
+
+        if self._single_flight is not None and frame_hashes is not None:
+            yield from self._single_flight.stream(request_key, frame_hashes, call, supersede, on_complete)
+            return
+        chunks = []
+        for chunk in call():
+            chunks.append(chunk)
+            yield chunk
+        if on_complete is not None:
+            on_complete(chunks)
+
+    def _prefilter_frames(self, frames: List[np.ndarray]) -> PrefilterResult:
+        """Runs the local prefilter on the prompt frames (None if it's off)."""
+        if self._prefilter is None:
+            return None
+        return self._prefilter.check(frames)
+
+    def _ai_detect_object_prefiltered(
+        self,
+        images: List[img_utils.EncodedImage],
+        custom_base_prompt: str = None,
+        frame_hashes: List[int] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        prefilter_result: PrefilterResult = None,
+        supersede: bool = False
+    ) -> GeneratorType:
+        """Same as _ai_detect_object_cached but answered locally when the prefilter is confident."""
+        if prefilter_result is not None:
+            if prefilter_result.answer is not None and not custom_base_prompt:
+                metrics.inc("prefilter_total", outcome="local")
+                yield prefilter_result.answer
+                return
+            if prefilter_result.hints is not None:
+                metrics.inc("prefilter_total", outcome="hinted")
+                images = [prefilter_result.hints, *images]
+            else:
+                metrics.inc("prefilter_total", outcome="cloud")
+        yield from self._ai_detect_object_cached(images, custom_base_prompt, frame_hashes, priority, supersede)
+
+    def _hash_prompt_frames(self, frames: List[np.ndarray]) -> List[int]:
+        """Perceptual hashes of the prompt frames used as the response cache & single flight key (None if both are off)."""
+        if self._response_cache is None and self._single_flight is None:
+            return None
+        return [img_utils._phash(frame) for frame in frames]
+
     def start(self) -> None:
         self._entry_point_interact()
-        self._get_api_key()
-        self._ai_auth(self.__api_key)
+        self._authenticate()
         self.streamer, self._cam_index = self._init_streamer()
+        if self._interaction_frames_config.encoder_processes:
+            self._encoder_pool = FrameEncoderPool(self._interaction_frames_config.encoder_processes)
+            streamers = self.streamer.streamers.values() if isinstance(self.streamer, MultiStreamer) else [self.streamer]
+            self._encoder_pool.warm_up([streamer._frames for streamer in streamers])
+        self._detect_pipeline = DetectPipeline(self, self._pipeline_config)
+        self._detect_pipeline.start()
         if self._running_with_speech_synthesis:
-            threading.Thread(
-                target=self._tts.tts_from_queue,
-                kwargs={"queue": self._speech_synthesis_queue},
-                daemon=True
-            ).start()
+            threading.Thread(target=self._run_tts, daemon=True).start()
             self._console_interface.print("Running with model speech synthesis...")
         else:
             self._console_interface.print("No TTS model instance passed thus running in text mode only...")
         self._choose_mode()
+        if self._source_config.headless:
+            self._source_ended.wait()
+            self._close()
+
+    def _load_tts(self, tts_model_name: str) -> None:
+        """Loads the tts model & flags it as ready, speech synthesis is turned off if it fails to load."""
+        try:
+            from ai_stream_interact.tts.coqui_ai import TextToSpeechCoqui  # import here only if using tts as it's a bit of a slow import
+            self._tts = TextToSpeechCoqui(tts_model_name)
+        except Exception as e:
+            self._running_with_speech_synthesis = False
+            self._console_warning.print(f"Unable to load TTS model {tts_model_name}, running in text mode only: {e!r}")
+            return
+        self._tts_ready.set()
 
+    def _run_tts(self) -> None:
+        """Speaks queued model outputs once the tts model is ready, outputs from before that are kept in the queue."""
+        self._tts_ready.wait()
+        self._tts.tts_from_queue(queue=self._speech_synthesis_queue)
+
+    @metrics.timed("present")
     def _present_model_output(self, output: Union[GeneratorType, list, str]) -> None:
         """Presents model output. If running in text mode + TTS will also do speech synthesis out of model generated text."""
         assert isinstance(output, (GeneratorType, list, str)), "output should be of type stror Generator"
@@ -117,12 +338,34 @@ class AIStreamInteractBase:
             self._console_model_output.print(out)
             if self._running_with_speech_synthesis:
                 self._speech_synthesis_queue.put(out)
+        if self._running_with_speech_synthesis:
+            self._speech_synthesis_queue.put(None)  # end of this output so its last partial sentence is spoken right away
 
     @interact_on_key("d")
     def ai_detect_object_mode(self) -> None:
-        images = self._get_prompt_imgs_from_stream()
-        output = self._ai_detect_object(images, self.custom_base_prompt)
-        self._present_model_output(output)
+        """Hands the detect off to the detect pipeline so the key listener is never blocked on the model."""
+        self._submit_detect()
+
+    def _submit_detect(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Submits a detect on the current stream, one per camera in fan-out mode."""
+        if not isinstance(self.streamer, MultiStreamer):
+            frames = self._get_prompt_frame_refs_from_stream() or self._get_prompt_frames_from_stream()
+            self._detect_pipeline.submit(frames, self.custom_base_prompt, priority)
+            return
+        use_refs = self._encoder_pool is not None and not self._interaction_frames_config.clip_mode
+        get_synchronized = self.streamer.get_synchronized_refs if use_refs else self.streamer.get_synchronized_frames
+        frames_by_camera = get_synchronized(*self._prompt_frame_spacing())
+        if self._multi_camera_mode == MULTI_CAMERA_FANOUT:
+            for camera, frames in frames_by_camera.items():
+                self._detect_pipeline.submit(frames, self.custom_base_prompt, priority, views=[camera] * len(frames))
+            return
+        frames = [frame for camera_frames in frames_by_camera.values() for frame in camera_frames]
+        views = [camera for camera, camera_frames in frames_by_camera.items() for _ in camera_frames]
+        capture = ", ".join(
+            f"{camera}: {camera_stats['fps']:.1f}fps {camera_stats['dropped_frames']} dropped" for camera, camera_stats in self.streamer.metrics().items()
+        )
+        print(f"{len(frames)} frames loaded from {len(frames_by_camera)} cameras ({capture})...")
+        self._detect_pipeline.submit(frames, self.custom_base_prompt, priority, views=views)
 
     def ai_interactive_mode(self) -> None:
         while True:
@@ -130,22 +373,65 @@ class AIStreamInteractBase:
             prompt = Prompt.ask("Prompt", console=self._console_user_prompt)
             if prompt == "exit":
                 break
-            output = self._ai_interactive_mode(prompt)
+            output = metrics.timed_stream(self._ai_interactive_mode(prompt), "model_chat")
             self._present_model_output(output)
         self._choose_mode()
 
-    @interact_on_key("c")
+    @interact_on_key("c", prompts_user=True)
     def ai_custom_prompt_detect_object_mode(self) -> None:
         self._stop_key_listeners()
         self.custom_base_prompt = Prompt.ask("Custom Prompt", console=self._console_user_prompt)
         self._start_key_listeners()
 
-    @interact_on_key("i")
+    def ai_auto_detect_mode(self) -> None:
+        """Unattended detection, fires a detect whenever the scene meaningfully changes & then settles for the configured dwell time."""
+        detector = SceneChangeDetector(self._auto_detect_config)
+        last_frame_id = None
+        while self._auto_detect_running and not self.streamer._video_stream_is_stopped:
+            latest = self.streamer.get_latest_frame()
+            if latest is not None and latest.frame_id != last_frame_id:
+                last_frame_id = latest.frame_id
+                if detector.update(latest.frame, latest.timestamp):
+                    self._console_interface.print("Scene changed, detecting...")
+                    self._submit_detect(priority=PRIORITY_BACKGROUND)
+            time.sleep(self._auto_detect_config.poll_interval)
+        if self._auto_detect_running:  # the stream ended by itself e.g. a video file ran out
+            self._console_interface.print("Video source ended, waiting for pending detects...")
+            self._detect_pipeline.drain()
+            if self._source_config.headless:
+                self._source_ended.set()
+
+    @interact_on_key("s")
+    def show_metrics_summary(self) -> None:
+        """Prints a panel of the latency percentiles & counters recorded so far."""
+        snapshot = metrics.snapshot()
+        latencies = Table("span", "labels", "count", "p50", "p95", "p99", "max", title="Latencies (seconds)", title_justify="left")
+        for name, series in snapshot["histograms"].items():
+            for s in series:
+                labels = ", ".join(f"{key}={value}" for key, value in s["labels"].items())
+                latencies.add_row(
+                    name.removesuffix("_seconds"), labels, str(s["count"]), *(f"{s[key]:.3f}" for key in ("p50", "p95", "p99", "max"))
+                )
+        counters = Table("counter", "labels", "value", title="Counters", title_justify="left")
+        for name, series in snapshot["counters"].items():
+            for s in series:
+                counters.add_row(name, ", ".join(f"{key}={value}" for key, value in s["labels"].items()), f"{s['value']:g}")
+        renderables = [latencies, counters]
+        streamer = getattr(self, "streamer", None)
+        if streamer is not None:
+            capture = streamer.metrics()
+            capture = capture if isinstance(streamer, MultiStreamer) else {str(self._cam_index): capture}
+            renderables.append("Capture: " + ", ".join(
+                f"{camera} {values['fps']:.1f}fps {values['dropped_frames']} dropped" for camera, values in capture.items()
+            ))
+        self._console_interface.print(Panel(Group(*renderables), title="Metrics"))
+
+    @interact_on_key("i", prompts_user=True)
     def _switch_to_interactive_mode(self):
         self._console_interface.print("Running in interact mode.")
         self.ai_interactive_mode()
 
-    @interact_on_key("m")
+    @interact_on_key("m", prompts_user=True)
     def _switch_to_choose_mode(self) -> None:
         self._choose_mode()
 
@@ -158,12 +444,13 @@ class AIStreamInteractBase:
 
     def _choose_mode(self) -> None:
         """Choose mode menu"""
-        if self._key_listeners:
-            self._stop_key_listeners()
+        self._stop_key_listeners()
+        self._auto_detect_running = False
         message = """
         [bold]Choose one of the below modes:[bold]
         - 'detect' mode will start a cam video stream where you can start detecting objects by pressing (d).
         - 'detect_custom' mode is the same as detect mode but will allow you to customize the base prompt before asking the model to detect the object.
+        - 'auto' mode will start a cam video stream & automatically detect objects whenever the scene changes & then settles.
         - 'interact' mode will allow for a back and forth chat with the model.
         - 'quit' will exit
 
@@ -172,12 +459,13 @@ class AIStreamInteractBase:
           - (i) Will switch to interact mode.
           - (m) Will switch back to this menu.
           - (c) Will allow for typing in a custom prompt before running (d)etect.
+          - (s) Will show a summary of latencies & counters (capture, encode, rate limit waits, model, tts...).
           - (q) Will quit the app.
         """
         self._console_interface.print("\n\n")
         self._console_interface.print(Panel(message))
         self._console_interface.print("\n\n")
-        self._mode = Prompt.ask("Choose a mode", choices=["detect", "detect_custom", "interact", "quit", "d", "dc", "i", "q"], show_choices=False)
+        self._mode = Prompt.ask("Choose a mode", choices=["detect", "detect_custom", "auto", "interact", "quit", "d", "dc", "a", "i", "q"], show_choices=False)
         self.custom_base_prompt = None
         if self._mode.startswith("d"):
             if self._mode in ("detect_custom", "dc"):
@@ -189,65 +477,265 @@ class AIStreamInteractBase:
             self._start_key_listeners()
             self._console_interface.print("Running in detect mode. Press (d) to detect an object")
 
+        if self._mode.startswith("a"):
+            if self.streamer._video_stream_is_stopped:
+                self.streamer.start_video_stream()
+            self._start_key_listeners()
+            self._auto_detect_running = True
+            threading.Thread(target=self.ai_auto_detect_mode, daemon=True).start()
+            self._console_interface.print("Running in auto detect mode. Objects are detected whenever the scene changes.")
+
         if self._mode.startswith("i"):
             self._console_interface.print("Running in interact mode. Type 'exit' to go back to previous menu.")
             self.ai_interactive_mode()
 
         if self._mode.startswith("q"):
+            self._close()
             os._exit(1)
 
-    def _get_api_key(self) -> None:
-        """Will attempt to get API key from user input. If user input was empty will try to get the key from .env"""
-        api_key = Prompt.ask("API key (press Enter to fetch from .env instead)", password=True, console=self._console_interface)
+    def _close(self) -> None:
+        """Releases the stream, the encoder pool & the session recording before the app exits."""
+        self.streamer.close()
+        if self._encoder_pool is not None:
+            self._encoder_pool.shutdown(wait=True)  # the detects are drained or abandoned by now
+            self._encoder_pool = None
+        if self._session_recorder is not None:
+            self._session_recorder.close()
+            self._session_recorder = None
+
+    def _authenticate(self, prompt_for_key: bool = True) -> None:
+        """Gets the API key (unless the backend doesn't need one) & authenticates with the model."""
+        if self._requires_api_key:
+            self._get_api_key(prompt_for_key)
+            self._ai_auth(self.__api_key)
+        else:
+            self._ai_auth(None)
+
+    def _get_api_key(self, prompt_for_key: bool = True) -> None:
+        """Will attempt to get API key from user input. If user input was empty (or prompt_for_key is False) will try to get the key from .env"""
+        api_key = None
+        if prompt_for_key:
+            api_key = Prompt.ask("API key (press Enter to fetch from .env instead)", password=True, console=self._console_interface)
         if not api_key and self._api_key_dot_env_name:
             self._console_warning.print(f"No API key provided thus will try to fetch key ({self._api_key_dot_env_name}) from GEMINI_API_KEY in .env")
+            from dotenv import load_dotenv
             load_dotenv(os.path.join(os.getcwd(), ".env"))
             api_key = os.getenv(self._api_key_dot_env_name)
         if not api_key:
             raise Exception("Unable to find an API key")
         self.__api_key = api_key
 
-    def _init_streamer(self) -> Tuple[Streamer, int]:
-        """Initialize the video stream from camera."""
+    def _init_streamer(self) -> Tuple[Union[Streamer, MultiStreamer], str]:
+        """Initialize the video stream from the configured sources or else from camera index(es)."""
+        config = self._source_config
+        shared_memory = bool(self._interaction_frames_config.encoder_processes)  # so the encoder pool can read frames in place
+        buffer_size = self._stream_buffer_size()
+        if config.sources:
+            sources = [open_source(spec, speed=config.speed, loop=config.loop) for spec in config.sources]
+            if len(sources) > 1:
+                streamer = MultiStreamer(sources, buffer_size, headless=config.headless, names=config.sources, shared_memory=shared_memory)
+            else:
+                streamer = Streamer(sources[0], buffer_size, headless=config.headless, shared_memory=shared_memory)
+            if not streamer._success:
+                raise Exception(f"Unable to read frames from source(s): {', '.join(config.sources)}")
+            self._console_success.print("Video source opened successfully...")
+            return streamer, ",".join(config.sources)
         while True:
-            cam_index = Prompt.ask("Set cam index", console=self._console_interface)
-            valid_index = re.match("[0-9]+$", str(cam_index))
+            cam_index = Prompt.ask("Set cam index (comma separated for several cameras)", console=self._console_interface)
+            valid_index = re.match(r"[0-9]+(\s*,\s*[0-9]+)*$", str(cam_index).strip())
             if valid_index:
-                streamer = Streamer(int(cam_index))
+                cam_indexes = _parse_cam_indexes(cam_index)
+                if len(cam_indexes) > 1:
+                    streamer = MultiStreamer(cam_indexes, buffer_size, headless=config.headless, shared_memory=shared_memory)
+                else:
+                    streamer = Streamer(cam_indexes[0], buffer_size, headless=config.headless, shared_memory=shared_memory)
                 if streamer._success:
                     self._console_success.print("Cam detected successfully...")
                     break
                 self._console_warning.print("Unable to detect cam at this index, please try again", style="bold red")
-            self._console_warning.print("Cam index must be an integer.", style="bold red")
+                continue
+            self._console_warning.print("Cam index must be an integer or a comma separated list of integers.", style="bold red")
         return streamer, cam_index
 
+    @functools.cached_property
+    def _key_handlers(self) -> Dict[str, str]:
+        """Key char -> handler method name, see interact_on_key."""
+        return _collect_key_handlers(type(self))
+
     def _start_key_listeners(self) -> None:
-        on_press_methods = self._get_on_press_interact_methods()
-        if not on_press_methods:
+        """Enables key handling, starting the single keyboard listener the first time around."""
+        if not self._key_handlers:
             raise Exception("Can't call start method if no methods are decorated with interact_on_key")
-        for method in on_press_methods:
-            listener = keyboard.Listener(on_press=method)
-            listener.start()
-            self._key_listeners.append(listener)
+        if self._key_listener is None:
+            try:
+                from pynput import keyboard  # imported here as it's only needed once the stream is running
+                self._key_listener = keyboard.Listener(on_press=self._dispatch_key_press)
+                self._key_listener.start()
+            except Exception as e:  # e.g. headless machines without a display server
+                self._key_listener = False
+                self._console_warning.print(f"Key presses are unavailable ({e!r}), use auto mode for unattended detects.")
+        self._key_handling_enabled = True
 
     def _stop_key_listeners(self) -> None:
-        for listener in self._key_listeners:
-            listener.stop()
-
-    def _get_prompt_imgs_from_stream(self) -> List[Image]:
+        """Disables key handling e.g. while the user is typing in the terminal. The listener itself keeps running."""
+        self._key_handling_enabled = False
+
+    def _dispatch_key_press(self, key_pressed: "keyboard.KeyCode") -> None:
+        """Single keyboard listener callback, runs the key's handler on a worker pool so the listener is never blocked."""
+        if not self._key_handling_enabled:
+            return
+        method_name = self._key_handlers.get(getattr(key_pressed, "char", None))
+        if method_name is not None:
+            handler = getattr(self, method_name)
+            pool = self._key_prompt_pool if getattr(handler, "_prompts_user", False) else self._key_handler_pool
+            pool.submit(self._run_key_handler, handler)
+
+    def _run_key_handler(self, handler: Callable) -> None:
+        try:
+            handler()
+        except Exception as e:
+            self._console_warning.print(f"{handler.__name__} failed: {e!r}")
+
+    def _prompt_frame_spacing(self) -> Tuple[int, float]:
+        """Number of frames per camera a detect is made of & n seconds between them, spanning the clip duration in clip mode."""
+        config = self._interaction_frames_config
+        if config.clip_mode:
+            return config.clip_frames, config.clip_duration / max(1, config.clip_frames - 1)
+        return config.nframes_interact, config.frame_capture_interval
+
+    def _stream_buffer_size(self) -> int:
+        """Frames kept per camera: 64 or a clip's worth (assuming up to 30fps) plus room for the frames detects can have pinned."""
+        config = self._interaction_frames_config
+        size = max(64, math.ceil(30 * config.clip_duration) + 2) if config.clip_mode else 64
+        if config.encoder_processes:
+            # refs stay pinned from submission until preprocessed: queued, being preprocessed or being submitted
+            preprocess = (self._pipeline_config or PipelineConfig()).preprocess
+            size += (preprocess.queue_depth + preprocess.workers + 1) * config.nframes_interact
+        return size
+
+    def _get_prompt_imgs_from_stream(self) -> List[img_utils.EncodedImage]:
         """Get image frames from running video stream to be used for model prompt."""
-        interaction_frames = []
-        while len(interaction_frames) < self._interaction_frames_config.nframes_interact:
+        return self._frames_to_prompt_imgs(self._get_prompt_frames_from_stream())
+
+    @metrics.timed("frame_grab")
+    def _get_prompt_frames_from_stream(self) -> List[np.ndarray]:
+        """Get raw frames from running video stream to be used for model prompt."""
+        nframes, interval = self._prompt_frame_spacing()
+        if self._interaction_frames_config.frame_selection_window and not self._interaction_frames_config.clip_mode:
+            candidates = self.streamer.get_recent_frames(
+                self._interaction_frames_config.frame_selection_window,
+                self._interaction_frames_config.frame_selection_candidates
+            )
+            if len(candidates) >= nframes:
+                selected = _select_frames(candidates, nframes, self._interaction_frames_config.frame_diversity_weight)
+                print(f"{len(selected)} frames selected out of {len(candidates)}...")
+                return [candidates[i] for i in selected]
+        # frames are picked out of the already captured stream history so there is no waiting on the hot path
+        interaction_frames = self.streamer.get_spaced_frames(nframes, interval)
+        while len(interaction_frames) < nframes:  # the stream only just started thus there's not enough history yet
+            time.sleep(interval)
             interaction_frames.append(self.streamer._frame)
-            print(f"{len(interaction_frames)} frames loaded...")
-            time.sleep(self._interaction_frames_config.frame_capture_interval)
-        return img_utils._img_arrays_to_pil_imgs(interaction_frames)
-
-    def _get_on_press_interact_methods(self) -> List[Callable]:
-        """Find all on_press_interact methods in self to create a keyboard listener for each"""
-        press_interact_methods = []
-        for method_name, method in inspect.getmembers(self, inspect.ismethod):
-            method_signature = "\n".join(inspect.getsourcelines(method)[0])
-            if method_name != "_get_on_press_interact_methods" and "on_press_function" in method_signature:
-                press_interact_methods.append(method)
-        return press_interact_methods
+        print(f"{len(interaction_frames)} frames loaded...")
+        return interaction_frames
+
+    def _get_prompt_frame_refs_from_stream(self) -> List[FrameRef]:
+        """Same frames as _get_prompt_frames_from_stream but pinned in shared memory, None if they can't be."""
+        config = self._interaction_frames_config
+        if self._encoder_pool is None or config.frame_selection_window or config.clip_mode:
+            return None
+        refs = self.streamer.get_spaced_refs(config.nframes_interact, config.frame_capture_interval)
+        if len(refs) < config.nframes_interact:
+            _release_refs(refs)
+            return None
+        print(f"{len(refs)} frames loaded...")
+        return refs
+
+    @metrics.timed("encode")
+    def _frames_to_prompt_imgs(
+        self,
+        frames: List[np.ndarray],
+        views: List[str] = None,
+        verbose: bool = True
+    ) -> List[Union[img_utils.EncodedImage, str]]:
+        """Crops, downscales & encodes frames into model ready images, each camera's preceded by its label."""
+        config = self._interaction_frames_config
+        if config.clip_mode:
+            return self._frames_to_prompt_clips(frames, views, verbose)
+        images = img_utils._img_arrays_to_encoded_imgs(
+            img_utils._preprocess_frames(frames, max_edge=config.max_edge, crop=config.crop),
+            img_format=config.img_format,
+            quality=config.img_quality
+        )
+        return self._label_prompt_imgs(images, sum(frame.nbytes for frame in frames), views, verbose)
+
+    @metrics.timed("encode")
+    def _frame_refs_to_prompt_imgs(
+        self,
+        refs: List[FrameRef],
+        views: List[str] = None,
+        verbose: bool = True
+    ) -> Tuple[List[Union[img_utils.EncodedImage, str]], List[int]]:
+        """Same as _frames_to_prompt_imgs for pinned frames, encoded & hashed by the encoder pool."""
+        config = self._interaction_frames_config
+        images, frame_hashes = self._encoder_pool.encode(
+            refs,
+            max_edge=config.max_edge,
+            crop=config.crop,
+            img_format=config.img_format,
+            quality=config.img_quality,
+            with_hashes=self._response_cache is not None or self._single_flight is not None
+        )
+        return self._label_prompt_imgs(images, sum(ref.frame.nbytes for ref in refs), views, verbose), frame_hashes
+
+    def _frames_to_prompt_clips(
+        self,
+        frames: List[np.ndarray],
+        views: List[str] = None,
+        verbose: bool = True
+    ) -> List[Union[img_utils.EncodedImage, str]]:
+        """Clip mode version of _frames_to_prompt_imgs: each camera's frames become one described mosaic or clip."""
+        config = self._interaction_frames_config
+        raw_bytes = sum(frame.nbytes for frame in frames)
+        frames = img_utils._preprocess_frames(frames, crop=config.crop)  # clips are scaled to clip_max_edge instead of max_edge
+        clips, clip_views = [], []
+        for view, indexes in itertools.groupby(range(len(frames)), key=lambda i: views[i] if views else None):
+            clip_frames = [frames[i] for i in indexes]
+            if config.clip_mode == CLIP_MODE_VIDEO:
+                fps = (len(clip_frames) - 1) / config.clip_duration or 1.0  # plays back at real time
+                clips.append(img_utils._frames_to_video(clip_frames, fps, config.clip_max_edge, config.clip_video_format))
+            else:
+                mosaic = img_utils._frames_to_mosaic(clip_frames, config.clip_max_edge, config.clip_delta)
+                clips.append(img_utils._img_arrays_to_encoded_imgs([mosaic], config.img_format, config.img_quality)[0])
+            clip_views.append(view)
+        description = CLIP_PROMPTS[config.clip_mode].format(nframes=len(frames) // len(clips), duration=config.clip_duration)
+        if config.clip_mode == CLIP_MODE_MOSAIC and config.clip_delta:
+            description += CLIP_DELTA_PROMPT
+        labelled = self._label_prompt_imgs(clips, raw_bytes, clip_views if views else None, verbose, nframes=len(frames))
+        return [description, *labelled]
+
+    def _label_prompt_imgs(
+        self,
+        images: List[img_utils.EncodedImage],
+        raw_bytes: int,
+        views: List[str] = None,
+        verbose: bool = True,
+        nframes: int = None
+    ) -> List[Union[img_utils.EncodedImage, str]]:
+        """Reports the upload size (of nframes frames, one per image by default) & precedes each camera's images by its label (if there are several cameras)."""
+        sent_bytes = sum(len(image["data"]) for image in images)
+        metrics.inc("upload_bytes_total", sent_bytes)
+        if verbose:
+            self._console_interface.print(
+                f"Uploading {sent_bytes / 1024:.1f}KB for {nframes or len(images)} frames "
+                f"({(raw_bytes - sent_bytes) / 1024:.1f}KB / {100 * (1 - sent_bytes / raw_bytes):.1f}% saved vs raw frames)"
+            )
+        ncameras = len(set(views)) if views else 0
+        if ncameras < 2:
+            return images
+        labelled = [MULTI_VIEW_PROMPT.format(ncameras=ncameras)]
+        for i, image in enumerate(images):
+            if i == 0 or views[i] != views[i - 1]:
+                labelled.append(f"Camera {views[i]}:")
+            labelled.append(image)
+        return labelled
+
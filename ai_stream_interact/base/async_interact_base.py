@@ -0,0 +1,69 @@
+import queue
+import asyncio
+import threading
+from types import GeneratorType
+from typing import Any, AsyncGenerator, Coroutine, List
+
+from ai_stream_interact.utils import img_utils
+from ai_stream_interact.pipeline import _iter_chunks, _END_OF_STREAM
+from ai_stream_interact.utils.rate_limiter import CancelToken, PRIORITY_INTERACTIVE
+from ai_stream_interact.base.ai_interact_base import AIStreamInteractBase
+
+
+class AsyncAIStreamInteractBase(AIStreamInteractBase):
+    """Base class for asyncio native model interactions, run on a single background event loop.
+    The below methods are to be implemented in child classes per each model's API:
+        - _ai_auth: same as AIStreamInteractBase.
+        - _ai_interact_async: coroutine implementing the most basic interaction for a given model, returns the model's (async streaming) response.
+        - _ai_interactive_mode_async: async generator, same as _ai_interact_async but should keep track of chat history.
+        - _ai_detect_object_async: async generator that does object detection in a series of images & yields the model's output text.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="model-event-loop", daemon=True).start()
+
+    async def _ai_interact_async(self) -> None:
+        """To be implemented per model."""
+        raise NotImplementedError()
+
+    async def _ai_detect_object_async(self) -> None:
+        """To be implemented per model."""
+        raise NotImplementedError()
+
+    async def _ai_interactive_mode_async(self) -> None:
+        """To be implemented per model."""
+        raise NotImplementedError()
+
+    def run_async(self, coro: Coroutine) -> Any:
+        """Runs a coroutine on the model event loop from any thread & blocks until it's done."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _iterate_on_loop(self, async_gen: AsyncGenerator) -> GeneratorType:
+        """Consumes an async generator on the model event loop & yields its items to the calling thread as they arrive."""
+        chunks = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for chunk in async_gen:
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(_END_OF_STREAM)
+
+        asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        yield from _iter_chunks(chunks)
+
+    def _ai_detect_object(
+        self,
+        images: List[img_utils.EncodedImage],
+        custom_base_prompt: str = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancelToken = None
+    ) -> GeneratorType:
+        yield from self._iterate_on_loop(self._ai_detect_object_async(images, custom_base_prompt, priority, cancel_token))
+
+    def _ai_interactive_mode(self, prompt: str, cancel_token: CancelToken = None) -> GeneratorType:
+        yield from self._iterate_on_loop(self._ai_interactive_mode_async(prompt, cancel_token))
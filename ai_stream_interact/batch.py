@@ -0,0 +1,196 @@
+import os
+import json
+import math
+import functools
+import time
+import threading
+from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Set
+
+import numpy as np
+
+from ai_stream_interact.sources import FrameSource, open_source
+from ai_stream_interact.utils.lazy_import import lazy_import
+from ai_stream_interact.utils.frame_buffer import FrameRingBuffer
+from ai_stream_interact.utils.rate_limiter import PRIORITY_BACKGROUND
+from ai_stream_interact.utils.scene_change import AutoDetectConfig, SceneChangeDetector
+
+cv2 = lazy_import("cv2")
+
+# How footage is cut into detect windows
+WINDOW_MODE_SCENE = "scene"  # a window per scene change
+WINDOW_MODE_STRIDE = "stride"  # a window every n seconds of footage
+
+
+@dataclass
+class BatchConfig:
+    input: str  # source spec, see open_source
+    output: str  # results jsonl & checkpoint
+    window_mode: str = WINDOW_MODE_SCENE
+    stride: float = 5.0  # n seconds between windows
+    workers: int = 4  # max detects in flight
+    custom_base_prompt: str = None
+    progress_interval: float = 10.0  # n seconds between progress reports
+
+
+@dataclass
+class DetectWindow:
+    window_id: str  # index of the window's last frame
+    start: float  # n seconds into the footage
+    end: float
+    frames: List[np.ndarray]
+
+
+def _iter_windows(
+    source: FrameSource,
+    nframes: int,
+    interval: float,
+    window_mode: str = WINDOW_MODE_SCENE,
+    stride: float = 5.0,
+    auto_detect_config: AutoDetectConfig = None
+) -> Iterator[DetectWindow]:
+    """Cuts a frame source into detect windows of nframes frames spaced ~interval seconds apart."""
+    auto_detect_config = auto_detect_config or AutoDetectConfig()
+    detector = SceneChangeDetector(auto_detect_config)
+    fps = getattr(source, "fps", 30.0)
+    ring, first_timestamp, last_sample = None, None, None
+    next_window_at = (nframes - 1) * interval  # the first window waits for a full window of history
+    for index, (timestamp, frame) in enumerate(source):
+        if ring is None:
+            capacity = max(nframes, int(math.ceil(fps * interval * (nframes - 1))) + 2)
+            ring = FrameRingBuffer(capacity, frame.shape, frame.dtype)
+            first_timestamp = timestamp
+        if frame.shape != ring.frame_shape:  # e.g. image folders with mixed sizes
+            frame = cv2.resize(frame, (ring.frame_shape[1], ring.frame_shape[0]), interpolation=cv2.INTER_AREA)
+        ring.write(frame, timestamp)
+        elapsed = timestamp - first_timestamp
+        if window_mode == WINDOW_MODE_STRIDE:
+            fire = elapsed >= next_window_at
+            while next_window_at <= elapsed:
+                next_window_at += stride
+        else:
+            fire = False
+            if last_sample is None or elapsed - last_sample >= auto_detect_config.poll_interval:
+                last_sample = elapsed
+                fire = detector.update(frame, elapsed)
+        if fire:
+            buffered = ring.get_spaced(nframes, interval)
+            yield DetectWindow(f"{index:08d}", buffered[0].timestamp - first_timestamp, elapsed, [b.frame for b in buffered])
+
+
+def _load_checkpoint(path: str) -> Set[str]:
+    """Ids of the windows already detected successfully by a previous run writing to path."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:  # e.g. a line cut short when the previous run was killed
+                continue
+            if record.get("error") is None:
+                done.add(record["window_id"])
+    return done
+
+
+class BatchRunner:
+    """Labels recorded footage offline into a resumable jsonl file."""
+
+    def __init__(self, interact: Any, config: BatchConfig) -> None:
+        self._interact = interact
+        self._config = config
+        self._write_lock = threading.Lock()
+        self._stats = {"windows": 0, "skipped": 0, "failed": 0}
+        self._started_at = self._last_progress_at = None
+
+    def _detect(self, window: DetectWindow) -> Dict[str, Any]:
+        started_at = time.monotonic()
+        record = {"window_id": window.window_id, "start": round(window.start, 3), "end": round(window.end, 3), "nframes": len(window.frames)}
+        try:
+            images = self._interact._frames_to_prompt_imgs(window.frames, verbose=False)
+            frame_hashes = self._interact._hash_prompt_frames(window.frames)
+            chunks = self._interact._ai_detect_object_prefiltered(
+                images,
+                self._config.custom_base_prompt,
+                frame_hashes,
+                PRIORITY_BACKGROUND,
+                self._interact._prefilter_frames(window.frames)
+            )
+            parser = self._interact._new_detect_parser(self._config.custom_base_prompt)
+            texts = []
+            for chunk in chunks:
+                texts.append(chunk)
+                if parser is not None:
+                    parser.feed(chunk)
+            record["response"] = "".join(texts)
+            record["result"] = parser.close().to_dict() if parser is not None else None
+            record["error"] = None
+        except Exception as e:
+            record["response"], record["result"], record["error"] = None, None, repr(e)
+        record["latency"] = round(time.monotonic() - started_at, 3)
+        return record
+
+    def _write(self, out, in_flight: threading.BoundedSemaphore, future: Future) -> None:
+        try:
+            self._write_record(out, future.result())
+        finally:
+            in_flight.release()
+
+    def _write_record(self, out, record: Dict[str, Any]) -> None:
+        with self._write_lock:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            self._stats["windows"] += 1
+            if record["error"] is not None:
+                self._stats["failed"] += 1
+                self._interact._console_warning.print(f"Window {record['window_id']} failed: {record['error']}")
+            now = time.monotonic()
+            if now - self._last_progress_at >= self._config.progress_interval:
+                self._last_progress_at = now
+                self._interact._console_interface.print(self._progress())
+
+    def _progress(self) -> str:
+        elapsed = time.monotonic() - self._started_at
+        return (
+            f"{self._stats['windows']} windows detected ({self._stats['failed']} failed, {self._stats['skipped']} already done) "
+            f"in {elapsed:.0f}s, {60 * self._stats['windows'] / max(elapsed, 1e-9):.1f} windows/min"
+        )
+
+    def run(self) -> Dict[str, int]:
+        config = self._config
+        nframes, interval = self._interact._prompt_frame_spacing()
+        done = _load_checkpoint(config.output)
+        if done:
+            self._interact._console_interface.print(f"Resuming, {len(done)} windows are already done...")
+        source = open_source(config.input, speed=0)
+        pool = ThreadPoolExecutor(max_workers=config.workers, thread_name_prefix="batch-detect")
+        in_flight = threading.BoundedSemaphore(config.workers * 2)  # bounds how far decoding runs ahead of the workers
+        self._started_at = self._last_progress_at = time.monotonic()
+        with open(config.output, "a+") as out:
+            out.seek(0, os.SEEK_END)
+            if out.tell():
+                out.seek(out.tell() - 1)
+                if out.read(1) != "\n":  # the previous run was killed mid line
+                    out.write("\n")
+            windows = _iter_windows(
+                source,
+                nframes,
+                interval,
+                config.window_mode,
+                config.stride,
+                self._interact._auto_detect_config
+            )
+            for window in windows:
+                if window.window_id in done:
+                    with self._write_lock:  # the stats are updated by the workers' write callbacks too
+                        self._stats["skipped"] += 1
+                    continue
+                in_flight.acquire()
+                future = pool.submit(self._detect, window)
+                future.add_done_callback(functools.partial(self._write, out, in_flight))
+            pool.shutdown(wait=True)
+        source.release()
+        self._interact._console_success.print(f"Done: {self._progress()}. Results in {config.output}")
+        return dict(self._stats)
@@ -1,15 +1,27 @@
+import threading
+from collections import deque
+from functools import cached_property
 from types import GeneratorType
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Tuple
 from dataclasses import dataclass
 
 import backoff
-from PIL import Image
-import google.generativeai as genai
-from ratelimit import limits, RateLimitException
-from google.ai.generativelanguage import Content
 
+from ai_stream_interact.utils.img_utils import EncodedImage
+from ai_stream_interact.utils.lazy_import import lazy_import
+from ai_stream_interact.utils.metrics import metrics
+from ai_stream_interact.utils.detect_parser import REPAIR_PROMPT, DetectResponseParser
+from ai_stream_interact.utils.rate_limiter import (
+    CancelToken, RequestCancelled, TokenBucketRateLimiter, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, _retry_after_hint
+)
 from ai_stream_interact.base.ai_interact_base import AIStreamInteractBase, InteractionFramesConfig
 
+genai = lazy_import("google.generativeai")
+glm = lazy_import("google.ai.generativelanguage")
+
+# imported in the background by the cli runner while the user goes through the first prompts
+PRELOAD_MODULES = ["google.generativeai"]
+
 
 DEFAULT_SAFETY_SETTINGS = [
     {
@@ -30,26 +42,136 @@ DEFAULT_SAFETY_SETTINGS = [
     }
 ]
 
+DEFAULT_DETECT_PROMPT = """
+                I will give you {media} of the same object and I want you to identify the object. You MUST generate the output in the following format without any extra text:
+                Object Detected: <object identification goes here>
+                Detailed Description: <detailed description goes here>
+                Confidence Level: <A score of how confident you are in your object identification. This MUST be a value between 0 and 1 where 0 is the lowest score and 1 is the highest.>
+                """
+
+
+def _describe_media(images: List[Union[EncodedImage, str]]) -> str:
+    """'3 images', '1 image and 1 video'... counting the prompt's images & video clips, text parts aside."""
+    counts = {"image": 0, "video": 0}
+    for image in images:
+        if not isinstance(image, str):
+            counts["video" if image["mime_type"].startswith("video/") else "image"] += 1
+    return " and ".join(f"{count} {kind}{'s' if count > 1 else ''}" for kind, count in counts.items() if count) or "images"
+
+
+def _detect_prompt(images: List[Union[EncodedImage, str]], custom_base_prompt: str = None) -> str:
+    """The custom prompt if any, else the default detect prompt describing the images (or clips) that follow it."""
+    return custom_base_prompt or DEFAULT_DETECT_PROMPT.format(media=_describe_media(images))
+
+
+def _text_only(prompt: Union[str, list]) -> str:
+    """Text parts of a (possibly multimodal) prompt joined together, images are dropped."""
+    if isinstance(prompt, str):
+        return prompt
+    return "\n".join(part for part in prompt if isinstance(part, str))
+
 
-def _get_text_only_history(history):
-    text_only_history = []
-    for messages in history:
-        text_only_parts = [part for part in messages.parts if "inline_data" not in part]
-        text_only_history.append(
-            Content(role=messages.role, parts=text_only_parts)
+DETECT_TURN_PROMPT = "What object is in front of the camera?"
+SUMMARY_PROMPT = "Summary of our earlier conversation:\n"
+
+
+def _detect_turn(response: str, custom_base_prompt: str = None) -> Tuple[str, str]:
+    """(prompt, response) a detect is remembered as in chat, a one line turn unless it used a custom prompt."""
+    if custom_base_prompt:
+        return custom_base_prompt, response
+    parser = DetectResponseParser()
+    parser.feed(response)
+    return DETECT_TURN_PROMPT, f"Detected: {parser.close().label or 'nothing'}"
+
+
+def _clip(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+@dataclass
+class ChatHistoryConfig:
+    max_history_tokens: int = 8000  # token budget of past turns
+    max_summary_tokens: int = 500  # token budget of the summary of older turns
+    summary_chars: int = 120  # per prompt & response in the summary
+    chars_per_token: float = 4
+
+
+class _ChatSession:
+    """Text only chat history sent as a token budgeted sliding window, older turns condensed into a summary."""
+
+    def __init__(self, config: ChatHistoryConfig = None) -> None:
+        self._config = config or ChatHistoryConfig()
+        self._turns: deque = deque()  # (user, model, tokens, summary line) per turn
+        self._total_tokens = 0
+        self._summary: deque = deque()  # (summary line, tokens) per turn evicted from the window
+        self._summary_tokens = 0
+        self._lock = threading.Lock()
+
+    def _estimate_tokens(self, text: str) -> int:
+        return int(len(text) / self._config.chars_per_token) + 1
+
+    def append_turn(self, prompt: Union[str, list], response: str) -> None:
+        """Stores a finished turn (text only) & moves the oldest turns that no longer fit the budget to the summary."""
+        prompt = _text_only(prompt)
+        tokens = self._estimate_tokens(prompt) + self._estimate_tokens(response)
+        turn = (
+            glm.Content(role="user", parts=[{"text": prompt}]),
+            glm.Content(role="model", parts=[{"text": response}]),
+            tokens,
+            f"- {_clip(prompt, self._config.summary_chars)} -> {_clip(response, self._config.summary_chars)}"
         )
-    return text_only_history
+        with self._lock:
+            self._turns.append(turn)
+            self._total_tokens += tokens
+            while len(self._turns) > 1 and self._total_tokens > self._config.max_history_tokens:
+                _, _, tokens, line = self._turns.popleft()
+                self._total_tokens -= tokens
+                self._summary.append((line, self._estimate_tokens(line)))
+                self._summary_tokens += self._summary[-1][1]
+            while self._summary and self._summary_tokens > self._config.max_summary_tokens:
+                self._summary_tokens -= self._summary.popleft()[1]
+
+    def append_detect(self, response: str, custom_base_prompt: str = None) -> None:
+        """Remembers a detect as a short turn (see _detect_turn) so detects don't crowd chat turns out of the budget."""
+        self.append_turn(*_detect_turn(response, custom_base_prompt))
+
+    def contents_for(self, prompt: str) -> List["glm.Content"]:
+        """Summary & history window followed by the new user message, ready to be sent."""
+        with self._lock:
+            turns: List[Tuple["glm.Content", "glm.Content", int, str]] = list(self._turns)
+            summary = [line for line, _ in self._summary]
+        contents = []
+        if summary:
+            contents.append(glm.Content(role="user", parts=[{"text": SUMMARY_PROMPT + "\n".join(summary)}]))
+            contents.append(glm.Content(role="model", parts=[{"text": "Noted."}]))
+        contents.extend(content for user, model, _, _ in turns for content in (user, model))
+        contents.append(glm.Content(role="user", parts=[{"text": prompt}]))
+        return contents
+
+
+@dataclass
+class ModelsConfig:
+    text_model: str = "gemini-pro"  # model used for chat & detect repairs
+    vision_model: str = "gemini-pro-vision"  # model used for detects
 
 
 @dataclass
 class RateLimitsConfig:
     calls: int  # number of calls per period
     period: Union[float, int]
-    max_retries: int  # max retries on any none rate limit exceptions
+    max_retries: int  # max tries on any exception
+    burst: int = 1  # max back to back calls
 
 
 gemini_ratelimits_config = RateLimitsConfig(calls=1, period=2, max_retries=5)
 
+# shared by all instances (async ones included) as the quota is per API key & not per instance
+gemini_rate_limiter = TokenBucketRateLimiter(
+    rate=gemini_ratelimits_config.calls / gemini_ratelimits_config.period,
+    burst=gemini_ratelimits_config.burst
+)
+
 
 class ModelInteract(AIStreamInteractBase):
     """Implements Google's gemini-pro models interactions. For now implements text, image and text + image interactions."""
@@ -58,55 +180,51 @@ class ModelInteract(AIStreamInteractBase):
         self,
         interaction_frames_config: InteractionFramesConfig,
         api_key: str = None,
+        chat_history_config: ChatHistoryConfig = None,
+        models_config: ModelsConfig = None,
         **kwargs
     ) -> None:
         super().__init__(interaction_frames_config=interaction_frames_config, **kwargs)
         self._api_key_dot_env_name = "GEMINI_API_KEY"
+        self._models_config = models_config or ModelsConfig()
         if api_key:
             self.__api_key = api_key
         # self._ai_auth(self.__api_key)
-        self.text_model = genai.GenerativeModel('gemini-pro')
-        self.multimodal_model = genai.GenerativeModel('gemini-pro-vision')
+        self._chat_session = _ChatSession(chat_history_config)
 
     def _ai_interactive_mode(
         self,
-        prompt: str
+        prompt: str,
+        cancel_token: CancelToken = None
     ) -> GeneratorType:
         """Simple interactive back and forth chat mode with the model."""
-        if hasattr(self, "chat"):
-            history = self.chat.history
-        else:
-            history = []
         response = self._ai_interact(
             prompt=prompt,
             multimodal=False,
-            history=history,
+            history=self._chat_session,
             stream=True,
             generation_config=genai.types.GenerationConfig(
                 temperature=0
             ),
-            safety_settings=DEFAULT_SAFETY_SETTINGS
+            safety_settings=DEFAULT_SAFETY_SETTINGS,
+            cancel_token=cancel_token
         )
+        texts = []
         for chunk in response:
+            texts.append(chunk.text)
             yield chunk.text
+        if self._records_history:
+            self._chat_session.append_turn(prompt, "".join(texts))
 
     def _ai_detect_object(
         self,
-        images: List[Image],
-        custom_base_prompt: str = None
+        images: List[EncodedImage],
+        custom_base_prompt: str = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancelToken = None
     ) -> GeneratorType:
         """Detect object based on a primer prompt and a series of images following the prompt."""
-        if custom_base_prompt:
-            prompt = [custom_base_prompt]
-        else:
-            prompt = [
-                """
-                I will give you 3 images of the same object and I want you to identify the object. You MUST generate the output in the following format without any extra text:
-                Object Detected: <object identification goes here>
-                Detailed Description: <detailed description goes here>
-                Confidence Level: <A score of how confident you are in your object identification. This MUST be a value between 0 and 1 where 0 is the lowest score and 1 is the highest.>
-                """
-            ]
+        prompt = [_detect_prompt(images, custom_base_prompt)]
         prompt.extend(images)
         response = self._ai_interact(
             prompt=prompt,
@@ -115,48 +233,80 @@ class ModelInteract(AIStreamInteractBase):
             generation_config=genai.types.GenerationConfig(
                 temperature=0
             ),
-            safety_settings=DEFAULT_SAFETY_SETTINGS
+            safety_settings=DEFAULT_SAFETY_SETTINGS,
+            priority=priority,
+            cancel_token=cancel_token
         )
+        texts = []
         for chunk in response:
+            texts.append(chunk.text)
             yield chunk.text
+        # detects are remembered in chat so the user can ask follow up questions about the detected object
+        if self._records_history:
+            self._chat_session.append_detect("".join(texts), custom_base_prompt)
+
+    def _repair_detect_output(self, raw_output: str) -> str:
+        """Asks the text model to rewrite a detect response that doesn't follow the expected format (text only, no images)."""
+        response = self._ai_interact(
+            prompt=REPAIR_PROMPT + raw_output,
+            multimodal=False,
+            stream=False,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0
+            ),
+            safety_settings=DEFAULT_SAFETY_SETTINGS,
+            priority=PRIORITY_BACKGROUND
+        )
+        return response.text
 
     @backoff.on_exception(
-        backoff.constant,
+        backoff.expo,
         exception=Exception,
-        max_tries=gemini_ratelimits_config.max_retries
-    )
-    @backoff.on_exception(
-        backoff.constant,
-        exception=RateLimitException
+        max_tries=gemini_ratelimits_config.max_retries,
+        jitter=backoff.full_jitter,
+        giveup=lambda e: isinstance(e, RequestCancelled),
+        on_backoff=lambda details: metrics.inc("model_retries_total", call=details["target"].__name__)
     )
-    @limits(calls=gemini_ratelimits_config.calls, period=gemini_ratelimits_config.period)
     def _ai_interact(
         self,
         prompt: str,
         multimodal: bool = False,
         stream: bool = True,
-        history: genai.types.content_types.StrictContentType = None,
-        generation_config: genai.types.GenerationConfig = None,
-        safety_settings: List[Dict[str, str]] = None
-    ) -> genai.types.generation_types.GenerateContentResponse:
-        """Implements base model interaction using chat while keeping history memory."""
+        history: _ChatSession = None,
+        generation_config: "genai.types.GenerationConfig" = None,
+        safety_settings: List[Dict[str, str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancelToken = None
+    ) -> "genai.types.generation_types.GenerateContentResponse":
+        """Implements base model interaction, waiting on the shared rate limiter in the given priority lane."""
+        gemini_rate_limiter.acquire(priority, cancel_token=cancel_token)
         if multimodal:
+            # gemini-pro-vision does not currently support multi-turn chat thus history only goes to the text model.
             model = self.multimodal_model
-            history = []
+            contents = prompt
         else:
             model = self.text_model
-            # a dirty hack combining both gemini-pro & gemini-pro-vision as gemini-pro-vision does not currently support multi-turn chat.
-            if history:
-                history = _get_text_only_history(history)
-            else:
-                history = []
-        self.chat = model.start_chat(history=history)
-        return self.chat.send_message(
-            prompt,
-            stream=stream,
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
+            contents = history.contents_for(prompt) if history else prompt
+        try:
+            return model.generate_content(
+                contents,
+                stream=stream,
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
+        except Exception as e:
+            retry_after = _retry_after_hint(e)
+            if retry_after is not None:
+                gemini_rate_limiter.penalize(retry_after)
+            raise
+
+    @cached_property
+    def text_model(self) -> "genai.GenerativeModel":
+        return genai.GenerativeModel(self._models_config.text_model)
+
+    @cached_property
+    def multimodal_model(self) -> "genai.GenerativeModel":
+        return genai.GenerativeModel(self._models_config.vision_model)
 
     def _ai_auth(self, api_key: str) -> None:
         """Model authentication."""
@@ -0,0 +1,151 @@
+from functools import cached_property
+from typing import AsyncGenerator, List, Dict
+
+from ai_stream_interact.utils.img_utils import EncodedImage
+from ai_stream_interact.utils.lazy_import import lazy_import
+from ai_stream_interact.utils.detect_parser import REPAIR_PROMPT
+from ai_stream_interact.utils.rate_limiter import (
+    AsyncTokenBucket, CancelToken, async_retry, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, _retry_after_hint
+)
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+from ai_stream_interact.base.async_interact_base import AsyncAIStreamInteractBase
+from ai_stream_interact.models.gemini import (
+    DEFAULT_SAFETY_SETTINGS,
+    gemini_ratelimits_config,
+    gemini_rate_limiter,
+    ChatHistoryConfig,
+    ModelsConfig,
+    _ChatSession,
+    _detect_prompt
+)
+
+genai = lazy_import("google.generativeai")
+
+PRELOAD_MODULES = ["google.generativeai"]
+
+
+class ModelInteract(AsyncAIStreamInteractBase):
+    """asyncio implementation of Google's gemini-pro models interactions."""
+
+    def __init__(
+        self,
+        interaction_frames_config: InteractionFramesConfig,
+        api_key: str = None,
+        chat_history_config: ChatHistoryConfig = None,
+        models_config: ModelsConfig = None,
+        **kwargs
+    ) -> None:
+        super().__init__(interaction_frames_config=interaction_frames_config, **kwargs)
+        self._api_key_dot_env_name = "GEMINI_API_KEY"
+        self._models_config = models_config or ModelsConfig()
+        if api_key:
+            self._ai_auth(api_key)
+        self._rate_limiter = AsyncTokenBucket.sharing(gemini_rate_limiter)
+        self._chat_session = _ChatSession(chat_history_config)
+
+    async def _ai_interactive_mode_async(self, prompt: str, cancel_token: CancelToken = None) -> AsyncGenerator[str, None]:
+        """Simple interactive back and forth chat mode with the model."""
+        response = await self._ai_interact_async(
+            prompt=prompt,
+            multimodal=False,
+            history=self._chat_session,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0
+            ),
+            safety_settings=DEFAULT_SAFETY_SETTINGS,
+            cancel_token=cancel_token
+        )
+        texts = []
+        async for chunk in response:
+            texts.append(chunk.text)
+            yield chunk.text
+        if self._records_history:
+            self._chat_session.append_turn(prompt, "".join(texts))
+
+    async def _ai_detect_object_async(
+        self,
+        images: List[EncodedImage],
+        custom_base_prompt: str = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancelToken = None
+    ) -> AsyncGenerator[str, None]:
+        """Detect object based on a primer prompt and a series of images following the prompt."""
+        prompt = [_detect_prompt(images, custom_base_prompt)]
+        prompt.extend(images)
+        response = await self._ai_interact_async(
+            prompt=prompt,
+            multimodal=True,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0
+            ),
+            safety_settings=DEFAULT_SAFETY_SETTINGS,
+            priority=priority,
+            cancel_token=cancel_token
+        )
+        texts = []
+        async for chunk in response:
+            texts.append(chunk.text)
+            yield chunk.text
+        if self._records_history:
+            self._chat_session.append_detect("".join(texts), custom_base_prompt)
+
+    async def _repair_detect_output_async(self, raw_output: str) -> str:
+        """Asks the text model to rewrite a detect response that doesn't follow the expected format (text only, no images)."""
+        response = await self._ai_interact_async(
+            prompt=REPAIR_PROMPT + raw_output,
+            multimodal=False,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0
+            ),
+            safety_settings=DEFAULT_SAFETY_SETTINGS,
+            priority=PRIORITY_BACKGROUND
+        )
+        return "".join([chunk.text async for chunk in response])
+
+    def _repair_detect_output(self, raw_output: str) -> str:
+        return self.run_async(self._repair_detect_output_async(raw_output))
+
+    @async_retry(max_tries=gemini_ratelimits_config.max_retries)
+    async def _ai_interact_async(
+        self,
+        prompt: str,
+        multimodal: bool = False,
+        history: _ChatSession = None,
+        generation_config: "genai.types.GenerationConfig" = None,
+        safety_settings: List[Dict[str, str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancelToken = None
+    ) -> "genai.types.generation_types.AsyncGenerateContentResponse":
+        """Implements base model interaction. Text prompts are sent along with the chat history window, multimodal ones on their own. Always streams."""
+        await self._rate_limiter.acquire(priority, cancel_token)
+        if multimodal:
+            # same as models.gemini, gemini-pro-vision does not currently support multi-turn chat.
+            model = self.multimodal_model
+            contents = prompt
+        else:
+            model = self.text_model
+            contents = history.contents_for(prompt) if history else prompt
+        try:
+            return await model.generate_content_async(
+                contents,
+                stream=True,
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
+        except Exception as e:
+            retry_after = _retry_after_hint(e)
+            if retry_after is not None:
+                await self._rate_limiter.penalize(retry_after)
+            raise
+
+    @cached_property
+    def text_model(self) -> "genai.GenerativeModel":
+        return genai.GenerativeModel(self._models_config.text_model)
+
+    @cached_property
+    def multimodal_model(self) -> "genai.GenerativeModel":
+        return genai.GenerativeModel(self._models_config.vision_model)
+
+    def _ai_auth(self, api_key: str) -> None:
+        """Model authentication."""
+        genai.configure(api_key=api_key)
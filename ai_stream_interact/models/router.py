@@ -0,0 +1,392 @@
+import json
+import time
+import queue
+import importlib
+import threading
+from types import GeneratorType
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from rich.table import Table
+
+from ai_stream_interact.utils.img_utils import EncodedImage
+from ai_stream_interact.utils.metrics import metrics
+from ai_stream_interact.utils.rate_limiter import CancelToken, RequestCancelled, PRIORITY_INTERACTIVE, _retry_after_hint
+from ai_stream_interact.base.ai_interact_base import AIStreamInteractBase, InteractionFramesConfig
+
+PRELOAD_MODULES = []
+
+# Request kinds a backend can serve
+KIND_TEXT = "text"  # chat & detect repairs
+KIND_VISION = "vision"  # detects
+
+_DONE = object()
+
+
+@dataclass
+class BackendConfig:
+    llm: str  # backend module e.g. gemini or stub
+    name: str = None  # defaults to llm
+    kinds: Tuple[str, ...] = (KIND_TEXT, KIND_VISION)  # request kinds the backend serves
+    text_model: str = None  # backend default if None
+    vision_model: str = None
+
+
+@dataclass
+class RouterConfig:
+    # in order of preference, healthy backends are always tried before benched ones. Only real backends by default,
+    # the stub's made up answers would pass for real ones whenever it wins a hedge or takes a failover
+    backends: List[BackendConfig] = field(default_factory=lambda: [BackendConfig("gemini")])
+    ewma_alpha: float = 0.2
+    hedge_after: float = None  # n seconds, adaptive if None
+    hedge_factor: float = 3.0  # x average time to first chunk...
+    min_hedge_after: float = 1.0  # ...but at least this long
+    max_latency: float = None  # n seconds to first chunk
+    max_error_rate: float = 0.5
+    bench_time: float = 30.0  # n seconds, unless retry-after says otherwise
+
+
+def load_router_config(path: str) -> RouterConfig:
+    """RouterConfig from a json file of RouterConfig fields, with backends as a list of BackendConfig fields."""
+    with open(path) as f:
+        values = json.load(f)
+    backends = [
+        BackendConfig(**{**backend, "kinds": tuple(backend.get("kinds", (KIND_TEXT, KIND_VISION)))})
+        for backend in values.pop("backends", [])
+    ]
+    return RouterConfig(**values, **({"backends": backends} if backends else {}))
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return _retry_after_hint(error) is not None or getattr(error, "code", None) == 429 or type(error).__name__ == "ResourceExhausted"
+
+
+class BackendStats:
+    """Moving averages (EWMA) of a backend's time to first chunk & error rate, plus when it's benched until."""
+
+    def __init__(self, config: RouterConfig) -> None:
+        self._config = config
+        self._lock = threading.Lock()
+        self.latency: float = None  # n seconds to first chunk
+        self.error_rate = 0.0
+        self.benched_until = 0.0
+        self.requests = 0
+
+    def _average(self, average: Optional[float], value: float) -> float:
+        return value if average is None else (1 - self._config.ewma_alpha) * average + self._config.ewma_alpha * value
+
+    def _bench(self, duration: float) -> None:
+        self.benched_until = max(self.benched_until, time.monotonic() + duration)
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latency = self._average(self.latency, latency)
+            self.error_rate = self._average(self.error_rate, 0.0)
+            if self._config.max_latency is not None and self.latency > self._config.max_latency:
+                self._bench(self._config.bench_time)
+
+    def record_error(self, error: Exception) -> None:
+        with self._lock:
+            self.requests += 1
+            self.error_rate = self._average(self.error_rate, 1.0)
+            if _is_rate_limited(error):
+                self._bench(_retry_after_hint(error) or self._config.bench_time)
+            elif self.error_rate > self._config.max_error_rate:
+                self._bench(self._config.bench_time)
+
+    @property
+    def benched(self) -> bool:
+        return time.monotonic() < self.benched_until
+
+    def hedge_after(self) -> float:
+        """n seconds to wait on the backend's first chunk before hedging."""
+        if self._config.hedge_after is not None:
+            return self._config.hedge_after
+        if self.latency is None:
+            return self._config.min_hedge_after * self._config.hedge_factor
+        return max(self._config.min_hedge_after, self._config.hedge_factor * self.latency)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "latency": self.latency,
+                "error_rate": round(self.error_rate, 3),
+                "benched_for": round(max(0.0, self.benched_until - time.monotonic()), 1),
+            }
+
+
+@dataclass
+class Backend:
+    name: str
+    interact: AIStreamInteractBase
+    kinds: Tuple[str, ...]
+    stats: BackendStats
+
+
+class BackendRegistry:
+    """The backends a router can send requests to, in order of preference."""
+
+    def __init__(self, config: RouterConfig) -> None:
+        self._config = config
+        self.backends: List[Backend] = []
+
+    def register(self, name: str, interact: AIStreamInteractBase, kinds: Tuple[str, ...] = (KIND_TEXT, KIND_VISION)) -> Backend:
+        """Adds an already built backend (e.g. a client of an on prem model server) after the ones registered so far.
+        Backends keeping a chat history share the first one's, so a conversation that hedges or fails over keeps its earlier turns.
+        """
+        if any(backend.name == name for backend in self.backends):
+            raise ValueError(f"A backend named {name} is already registered")
+        if hasattr(interact, "_chat_session"):
+            interact._records_history = False  # hedged attempts would all record the turn, the router records the winner's
+            shared = next((backend.interact for backend in self.backends if hasattr(backend.interact, "_chat_session")), None)
+            if shared is not None:
+                interact._chat_session = shared._chat_session
+        backend = Backend(name, interact, tuple(kinds), BackendStats(self._config))
+        self.backends.append(backend)
+        return backend
+
+    def candidates(self, kind: str) -> List[Backend]:
+        """Backends serving the kind of request in the order they should be tried: healthy ones first, in order of preference."""
+        backends = [backend for backend in self.backends if kind in backend.kinds]
+        return sorted(backends, key=lambda backend: backend.stats.benched)  # stable sort thus preference order is kept
+
+
+def _load_backend(config: BackendConfig, interaction_frames_config: InteractionFramesConfig) -> AIStreamInteractBase:
+    """Builds a backend from its module. Caching, single flight & tts are left to the router."""
+    module = importlib.import_module(f"ai_stream_interact.models.{config.llm}")
+    kwargs = {}
+    if config.text_model or config.vision_model:
+        if not hasattr(module, "ModelsConfig"):
+            raise ValueError(f"Backend {config.llm} doesn't take model names")
+        defaults = module.ModelsConfig()
+        kwargs["models_config"] = module.ModelsConfig(
+            text_model=config.text_model or defaults.text_model,
+            vision_model=config.vision_model or defaults.vision_model
+        )
+    return module.ModelInteract(
+        interaction_frames_config=interaction_frames_config,
+        tts_model_name=None,
+        use_response_cache=False,
+        use_single_flight=False,
+        **kwargs
+    )
+
+
+class _AttemptToken(CancelToken):
+    """Cancel token of one backend's attempt at a request."""
+
+    def __init__(self, request_token: CancelToken = None) -> None:
+        self._request_token = request_token
+        super().__init__()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled or (self._request_token is not None and self._request_token.cancelled)
+
+    @cancelled.setter
+    def cancelled(self, value: bool) -> None:
+        self._cancelled = value
+
+    def mark_sent(self) -> bool:
+        if self._request_token is not None and not self._request_token.mark_sent():
+            return False
+        return super().mark_sent()
+
+
+class _Attempt:
+    """A request streamed from one backend into the router's queue on its own thread."""
+
+    def __init__(
+        self,
+        backend: Backend,
+        call: Callable[[AIStreamInteractBase, CancelToken], Iterable[str]],
+        cancel_token: _AttemptToken,
+        items: queue.Queue
+    ) -> None:
+        self.backend = backend
+        self.cancel_token = cancel_token
+        self.abandoned = False
+        self.running = True
+        self._call = call
+        self._items = items
+        threading.Thread(target=self._run, name=f"router-{backend.name}", daemon=True).start()
+
+    def _run(self) -> None:
+        started_at = time.monotonic()
+        first = True
+        try:
+            stream = iter(self._call(self.backend.interact, self.cancel_token))
+            for chunk in stream:
+                if first:
+                    first = False
+                    latency = time.monotonic() - started_at
+                    self.backend.stats.record_success(latency)
+                    metrics.observe("router_ttft_seconds", latency, backend=self.backend.name)
+                if self.abandoned:
+                    if hasattr(stream, "close"):
+                        stream.close()
+                    break
+                self._items.put((self, chunk))
+        except NotImplementedError as e:  # the backend doesn't do this kind of call, not its fault
+            self._items.put((self, e))
+        except Exception as e:
+            if not (isinstance(e, RequestCancelled) and self.cancel_token.cancelled):
+                self.backend.stats.record_error(e)
+            self._items.put((self, e))
+        else:
+            if first:  # an empty response still counts as a success
+                self.backend.stats.record_success(time.monotonic() - started_at)
+            self._items.put((self, _DONE))
+        finally:
+            self.running = False
+
+    def abandon(self) -> None:
+        self.abandoned = True
+        self.cancel_token.cancel()
+
+
+class ModelInteract(AIStreamInteractBase):
+    """Routes requests over several backends with hedging, failover & benching of unhealthy backends."""
+
+    def __init__(
+        self,
+        interaction_frames_config: InteractionFramesConfig,
+        router_config: RouterConfig = None,
+        **kwargs
+    ) -> None:
+        super().__init__(interaction_frames_config=interaction_frames_config, **kwargs)
+        self._router_config = router_config or RouterConfig()
+        self.registry = BackendRegistry(self._router_config)
+        for backend_config in self._router_config.backends:
+            self.registry.register(
+                backend_config.name or backend_config.llm,
+                _load_backend(backend_config, interaction_frames_config),
+                backend_config.kinds
+            )
+        self._requires_api_key = any(backend.interact._requires_api_key for backend in self.registry.backends)
+        self._api_key_dot_env_name = next(
+            (backend.interact._api_key_dot_env_name for backend in self.registry.backends if backend.interact._requires_api_key), None
+        )
+
+    def _ai_auth(self, api_key: str = None) -> None:
+        for backend in self.registry.backends:
+            backend.interact._ai_auth(api_key if backend.interact._requires_api_key else None)
+
+    def _route(
+        self,
+        kind: str,
+        call: Callable[[AIStreamInteractBase, CancelToken], Iterable[str]],
+        cancel_token: CancelToken = None,
+        on_done: Callable[[AIStreamInteractBase, str], None] = None
+    ) -> Iterator[str]:
+        """Streams the response of the first backend to answer the request, on_done gets the winner & its full response."""
+        candidates = self.registry.candidates(kind)
+        if not candidates:
+            raise ValueError(f"No backend serves {kind} requests")
+        items = queue.Queue()
+        attempts: List[_Attempt] = []
+        winner: _Attempt = None
+        hedge_at = None
+        texts = []
+
+        def send_next(outcome: str) -> None:
+            nonlocal hedge_at
+            backend = candidates[len(attempts)]
+            metrics.inc("router_requests_total", backend=backend.name, kind=kind, outcome=outcome)
+            attempts.append(_Attempt(backend, call, _AttemptToken(cancel_token), items))
+            hedge_at = time.monotonic() + backend.stats.hedge_after() if len(attempts) < len(candidates) else None
+
+        send_next("sent")
+        try:
+            while True:
+                timeout = None if winner is not None or hedge_at is None else max(0.0, hedge_at - time.monotonic())
+                try:
+                    attempt, item = items.get(timeout=timeout)
+                except queue.Empty:  # too slow, the next backend gets the request as well
+                    send_next("hedged")
+                    continue
+                if attempt.abandoned:
+                    continue
+                if isinstance(item, Exception):
+                    if attempt is winner:
+                        raise item
+                    if isinstance(item, RequestCancelled) and cancel_token is not None and cancel_token.cancelled:
+                        raise item  # superseded, not the backend's fault
+                    if not any(a.running for a in attempts if a is not attempt and not a.abandoned):
+                        if len(attempts) == len(candidates):
+                            raise item
+                        send_next("failover")
+                    continue
+                if winner is None:
+                    winner = attempt
+                    metrics.inc("router_wins_total", backend=attempt.backend.name, kind=kind)
+                    if cancel_token is not None:
+                        cancel_token.mark_sent()  # it's streaming, too late to supersede (for backends that don't mark it themselves)
+                    for other in attempts:
+                        if other is not winner:
+                            other.abandon()
+                if item is _DONE:
+                    if on_done is not None:
+                        on_done(winner.backend.interact, "".join(texts))
+                    return
+                texts.append(item)
+                yield item
+        finally:
+            for attempt in attempts:  # e.g. the caller stopped reading
+                if attempt is not winner or attempt.running:
+                    attempt.abandon()
+
+    def _ai_detect_object(
+        self,
+        images: List[Union[EncodedImage, str]],
+        custom_base_prompt: str = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancelToken = None
+    ) -> GeneratorType:
+        yield from self._route(
+            KIND_VISION,
+            lambda backend, token: backend._ai_detect_object(images, custom_base_prompt, priority, token),
+            cancel_token,
+            lambda interact, response: self._record_detect(interact, response, custom_base_prompt)
+        )
+
+    def _record_detect(self, interact: AIStreamInteractBase, response: str, custom_base_prompt: str = None) -> None:
+        if hasattr(interact, "_chat_session"):
+            interact._chat_session.append_detect(response, custom_base_prompt)
+
+    def _record_turn(self, interact: AIStreamInteractBase, prompt: str, response: str) -> None:
+        if hasattr(interact, "_chat_session"):
+            interact._chat_session.append_turn(prompt, response)
+
+    def _ai_interactive_mode(self, prompt: str, cancel_token: CancelToken = None) -> GeneratorType:
+        yield from self._route(
+            KIND_TEXT,
+            lambda backend, token: backend._ai_interactive_mode(prompt, token),
+            cancel_token,
+            lambda interact, response: self._record_turn(interact, prompt, response)
+        )
+
+    def _repair_detect_output(self, raw_output: str) -> str:
+        return "".join(self._route(KIND_TEXT, lambda backend, token: [backend._repair_detect_output(raw_output)]))
+
+    def router_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Moving averages & bench status per backend."""
+        return {backend.name: backend.stats.summary() for backend in self.registry.backends}
+
+    def show_metrics_summary(self) -> None:
+        """Same as the base metrics panel followed by the router's view of each backend."""
+        super().show_metrics_summary()
+        backends = Table("backend", "kinds", "requests", "ttft ewma", "error rate ewma", "benched for", title="Backends", title_justify="left")
+        for backend in self.registry.backends:
+            summary = backend.stats.summary()
+            backends.add_row(
+                backend.name,
+                ", ".join(backend.kinds),
+                str(summary["requests"]),
+                "-" if summary["latency"] is None else f"{summary['latency']:.3f}s",
+                f"{summary['error_rate']:.3f}",
+                f"{summary['benched_for']:.0f}s" if summary["benched_for"] else "-"
+            )
+        self._console_interface.print(backends)
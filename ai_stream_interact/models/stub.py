@@ -0,0 +1,112 @@
+import time
+import random
+import hashlib
+from dataclasses import dataclass
+from types import GeneratorType
+from typing import Dict, List, Union
+
+from ai_stream_interact.utils.img_utils import EncodedImage
+from ai_stream_interact.utils.rate_limiter import CancelToken, RequestCancelled, PRIORITY_INTERACTIVE
+from ai_stream_interact.utils.session_log import RecordedDetect, _image_digest, _request_key
+from ai_stream_interact.base.ai_interact_base import AIStreamInteractBase, InteractionFramesConfig
+
+PRELOAD_MODULES = []
+
+
+@dataclass
+class StubConfig:
+    first_chunk_latency: float = 0.2  # n seconds
+    chunk_interval: float = 0.02  # n seconds between streamed chunks
+    words_per_chunk: int = 3
+    error_rate: float = 0.0  # 0-1 share of detects failing, like a flaky endpoint
+    seed: int = 0
+
+
+class ModelInteract(AIStreamInteractBase):
+    """Offline stand in for a real model with deterministic responses, e.g. for CI & benchmarks."""
+
+    _requires_api_key = False
+
+    def __init__(
+        self,
+        interaction_frames_config: InteractionFramesConfig,
+        stub_config: StubConfig = None,
+        **kwargs
+    ) -> None:
+        super().__init__(interaction_frames_config=interaction_frames_config, **kwargs)
+        self._stub_config = stub_config or StubConfig()
+        self._random = random.Random(self._stub_config.seed)
+        self._api_key_dot_env_name = None
+        self._recorded_responses: Dict[str, RecordedDetect] = {}
+        self._replay_speed = 1.0
+
+    def replay_recorded_responses(self, responses: Dict[str, RecordedDetect], speed: float = 1.0) -> None:
+        """Answers recorded detects with their recorded responses at their chunk timings sped up speed times."""
+        self._recorded_responses = responses
+        self._replay_speed = speed
+
+    def _ai_auth(self, api_key: str = None) -> None:
+        pass
+
+    def _stream_words(self, text: str) -> GeneratorType:
+        config = self._stub_config
+        time.sleep(config.first_chunk_latency)
+        words = text.split(" ")
+        for i in range(0, len(words), config.words_per_chunk):
+            if i:
+                time.sleep(config.chunk_interval)
+            yield " ".join(words[i:i + config.words_per_chunk]) + (" " if i + config.words_per_chunk < len(words) else "")
+
+    def _stream_recorded(self, recorded: RecordedDetect) -> GeneratorType:
+        started_at = time.monotonic()
+        for offset, chunk in recorded.chunks:
+            if self._replay_speed:
+                time.sleep(max(0.0, started_at + offset / self._replay_speed - time.monotonic()))
+            yield chunk
+
+    def _ai_interact(self, prompt: Union[str, list], **kwargs) -> str:
+        return "".join(self._stream_words(f"Stub response to: {prompt if isinstance(prompt, str) else ' '.join(map(str, prompt))}"))
+
+    def _ai_interactive_mode(self, prompt: str, cancel_token: CancelToken = None) -> GeneratorType:
+        if cancel_token is not None and not cancel_token.mark_sent():
+            raise RequestCancelled("Cancelled before it was sent")
+        yield from self._stream_words(f"Stub response to: {prompt}")
+
+    def _repair_detect_output(self, raw_output: str) -> str:
+        return "".join(self._stream_words(
+            f"Object Detected: {raw_output.strip().splitlines()[0]}\n"
+            "Detailed Description: Stub repair of a malformed detect response.\n"
+            "Confidence Level: 0.5"
+        ))
+
+    def _ai_detect_object(
+        self,
+        images: List[Union[EncodedImage, str]],
+        custom_base_prompt: str = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancelToken = None
+    ) -> GeneratorType:
+        """Fake detect whose answer is a digest of the prompt & images, or the recorded response if any."""
+        if cancel_token is not None and not cancel_token.mark_sent():  # no rate limiter thus it's sent right away
+            raise RequestCancelled("Cancelled before it was sent")
+        if self._stub_config.error_rate and self._random.random() < self._stub_config.error_rate:
+            raise ConnectionError("Stub endpoint error")
+        if self._recorded_responses:
+            image_digests = [_image_digest(image) for image in images if not isinstance(image, str)]
+            recorded = self._recorded_responses.get(_request_key(custom_base_prompt, image_digests))
+            if recorded is not None:
+                yield from self._stream_recorded(recorded)
+                return
+        digest = hashlib.sha1((custom_base_prompt or "").encode())
+        nimages = 0
+        for image in images:
+            if isinstance(image, str):
+                digest.update(image.encode())
+            else:
+                digest.update(image["data"])
+                nimages += 1
+        yield from self._stream_words(
+            f"Object Detected: stub-object-{digest.hexdigest()[:8]}\n"
+            f"Detailed Description: Stub detection over {nimages} images.\n"
+            "Confidence Level: 0.5"
+        )
@@ -0,0 +1,111 @@
+import threading
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from ai_stream_interact.utils.lazy_import import lazy_import
+from ai_stream_interact.sources import FrameSource
+from ai_stream_interact.utils.frame_buffer import BufferedFrame
+from ai_stream_interact.utils.shared_frames import FrameRef
+from ai_stream_interact.streamer import Streamer, _quit_on_key
+
+cv2 = lazy_import("cv2")
+
+
+def _parse_cam_indexes(cam_indexes: str) -> List[Union[int, str]]:
+    """'0, 2' -> [0, 2]. Anything that isn't an int (e.g. a video file path) is passed to opencv as is."""
+    return [int(cam) if cam.strip().isdigit() else cam.strip() for cam in str(cam_indexes).split(",") if cam.strip()]
+
+
+class MultiStreamer:
+    """Streams several cameras at once, matching their frames up by capture timestamp."""
+
+    def __init__(
+        self,
+        cam_indexes: Sequence[Union[int, str, FrameSource]],
+        buffer_size: int = 64,
+        headless: bool = False,
+        names: Sequence[str] = None,
+        shared_memory: bool = False
+    ) -> None:
+        names = names or [str(cam_index) for cam_index in cam_indexes]
+        self._headless = headless
+        self.streamers: Dict[str, Streamer] = {
+            name: Streamer(cam_index, buffer_size, window_name=f"video {name}", headless=headless, shared_memory=shared_memory)
+            for name, cam_index in zip(names, cam_indexes)
+        }
+        self._primary = next(iter(self.streamers.values()))
+
+    @property
+    def camera_names(self) -> List[str]:
+        return list(self.streamers)
+
+    @property
+    def _success(self) -> bool:
+        return all(streamer._success for streamer in self.streamers.values())
+
+    @property
+    def _video_stream_is_stopped(self) -> bool:
+        return all(streamer._video_stream_is_stopped for streamer in self.streamers.values())
+
+    @property
+    def _frame(self) -> np.ndarray:
+        """Most recent frame from the primary (first) camera."""
+        return self._primary._frame
+
+    def get_latest_frame(self) -> BufferedFrame:
+        """Most recent frame from the primary (first) camera, used e.g. for scene change detection."""
+        return self._primary.get_latest_frame()
+
+    def get_recent_frames(self, duration: float, max_frames: int = None) -> List[np.ndarray]:
+        return self._primary.get_recent_frames(duration, max_frames)
+
+    def _sync_time(self) -> float:
+        """Latest moment every camera has a frame for i.e. the oldest of the cameras' latest capture timestamps."""
+        latest = [streamer.get_latest_frame() for streamer in self.streamers.values()]
+        return min(buffered.timestamp for buffered in latest) if all(latest) else None
+
+    def get_synchronized_frames(self, nframes: int, interval: float) -> Dict[str, List[np.ndarray]]:
+        """nframes per camera (oldest first) spaced ~interval seconds apart, all ending at the same moment across cameras."""
+        end_time = self._sync_time()
+        return {name: streamer.get_spaced_frames(nframes, interval, end_time) for name, streamer in self.streamers.items()}
+
+    def get_synchronized_refs(self, nframes: int, interval: float) -> Dict[str, List[FrameRef]]:
+        """Same frames as get_synchronized_frames but pinned in the cameras' shared memory ring buffers instead of copied."""
+        end_time = self._sync_time()
+        return {name: streamer.get_spaced_refs(nframes, interval, end_time) for name, streamer in self.streamers.items()}
+
+    def get_spaced_frames(self, nframes: int, interval: float) -> List[np.ndarray]:
+        """Synchronized frames of every camera flattened in camera order."""
+        return [frame for frames in self.get_synchronized_frames(nframes, interval).values() for frame in frames]
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Capture fps & dropped frames per camera."""
+        return {name: streamer.metrics() for name, streamer in self.streamers.items()}
+
+    def start_video_stream(self) -> None:
+        for streamer in self.streamers.values():
+            streamer.start_video_stream(display=False)
+        if not self._headless:
+            threading.Thread(target=self._display, args=()).start()
+
+    def _display(self) -> None:
+        """Shows each camera in its own window. opencv windows are driven from this one thread since highgui isn't thread safe."""
+        shown_frame_ids = {}
+        while not self._video_stream_is_stopped:
+            for name, streamer in self.streamers.items():
+                if streamer._frames is None or streamer._frames.latest_frame_id == shown_frame_ids.get(name):
+                    continue
+                latest = streamer.get_latest_frame()
+                if latest is not None:
+                    cv2.imshow(streamer._window_name, latest.frame)
+                    shown_frame_ids[name] = latest.frame_id
+            _quit_on_key(cv2.waitKey(1), list(self.streamers.values()))
+
+    def stop_video_stream(self) -> None:
+        for streamer in self.streamers.values():
+            streamer.stop_video_stream()
+
+    def close(self) -> None:
+        for streamer in self.streamers.values():
+            streamer.close()
@@ -0,0 +1,378 @@
+import time
+import queue
+import itertools
+import threading
+from collections import deque
+from types import GeneratorType
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ai_stream_interact.utils.metrics import metrics
+from ai_stream_interact.utils.shared_frames import FrameRef, _release_refs
+from ai_stream_interact.utils.rate_limiter import PRIORITY_INTERACTIVE, RequestCancelled
+
+
+# Queue policies when a stage's input queue is full
+QUEUE_POLICY_BLOCK = "block"  # the producer waits for room (backpressure)
+QUEUE_POLICY_DROP_OLDEST = "drop_oldest"  # the oldest queued item makes room
+
+_END_OF_STREAM = object()
+
+
+@dataclass
+class StageConfig:
+    queue_depth: int = 4  # max items waiting in front of the stage
+    policy: str = QUEUE_POLICY_BLOCK  # or QUEUE_POLICY_DROP_OLDEST
+    workers: int = 1  # number of worker threads
+
+
+@dataclass
+class PipelineConfig:
+    # stale detect requests are dropped if preprocessing can't keep up with key presses
+    preprocess: StageConfig = field(default_factory=lambda: StageConfig(queue_depth=4, policy=QUEUE_POLICY_DROP_OLDEST, workers=2))
+    # inference workers is the max number of detects in flight at once
+    inference: StageConfig = field(default_factory=lambda: StageConfig(queue_depth=4, policy=QUEUE_POLICY_BLOCK, workers=3))
+    # a single output worker so model outputs are presented one at a time & in order
+    output: StageConfig = field(default_factory=lambda: StageConfig(queue_depth=8, policy=QUEUE_POLICY_BLOCK, workers=1))
+    in_order: bool = False  # present outputs in submission order
+
+
+class StageQueue:
+    """Bounded FIFO queue that applies a block or drop_oldest policy when full."""
+
+    def __init__(self, maxsize: int, policy: str = QUEUE_POLICY_BLOCK) -> None:
+        if policy not in (QUEUE_POLICY_BLOCK, QUEUE_POLICY_DROP_OLDEST):
+            raise ValueError(f"Unknown queue policy {policy}")
+        self._policy = policy
+        self._items = deque()
+        self._maxsize = maxsize
+        self._not_empty = threading.Condition()
+        self._not_full = threading.Condition(self._not_empty)
+
+    def put(self, item: Any) -> Any:
+        """Enqueues an item. Returns the dropped item if one had to be discarded (drop_oldest policy only) else None."""
+        dropped = None
+        with self._not_full:
+            if self._policy == QUEUE_POLICY_BLOCK:
+                while len(self._items) >= self._maxsize:
+                    self._not_full.wait()
+            elif len(self._items) >= self._maxsize:
+                dropped = self._items.popleft()
+            self._items.append(item)
+            self._not_empty.notify()
+        return dropped
+
+    def get(self) -> Any:
+        with self._not_empty:
+            while not self._items:
+                self._not_empty.wait()
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def __len__(self) -> int:
+        with self._not_empty:
+            return len(self._items)
+
+
+class StageMetrics:
+    """Keeps counters & a window of recent queue wait / processing latencies (in seconds) for a stage."""
+
+    def __init__(self, window: int = 256) -> None:
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue_waits: Deque[float] = deque(maxlen=window)
+        self._process_times: Deque[float] = deque(maxlen=window)
+
+    def _record(self, queue_wait: float, process_time: float, error: bool = False) -> None:
+        with self._lock:
+            self.processed += 1
+            self.errors += int(error)
+            self._queue_waits.append(queue_wait)
+            self._process_times.append(process_time)
+
+    def _record_drop(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def summary(self) -> Dict[str, float]:
+        """Counters plus p50/p95 queue wait & processing latencies over the recent window."""
+        with self._lock:
+            queue_waits, process_times = list(self._queue_waits), list(self._process_times)
+            summary = {"processed": self.processed, "dropped": self.dropped, "errors": self.errors}
+        for name, values in (("queue_wait", queue_waits), ("process_time", process_times)):
+            p50, p95 = np.percentile(values, [50, 95]) if values else (0.0, 0.0)
+            summary[f"{name}_p50"] = float(p50)
+            summary[f"{name}_p95"] = float(p95)
+        return summary
+
+
+class Stage:
+    """Pipeline stage: a bounded input queue consumed by n worker threads, passing func's results downstream."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Any],
+        config: StageConfig,
+        downstream: "Stage" = None,
+        on_error: Callable[[Any, Exception], None] = None,
+        on_drop: Callable[[Any], None] = None
+    ) -> None:
+        self.name = name
+        self._func = func
+        self._config = config
+        self._downstream = downstream
+        self._on_error = on_error
+        self._on_drop = on_drop
+        self._queue = StageQueue(config.queue_depth, config.policy)
+        self._workers: List[threading.Thread] = []
+        self.metrics = StageMetrics()
+
+    def start(self) -> None:
+        for n in range(self._config.workers):
+            worker = threading.Thread(target=self._work, name=f"{self.name}-{n}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, item: Any) -> None:
+        dropped = self._queue.put((time.monotonic(), item))
+        if dropped is not None:
+            self.metrics._record_drop()
+            metrics.inc("pipeline_dropped_total", stage=self.name)
+            if self._on_drop:
+                self._on_drop(dropped[1])
+
+    def _work(self) -> None:
+        while True:
+            enqueued_at, item = self._queue.get()
+            started_at = time.monotonic()
+            metrics.observe("pipeline_queue_wait_seconds", started_at - enqueued_at, stage=self.name)
+            try:
+                with metrics.span("pipeline_process", stage=self.name):
+                    result = self._func(item)
+            except Exception as e:
+                self.metrics._record(started_at - enqueued_at, time.monotonic() - started_at, error=True)
+                if self._on_error:
+                    self._on_error(item, e)
+                continue
+            self.metrics._record(started_at - enqueued_at, time.monotonic() - started_at)
+            if result is not None and self._downstream is not None:
+                self._downstream.submit(result)
+
+
+@dataclass
+class DetectJob:
+    frames: List[Union[np.ndarray, FrameRef]]  # raw BGR frames or pinned refs
+    custom_base_prompt: Optional[str] = None
+    priority: int = PRIORITY_INTERACTIVE  # rate limiter lane of the model call
+    job_id: int = 0
+    submitted_at: float = field(default_factory=time.monotonic)
+    images: list = None  # model ready images, set by the preprocess stage
+    frame_hashes: List[int] = None  # perceptual hashes of frames
+    views: List[str] = None  # camera name per frame when running several cameras
+    prefilter_result: Any = None
+    result: Any = None  # parsed DetectionResult
+    chunks: queue.Queue = field(default_factory=queue.Queue)  # streamed model output
+    done: threading.Event = field(default_factory=threading.Event)  # presented, failed or dropped
+    done_at: float = None  # time.monotonic() the job was done at
+    inferring: bool = False  # set once the job reaches the inference stage
+    inferred: threading.Event = field(default_factory=threading.Event)
+
+
+def _iter_chunks(chunks: queue.Queue) -> GeneratorType:
+    """Yields streamed chunks as they arrive until end of stream, re-raising any inference error at the point it happened."""
+    while True:
+        chunk = chunks.get()
+        if chunk is _END_OF_STREAM:
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+
+def _has_frame_refs(job: DetectJob) -> bool:
+    return bool(job.frames) and isinstance(job.frames[0], FrameRef)
+
+
+def _finish(job: DetectJob) -> None:
+    if _has_frame_refs(job):  # e.g. dropped before preprocessing
+        _release_refs(job.frames)
+    job.done_at = time.monotonic()
+    if not job.inferring:
+        job.inferred.set()
+    job.done.set()
+
+
+class DetectPipeline:
+    """Runs detects off the key listener thread through preprocess -> inference -> output stages."""
+
+    def __init__(self, interact: Any, config: PipelineConfig = None) -> None:
+        self._interact = interact
+        self._config = config or PipelineConfig()
+        self._job_ids = itertools.count(1)
+        self._pending: List[DetectJob] = []
+        self._pending_lock = threading.Lock()
+        self._next_to_present = 1  # job id, in_order only
+        self._ready: Dict[int, Optional[DetectJob]] = {}  # None if skipped
+        self._ready_lock = threading.Lock()
+        self.output_stage = Stage("output", self._present, self._config.output, on_error=self._report_error)
+        self.inference_stage = Stage("inference", self._infer, self._config.inference, on_error=self._report_error)
+        self.preprocess_stage = Stage(
+            "preprocess",
+            self._preprocess,
+            self._config.preprocess,
+            downstream=self.inference_stage,
+            on_error=self._report_error,
+            on_drop=self._report_drop
+        )
+        self.stages = [self.preprocess_stage, self.inference_stage, self.output_stage]
+
+    def start(self) -> None:
+        for stage in self.stages:
+            stage.start()
+
+    def submit(
+        self,
+        frames: List[np.ndarray],
+        custom_base_prompt: str = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        views: List[str] = None,
+        images: list = None
+    ) -> DetectJob:
+        """Submits a detect on frames, sending images as is if given."""
+        job = DetectJob(
+            frames=frames,
+            custom_base_prompt=custom_base_prompt,
+            priority=priority,
+            job_id=next(self._job_ids),
+            images=images,
+            views=views
+        )
+        with self._pending_lock:
+            self._pending = [pending for pending in self._pending if not pending.done.is_set()]
+            self._pending.append(job)
+        self.preprocess_stage.submit(job)
+        return job
+
+    def drain(self, timeout: float = None) -> bool:
+        """Waits until every job submitted so far is presented, failed or dropped & inference is done with it. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_lock:
+            pending = list(self._pending)
+        for job in pending:
+            for event in (job.done, job.inferred):
+                if not event.wait(None if deadline is None else max(0.0, deadline - time.monotonic())):
+                    return False
+        return True
+
+    def metrics_summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage.name: stage.metrics.summary() for stage in self.stages}
+
+    def _preprocess(self, job: DetectJob) -> DetectJob:
+        if job.images is not None:
+            job.frame_hashes = self._interact._hash_prompt_frames(job.frames)
+        elif _has_frame_refs(job):
+            refs = job.frames
+            try:
+                job.images, job.frame_hashes = self._interact._frame_refs_to_prompt_imgs(refs, job.views)
+                # the prefilter still runs in process thus gets copies, the slots are unpinned right away either way
+                job.frames = [ref.frame.copy() for ref in refs] if self._interact._prefilter is not None else None
+            finally:
+                _release_refs(refs)
+        else:
+            job.images = self._interact._frames_to_prompt_imgs(job.frames, job.views)
+            job.frame_hashes = self._interact._hash_prompt_frames(job.frames)
+        job.prefilter_result = self._interact._prefilter_frames(job.frames)
+        return job
+
+    def _infer(self, job: DetectJob) -> None:
+        job.inferring = True
+        try:
+            self._infer_job(job)
+        finally:
+            job.inferred.set()
+
+    def _hand_to_output(self, job: DetectJob, present: bool = True) -> None:
+        """Submits the job to the output stage (unless present is False i.e. it's done before inference), in job id order if in_order."""
+        if not self._config.in_order:
+            if present:
+                self.output_stage.submit(job)
+            return
+        with self._ready_lock:
+            self._ready[job.job_id] = job if present else None
+            while self._next_to_present in self._ready:
+                ready = self._ready.pop(self._next_to_present)
+                self._next_to_present += 1
+                if ready is not None:
+                    self.output_stage.submit(ready)
+
+    def _infer_job(self, job: DetectJob) -> None:
+        self._hand_to_output(job)
+        parser = self._interact._new_detect_parser(job.custom_base_prompt)
+        started_at = time.monotonic()
+        response, error = [], None
+        try:
+            chunks = self._interact._ai_detect_object_prefiltered(
+                job.images,
+                job.custom_base_prompt,
+                job.frame_hashes,
+                job.priority,
+                job.prefilter_result,
+                supersede=True
+            )
+            for chunk in chunks:
+                job.chunks.put(chunk)
+                response.append((time.monotonic() - started_at, chunk))
+                if parser is not None:
+                    parser.feed(chunk)
+        except Exception as e:
+            job.chunks.put(e)
+            parser, error = None, e
+        finally:
+            job.chunks.put(_END_OF_STREAM)
+        if parser is not None:  # after the end of stream so a repair call never holds up presenting the output
+            job.result = parser.close()
+        if self._interact._session_recorder is not None:
+            self._record(job, started_at, response, error)
+
+    def _record(self, job: DetectJob, started_at: float, response: List[Tuple[float, str]], error: Exception) -> None:
+        try:
+            self._interact._session_recorder.record_detect(
+                job.job_id,
+                job.submitted_at,
+                job.custom_base_prompt,
+                job.priority,
+                job.images,
+                job.views,
+                started_at - job.submitted_at,
+                response,
+                error,
+                job.result.to_dict() if job.result is not None else None
+            )
+        except Exception as e:  # e.g. a full disk, the detect itself went through
+            self._interact._console_warning.print(f"Unable to record detect #{job.job_id}: {e!r}")
+
+    def _present(self, job: DetectJob) -> None:
+        if job.views:
+            self._interact._console_interface.print(f"Detect #{job.job_id} from camera {', '.join(dict.fromkeys(job.views))}:")
+        self._interact._present_model_output(_iter_chunks(job.chunks))
+        _finish(job)
+
+    def _report_error(self, job: DetectJob, error: Exception) -> None:
+        if isinstance(error, RequestCancelled):
+            self._interact._console_warning.print(f"Detect #{job.job_id} superseded by a newer detect.")
+        else:
+            self._interact._console_warning.print(f"Detect #{job.job_id} failed: {error!r}")
+        if not job.inferring:
+            self._hand_to_output(job, present=False)
+        _finish(job)
+
+    def _report_drop(self, job: DetectJob) -> None:
+        self._interact._console_warning.print(f"Detect #{job.job_id} dropped as newer detects are queued.")
+        self._hand_to_output(job, present=False)
+        _finish(job)
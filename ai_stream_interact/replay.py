@@ -0,0 +1,104 @@
+import json
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ai_stream_interact.pipeline import DetectJob, DetectPipeline, PipelineConfig
+from ai_stream_interact.utils.img_utils import _video_to_frames
+from ai_stream_interact.utils.lazy_import import lazy_import
+from ai_stream_interact.utils.session_log import RecordedDetect, SessionLog
+
+cv2 = lazy_import("cv2")
+
+
+@dataclass
+class ReplayConfig:
+    session: str  # session directory written with --record-session
+    speed: float = 1.0  # 0 is as fast as possible
+    output: str = None  # optional jsonl report
+    timeout: float = None  # n seconds to wait for the last detects
+
+
+def _decode_images(images: List[Any]) -> List[np.ndarray]:
+    """BGR frames of the encoded images (& video clips) of a prompt, text parts are skipped."""
+    frames = []
+    for image in images:
+        if isinstance(image, str):
+            continue
+        if image["mime_type"].startswith("video/"):
+            frames.extend(_video_to_frames(image))
+        else:
+            frames.append(cv2.imdecode(np.frombuffer(image["data"], np.uint8), cv2.IMREAD_COLOR))
+    return frames
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if values else (0.0, 0.0, 0.0)
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+
+class ReplayRunner:
+    """Feeds a recorded session back through the detect pipeline at its recorded times."""
+
+    def __init__(self, interact: Any, config: ReplayConfig) -> None:
+        self._interact = interact
+        self._config = config
+
+    def _report(self, recorded: RecordedDetect, job: DetectJob) -> Dict[str, Any]:
+        replayed_label = job.result.label if job.result is not None else None
+        recorded_label = (recorded.result or {}).get("label")
+        return {
+            "job_id": recorded.job_id,
+            "submitted_at": round(recorded.submitted_at, 4),
+            "recorded_latency": round(recorded.latency, 4),
+            "latency": round(job.done_at - job.submitted_at, 4) if job.done_at is not None else None,
+            "recorded_label": recorded_label,
+            "label": replayed_label,
+            "match": recorded_label == replayed_label,
+            "recorded_error": recorded.error,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        config = self._config
+        log = SessionLog(config.session)
+        if hasattr(self._interact, "replay_recorded_responses"):
+            self._interact.replay_recorded_responses(log.responses(), config.speed)
+        else:
+            self._interact._console_warning.print("This backend can't replay recorded responses, detects are answered live.")
+        # outputs are presented in the recorded order whatever order the detects get through preprocessing & inference
+        pipeline = DetectPipeline(self._interact, replace(self._interact._pipeline_config or PipelineConfig(), in_order=True))
+        self._interact._detect_pipeline = pipeline
+        pipeline.start()
+        self._interact._console_interface.print(f"Replaying {len(log.detects)} detects at {config.speed:g}x...")
+        jobs = []
+        started_at = time.monotonic()
+        for recorded in log.detects:
+            images = log.images(recorded)
+            frames = _decode_images(images)  # for the response cache, single flight & prefilter, the images themselves are sent as is
+            if config.speed:
+                time.sleep(max(0.0, started_at + recorded.submitted_at / config.speed - time.monotonic()))
+            jobs.append(pipeline.submit(frames, recorded.custom_base_prompt, recorded.priority, recorded.views, images=images))
+        drained = pipeline.drain(config.timeout)
+        elapsed = time.monotonic() - started_at
+        reports = [self._report(recorded, job) for recorded, job in zip(log.detects, jobs)]
+        log.close()
+        if config.output:
+            with open(config.output, "w") as out:
+                for report in reports:
+                    out.write(json.dumps(report) + "\n")
+        summary = {
+            "detects": len(reports),
+            "drained": drained,
+            "elapsed": round(elapsed, 3),
+            "label_mismatches": sum(not report["match"] for report in reports),
+            "recorded_latency": _percentiles([report["recorded_latency"] for report in reports]),
+            "latency": _percentiles([report["latency"] for report in reports if report["latency"] is not None]),
+        }
+        self._interact._console_success.print(
+            f"Replayed {summary['detects']} detects in {summary['elapsed']:.1f}s, {summary['label_mismatches']} label mismatches. "
+            f"Latency p50/p95 {summary['latency']['p50']:.3f}/{summary['latency']['p95']:.3f}s "
+            f"(recorded {summary['recorded_latency']['p50']:.3f}/{summary['recorded_latency']['p95']:.3f}s)"
+        )
+        return summary
@@ -1,26 +1,338 @@
 import argparse
 import importlib
+import importlib.metadata
+from typing import Tuple, Union
 
-from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+# Only light imports up here so --help/--version & the first menu show up right away. Everything else is imported in main.
+
+
+def _get_version() -> str:
+    try:
+        return importlib.metadata.version("ai_stream_interact")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _parse_crop(crop: str) -> Union[str, Tuple[int, int, int, int]]:
+    """Parses the --crop flag, either "center" or "x,y,width,height"."""
+    if crop == "center":
+        return crop
+    try:
+        x, y, width, height = (int(value) for value in crop.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("crop must be 'center' or 'x,y,width,height'")
+    return x, y, width, height
 
 
 def main():
     parser = argparse.ArgumentParser("AI Stream Interact")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {_get_version()}")
     parser.add_argument(
         "--llm",
         type=str,
         required=True,
-        help="LLM to use, this should match the LLM name in ai_stream_interact/models"
+        help="LLM to use, this should match the LLM name in ai_stream_interact/models. 'router' spreads requests over several backends."
+    )
+    parser.add_argument(
+        "--text-model",
+        type=str,
+        help="Name of the model used for chat, for backends that take model names (e.g. gemini-pro for gemini)."
+    )
+    parser.add_argument(
+        "--vision-model",
+        type=str,
+        help="Name of the model used for detects, for backends that take model names (e.g. gemini-pro-vision for gemini)."
+    )
+    parser.add_argument(
+        "--router-config",
+        type=str,
+        help="With --llm router, json file listing the backends to route over in order of preference & the hedging/failover settings."
     )
     parser.add_argument(
         "--tts-model-name",
         type=str,
         help="Name of tts model to use. Use tts --list_models to see available models."
     )
+    parser.add_argument(
+        "--auto-detect-dwell-time",
+        type=float,
+        default=1.0,
+        help="In auto detect mode, n seconds a changed scene must stay still before it's detected."
+    )
+    parser.add_argument(
+        "--auto-detect-change-threshold",
+        type=float,
+        default=12.0,
+        help="In auto detect mode, mean grayscale pixel difference (0-255) from the last detected scene that counts as a scene change."
+    )
+    parser.add_argument(
+        "--no-response-cache",
+        action="store_true",
+        help="Always call the model on detect instead of replaying cached responses for repeat scenes."
+    )
+    parser.add_argument(
+        "--response-cache-db",
+        type=str,
+        help="Path to a sqlite file to persist the detect response cache across sessions."
+    )
+    parser.add_argument(
+        "--no-single-flight",
+        action="store_true",
+        help="Call the model for every detect even if the same one is already in flight & never cancel queued detects."
+    )
+    parser.add_argument(
+        "--frame-selection-window",
+        type=float,
+        help="If set, detect picks the sharpest & most varied frames out of the last n seconds of the stream instead of frames at a fixed interval."
+    )
+    parser.add_argument(
+        "--max-edge",
+        type=int,
+        help="Downscale frames so their longest edge is at most n pixels before sending them to the model."
+    )
+    parser.add_argument(
+        "--crop",
+        type=_parse_crop,
+        help="Crop frames before sending them to the model, either 'center' (square) or a region of interest as 'x,y,width,height'."
+    )
+    parser.add_argument(
+        "--img-format",
+        type=str,
+        default="jpeg",
+        choices=["jpeg", "png", "webp"],
+        help="Encoding used for frames sent to the model."
+    )
+    parser.add_argument(
+        "--img-quality",
+        type=int,
+        default=90,
+        help="0-100 encoding quality of frames sent to the model."
+    )
+    parser.add_argument(
+        "--encoder-processes",
+        type=int,
+        default=0,
+        help="Encode detect frames in n worker processes reading them straight out of shared memory capture buffers (e.g. for several cameras)."
+    )
+    parser.add_argument(
+        "--clip-mode",
+        type=str,
+        choices=["mosaic", "video"],
+        help="Detect on the last --clip-duration seconds sent as a single contact sheet image (mosaic) or a short video clip instead of 3 stills."
+    )
+    parser.add_argument(
+        "--clip-duration",
+        type=float,
+        default=3.0,
+        help="n seconds of stream history in a clip."
+    )
+    parser.add_argument(
+        "--clip-frames",
+        type=int,
+        default=9,
+        help="Number of frames sampled evenly over the clip duration."
+    )
+    parser.add_argument(
+        "--clip-max-edge",
+        type=int,
+        default=1024,
+        help="Longest edge in pixels of clip mosaics & video frames."
+    )
+    parser.add_argument(
+        "--clip-delta",
+        action="store_true",
+        help="In mosaic clip mode, tiles after the first only show what changed since the previous frame (the rest is gray) to save bytes."
+    )
+    parser.add_argument(
+        "--clip-video-format",
+        type=str,
+        default="webm",
+        choices=["webm", "mp4"],
+        help="Encoding of video clips."
+    )
+    parser.add_argument(
+        "--multi-camera-mode",
+        type=str,
+        default="multiview",
+        choices=["multiview", "fanout"],
+        help="When streaming from several cameras (e.g. cam index 0,2) either send a single multi-view detect or one detect per camera."
+    )
+    parser.add_argument(
+        "--source",
+        type=str,
+        action="append",
+        help=(
+            "Video source instead of prompting for a cam index: a cam index, a video file, a directory of images, an rtsp:// url "
+            "or synthetic[:WIDTHxHEIGHT][@FPS][:NFRAMES]. Repeat the flag to stream from several sources."
+        )
+    )
+    parser.add_argument(
+        "--source-speed",
+        type=float,
+        default=1.0,
+        help="Playback speed of recorded sources (video files, image directories & synthetic) relative to real time, 0 plays them as fast as possible."
+    )
+    parser.add_argument(
+        "--loop-source",
+        action="store_true",
+        help="Restart recorded sources once they end instead of stopping the stream."
+    )
+    parser.add_argument(
+        "--prefilter-model",
+        type=str,
+        help="Path to an onnx image classifier run locally before each detect. Confident detects are answered locally, otherwise its labels are passed to the model as hints."
+    )
+    parser.add_argument(
+        "--prefilter-labels",
+        type=str,
+        help="Text file with the prefilter model's class labels, one per line."
+    )
+    parser.add_argument(
+        "--prefilter-confidence",
+        type=float,
+        default=0.9,
+        help="Min confidence of the prefilter model's top label for a detect to be answered locally."
+    )
+    parser.add_argument(
+        "--skip-blank-frames",
+        action="store_true",
+        help="Answer detects on blank frames (e.g. covered lens) locally instead of calling the model."
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        help="Periodically dump latency histograms & counters to this file, as json if it ends with .json else in Prometheus text format."
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve latency histograms & counters at http://127.0.0.1:<port>/metrics (Prometheus text) & /metrics.json."
+    )
+    parser.add_argument(
+        "--record-session",
+        type=str,
+        help="Directory to log every detect's frames, prompt & streamed response (with chunk timings) to, for the replay command."
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Don't open any video window. In auto mode the app exits once a recorded source ends."
+    )
+
+    subparsers = parser.add_subparsers(dest="command", help="Runs the interactive app if no command is given.")
+    batch_parser = subparsers.add_parser("batch", help="Detect objects in recorded footage offline & write the results to jsonl.")
+    batch_parser.add_argument(
+        "--input",
+        type=str,
+        required=True,
+        help="Video file, directory of images or any other --source spec to detect objects in."
+    )
+    batch_parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="Results jsonl file. Rerunning with the same output resumes from the windows already done."
+    )
+    batch_parser.add_argument(
+        "--window-mode",
+        type=str,
+        default="scene",
+        choices=["scene", "stride"],
+        help="Detect whenever the scene changes & then settles (same as auto mode) or every --stride seconds of footage."
+    )
+    batch_parser.add_argument(
+        "--stride",
+        type=float,
+        default=5.0,
+        help="n seconds of footage between detects in stride window mode."
+    )
+    batch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Max detects in flight, the model's rate limits still apply."
+    )
+    batch_parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Reuse cached responses for windows showing a repeat scene instead of labelling every window with the model."
+    )
+    batch_parser.add_argument(
+        "--prompt",
+        type=str,
+        help="Custom base prompt to detect with instead of the default one."
+    )
+    replay_parser = subparsers.add_parser(
+        "replay",
+        help="Replay the detects of a recorded session through the detect pipeline, with the stub backend answering with the recorded responses."
+    )
+    replay_parser.add_argument(
+        "--session",
+        type=str,
+        required=True,
+        help="Session directory written with --record-session."
+    )
+    replay_parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay speed relative to the recording, 0 replays it as fast as possible."
+    )
+    replay_parser.add_argument(
+        "--output",
+        type=str,
+        help="Jsonl report comparing every replayed detect's latency & label to the recording."
+    )
 
     args = parser.parse_args()
 
-    interaction_frames_config = InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.4)
+    from ai_stream_interact.utils.lazy_import import preload_in_background
+    model_module = importlib.import_module(f"ai_stream_interact.models.{args.llm}")
+    # heavy modules load in the background while the user goes through the api key & cam index prompts
+    preload_in_background(["cv2", "pynput.keyboard", *getattr(model_module, "PRELOAD_MODULES", [])])
+
+    from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+    from ai_stream_interact.utils.scene_change import AutoDetectConfig
+    from ai_stream_interact.utils.response_cache import ResponseCacheConfig
+    from ai_stream_interact.sources import SourceConfig
+    from ai_stream_interact.utils.prefilter import PrefilterConfig
+    from ai_stream_interact.utils.metrics import metrics
+
+    if args.metrics_file:
+        metrics.export_periodically(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    interaction_frames_config = InteractionFramesConfig(
+        nframes_interact=3,
+        frame_capture_interval=0.4,
+        frame_selection_window=args.frame_selection_window,
+        img_format=args.img_format,
+        img_quality=args.img_quality,
+        max_edge=args.max_edge,
+        crop=args.crop,
+        encoder_processes=args.encoder_processes,
+        clip_mode=args.clip_mode,
+        clip_duration=args.clip_duration,
+        clip_frames=args.clip_frames,
+        clip_max_edge=args.clip_max_edge,
+        clip_delta=args.clip_delta,
+        clip_video_format=args.clip_video_format
+    )
+    auto_detect_config = AutoDetectConfig(
+        dwell_time=args.auto_detect_dwell_time,
+        change_threshold=args.auto_detect_change_threshold
+    )
+    response_cache_config = ResponseCacheConfig(sqlite_path=args.response_cache_db)
+    prefilter_config = None
+    if args.prefilter_model or args.skip_blank_frames:
+        prefilter_config = PrefilterConfig(
+            model_path=args.prefilter_model,
+            labels_path=args.prefilter_labels,
+            answer_confidence=args.prefilter_confidence,
+            empty_frames=args.skip_blank_frames
+        )
+    source_config = SourceConfig(sources=args.source, headless=args.headless, speed=args.source_speed, loop=args.loop_source)
 
     if args.tts_model_name:
         if args.tts_model_name.lower() == "default":
@@ -30,13 +342,66 @@ def main():
     else:
         tts_model_name = None
 
-    Interact = importlib.import_module(f"ai_stream_interact.models.{args.llm}").ModelInteract
+    model_kwargs = {}
+    if args.text_model or args.vision_model:
+        if not hasattr(model_module, "ModelsConfig"):
+            parser.error(f"--llm {args.llm} doesn't take model names")
+        default_models = model_module.ModelsConfig()
+        model_kwargs["models_config"] = model_module.ModelsConfig(
+            text_model=args.text_model or default_models.text_model,
+            vision_model=args.vision_model or default_models.vision_model
+        )
+    if args.router_config:
+        if args.llm != "router":
+            parser.error("--router-config only applies to --llm router")
+        model_kwargs["router_config"] = model_module.load_router_config(args.router_config)
+
+    use_response_cache = not args.no_response_cache
+    if args.command == "batch":  # every window is labelled by the model unless asked otherwise
+        use_response_cache = use_response_cache and args.response_cache
+
+    Interact = model_module.ModelInteract
 
     llm_interact = Interact(
         interaction_frames_config=interaction_frames_config,
-        tts_model_name=tts_model_name
+        tts_model_name=tts_model_name,
+        auto_detect_config=auto_detect_config,
+        response_cache_config=response_cache_config,
+        use_response_cache=use_response_cache,
+        use_single_flight=not args.no_single_flight,
+        multi_camera_mode=args.multi_camera_mode,
+        source_config=source_config,
+        prefilter_config=prefilter_config,
+        record_session=args.record_session,
+        **model_kwargs
     )
-    llm_interact.start()
+    if args.command == "batch":
+        from ai_stream_interact.batch import BatchConfig, BatchRunner
+        llm_interact._authenticate(prompt_for_key=False)
+        batch_config = BatchConfig(
+            input=args.input,
+            output=args.output,
+            window_mode=args.window_mode,
+            stride=args.stride,
+            workers=args.workers,
+            custom_base_prompt=args.prompt
+        )
+        BatchRunner(llm_interact, batch_config).run()
+        llm_interact.show_metrics_summary()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+        return
+    if args.command == "replay":
+        from ai_stream_interact.replay import ReplayConfig, ReplayRunner
+        llm_interact._authenticate(prompt_for_key=False)
+        ReplayRunner(llm_interact, ReplayConfig(session=args.session, speed=args.speed, output=args.output)).run()
+        llm_interact.show_metrics_summary()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+        return
+    llm_interact.start()  # only returns once a headless source ended, the app quits right away otherwise
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
 
 
 if __name__ == '__main__':
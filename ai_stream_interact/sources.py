@@ -0,0 +1,231 @@
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+
+from ai_stream_interact.utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+IMG_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+
+
+@dataclass
+class SourceConfig:
+    sources: List[str] = None  # see open_source, prompted for if None
+    headless: bool = False  # no video windows, e.g. to run on a server or in CI
+    speed: float = 1.0  # of recorded sources, 0 is as fast as possible
+    loop: bool = False  # restart recorded sources once they end
+
+
+class FrameSource:
+    """A stream of BGR frames, read like a cv2.VideoCapture & timestamped in seconds."""
+
+    def __init__(self) -> None:
+        self.timestamp: float = None
+        self.exhausted = False
+
+    def read(self, out: np.ndarray = None) -> Tuple[bool, np.ndarray]:
+        """To be implemented per source."""
+        raise NotImplementedError()
+
+    def release(self) -> None:
+        pass
+
+    def restart_clock(self) -> None:
+        """Paces the frames read from now on as if playback started now, e.g. once capture starts after the menus. No-op for live sources."""
+
+    def __iter__(self) -> Iterator[Tuple[float, np.ndarray]]:
+        """(timestamp, frame) pairs until the source runs out."""
+        while True:
+            ok, frame = self.read()
+            if not ok:
+                return
+            yield self.timestamp, frame
+
+
+class CameraSource(FrameSource):
+    """Live frames from a USB camera (by index) or a network stream (e.g. an rtsp:// url) read through opencv."""
+
+    def __init__(self, device: Union[int, str]) -> None:
+        super().__init__()
+        self.device = device
+        self.cap = cv2.VideoCapture(device)
+
+    def read(self, out: np.ndarray = None) -> Tuple[bool, np.ndarray]:
+        ok, frame = self.cap.read(out) if out is not None else self.cap.read()
+        self.timestamp = time.monotonic()
+        return ok and frame is not None, frame
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class _RecordedSource(FrameSource):
+    """Base for sources with their own timeline, paced to speed x real time (0 is as fast as possible)."""
+
+    def __init__(self, fps: float, speed: float = 1.0, loop: bool = False) -> None:
+        super().__init__()
+        self.fps = fps
+        self._speed = speed
+        self._loop = loop
+        self._frame_index = 0  # keeps counting up across loops
+        self._started_at = None
+        self._clock = None  # (monotonic time, frame index) pacing anchor
+
+    def _read_next(self, out: np.ndarray) -> Tuple[bool, np.ndarray]:
+        """To be implemented per source: the next frame or (False, None) at the end."""
+        raise NotImplementedError()
+
+    def _rewind(self) -> bool:
+        """To be implemented per source: go back to the first frame. Returns False if the source can't be rewound."""
+        return False
+
+    def read(self, out: np.ndarray = None) -> Tuple[bool, np.ndarray]:
+        if self.exhausted:
+            return False, None
+        ok, frame = self._read_next(out)
+        if not ok and self._loop and self._rewind():
+            ok, frame = self._read_next(out)
+        if not ok:
+            self.exhausted = True
+            return False, None
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+        if self._clock is None:
+            self._clock = (time.monotonic(), self._frame_index)
+        media_time = self._frame_index / self.fps
+        if self._speed:
+            clock_started_at, clock_frame_index = self._clock
+            delay = clock_started_at + (self._frame_index - clock_frame_index) / self.fps / self._speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self._frame_index += 1
+        self.timestamp = self._started_at + media_time
+        return True, frame
+
+    def restart_clock(self) -> None:
+        self._clock = None
+
+
+class VideoFileSource(_RecordedSource):
+    """Frames of a video file, played back at the file's own fps times speed."""
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False) -> None:
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        super().__init__(self.cap.get(cv2.CAP_PROP_FPS) or 30.0, speed, loop)
+
+    def _read_next(self, out: np.ndarray) -> Tuple[bool, np.ndarray]:
+        ok, frame = self.cap.read(out) if out is not None else self.cap.read()
+        return ok and frame is not None, frame
+
+    def _rewind(self) -> bool:
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class ImageDirectorySource(_RecordedSource):
+    """Images of a directory (sorted by file name) played back as frames at fps."""
+
+    def __init__(self, path: str, fps: float = 30.0, speed: float = 1.0, loop: bool = False) -> None:
+        super().__init__(fps, speed, loop)
+        self.path = path
+        self.files = sorted(name for name in os.listdir(path) if name.lower().endswith(IMG_EXTENSIONS))
+        self._position = 0
+
+    def _read_next(self, out: np.ndarray) -> Tuple[bool, np.ndarray]:
+        while self._position < len(self.files):
+            frame = cv2.imread(os.path.join(self.path, self.files[self._position]), cv2.IMREAD_COLOR)
+            self._position += 1
+            if frame is None:  # unreadable file, skip it
+                continue
+            if out is not None and out.shape == frame.shape:
+                out[...] = frame
+                return True, out
+            return True, frame
+        return False, None
+
+    def _rewind(self) -> bool:
+        self._position = 0
+        return bool(self.files)
+
+
+class SyntheticSource(_RecordedSource):
+    """Deterministic generated frames of a square sliding onto a random background per scene."""
+
+    def __init__(
+        self,
+        width: int = 640,
+        height: int = 480,
+        fps: float = 30.0,
+        nframes: int = None,
+        scene_length: int = 90,
+        seed: int = 0,
+        speed: float = 1.0,
+        loop: bool = False
+    ) -> None:
+        super().__init__(fps, speed, loop)
+        self.width, self.height = width, height
+        self.nframes = nframes  # None generates frames forever
+        self.scene_length = scene_length  # n frames per scene
+        self.seed = seed
+        self._position = 0
+
+    def _scene_colors(self, scene: int) -> Tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng((self.seed, scene))
+        return rng.integers(0, 256, 3, dtype=np.uint8), rng.integers(0, 256, 3, dtype=np.uint8)
+
+    def frame_at(self, index: int, out: np.ndarray = None) -> np.ndarray:
+        """The index-th frame, computed from the index alone."""
+        frame = out if out is not None and out.shape == (self.height, self.width, 3) else np.empty((self.height, self.width, 3), np.uint8)
+        scene, offset = divmod(index, self.scene_length)
+        background, foreground = self._scene_colors(scene)
+        frame[...] = background
+        size = max(1, min(self.width, self.height) // 4)
+        settle_at = max(1, self.scene_length // 3)
+        x = int((self.width - size) * min(offset, settle_at) / settle_at)
+        y = (self.height - size) // 2
+        frame[y:y + size, x:x + size] = foreground
+        return frame
+
+    def _read_next(self, out: np.ndarray) -> Tuple[bool, np.ndarray]:
+        if self.nframes is not None and self._position >= self.nframes:
+            return False, None
+        frame = self.frame_at(self._position, out)
+        self._position += 1
+        return True, frame
+
+    def _rewind(self) -> bool:
+        self._position = 0
+        return True
+
+
+def open_source(spec: Union[int, str, FrameSource], speed: float = 1.0, loop: bool = False) -> FrameSource:
+    """Opens a frame source from a cam index, url, synthetic[:WxH@FPS:NFRAMES] spec, image directory or video file."""
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or str(spec).strip().isdigit():
+        return CameraSource(int(spec))
+    spec = str(spec).strip()
+    if "://" in spec:
+        return CameraSource(spec)
+    synthetic = re.match(r"synthetic(?::(\d+)x(\d+))?(?:@(\d+(?:\.\d+)?))?(?::(\d+))?$", spec)
+    if synthetic:
+        width, height, fps, nframes = synthetic.groups()
+        return SyntheticSource(
+            int(width or 640),
+            int(height or 480),
+            float(fps or 30),
+            nframes=int(nframes) if nframes else None,
+            speed=speed,
+            loop=loop
+        )
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, speed=speed, loop=loop)
+    return VideoFileSource(spec, speed=speed, loop=loop)
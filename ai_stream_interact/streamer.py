@@ -1,32 +1,133 @@
 import os
-import cv2
 import threading
+from typing import Dict, List, Union
+
+import numpy as np
+
+from ai_stream_interact.utils.lazy_import import lazy_import
+from ai_stream_interact.utils.frame_buffer import FrameRingBuffer, BufferedFrame
+from ai_stream_interact.utils.shared_frames import FrameRef, SharedFrameRingBuffer
+from ai_stream_interact.sources import FrameSource, open_source
+
+cv2 = lazy_import("cv2")
+
+
+def _quit_on_key(key: int, streamers: List["Streamer"]) -> None:
+    """Stops the streams & exits the app if (q) was pressed on a video window."""
+    if key == ord("q") & 0xFF:
+        for streamer in streamers:
+            streamer.stop_video_stream()
+            streamer.close()
+        cv2.destroyAllWindows()
+        os._exit(1)
 
 
 class Streamer:
-    def __init__(self, cam_index: int) -> None:
-        """Streams video from a USB camera."""
+    def __init__(
+        self,
+        cam_index: Union[int, str, FrameSource],
+        buffer_size: int = 64,
+        window_name: str = "video",
+        headless: bool = False,
+        shared_memory: bool = False
+    ) -> None:
+        """Streams video from a frame source, keeping the last buffer_size frames in a ring buffer."""
         self._cam_index = cam_index
-        self.cap = cv2.VideoCapture(self._cam_index)
-        self._success, self._frame = self.cap.read()
+        self._window_name = window_name
+        self._headless = headless
+        self.source = open_source(cam_index)
+        self._success, frame = self.source.read()
         self._video_stream_is_stopped = True
+        self._dropped_frames = 0  # failed reads or no free slot
+        self._frames = None
+        self._capture_thread = None
+        if self._success:
+            ring_buffer = SharedFrameRingBuffer if shared_memory else FrameRingBuffer
+            self._frames = ring_buffer(buffer_size, frame.shape, frame.dtype)
+            self._frames.write(frame, self.source.timestamp)
 
-    def start_video_stream(self) -> None:
-        threading.Thread(target=self._run, args=()).start()
+    @property
+    def _frame(self) -> np.ndarray:
+        """Most recent captured frame (a copy that's safe to use from any thread)."""
+        latest = self.get_latest_frame()
+        return latest.frame if latest is not None else None
 
-    def _run(self) -> None:
+    def get_latest_frame(self) -> BufferedFrame:
+        """Most recent captured frame along with its capture timestamp & frame id."""
+        return self._frames.latest() if self._frames is not None else None
+
+    def get_spaced_frames(self, nframes: int, interval: float, end_time: float = None) -> List[np.ndarray]:
+        """Already captured frames (oldest first) spaced ~interval seconds apart, ending at end_time (the latest frame by default). Never blocks on capture."""
+        return [buffered.frame for buffered in self._frames.get_spaced(nframes, interval, end_time)]
+
+    def get_spaced_refs(self, nframes: int, interval: float, end_time: float = None) -> List[FrameRef]:
+        """Same frames as get_spaced_frames but pinned in the shared memory ring buffer instead of copied. Refs must be released once used."""
+        return self._frames.get_spaced_refs(nframes, interval, end_time)
+
+    def get_recent_frames(self, duration: float, max_frames: int = None) -> List[np.ndarray]:
+        """Already captured frames (oldest first) from the last duration seconds, evenly subsampled down to max_frames if set."""
+        return [buffered.frame for buffered in self._frames.get_window(duration, max_frames)]
+
+    def metrics(self) -> Dict[str, float]:
+        """Capture fps & number of dropped (failed to read or not stored) frames."""
+        return {"fps": self._frames.fps() if self._frames is not None else 0.0, "dropped_frames": self._dropped_frames}
+
+    def start_video_stream(self, display: bool = True) -> None:
+        """Starts the capture thread (camera -> ring buffer) & a separate display thread so slow consumers never stall capture."""
         self._video_stream_is_stopped = False
+        self.source.restart_clock()  # the first frame was read at startup, playback starts now rather than before the menus
+        # without a display thread the capture thread is what keeps a headless app running
+        self._capture_thread = threading.Thread(target=self._run, args=(), daemon=not self._headless)
+        self._capture_thread.start()
+        if display and not self._headless:
+            threading.Thread(target=self._display, args=()).start()
+
+    def _capture_frame(self) -> np.ndarray:
+        """Reads the next frame straight into the ring buffer's next slot. Returns the filled slot or None if the read failed."""
+        slot, view = self._frames._reserve_slot()
+        self._ret, frame = self.source.read(view)
+        if slot is None:  # every slot is pinned, the frame is still read so a live source doesn't fall behind
+            self._dropped_frames += 1
+            return None
+        if not self._ret or frame is None:
+            if not self.source.exhausted:
+                self._dropped_frames += 1
+            return None
+        if frame is not view:  # opencv reallocated e.g. the camera changed resolution
+            if frame.shape != view.shape:
+                self._dropped_frames += 1
+                return None
+            view[...] = frame
+        self._frames._commit_slot(slot, self.source.timestamp)
+        return view
+
+    def _run(self) -> None:
+        """Capture loop, only reads frames into the ring buffer."""
         while not self._video_stream_is_stopped:
-            if not self._success:
-                self._stop_video_stream()
+            if not self._success or self.source.exhausted:  # e.g. the end of a video file
+                self.stop_video_stream()
             else:
-                self._ret, self._frame = self.cap.read()
-                cv2.imshow("video", self._frame)
-                if cv2.waitKey(1) == ord("q") & 0xFF:
-                    self.stop_video_stream()
-                    self.cap.release()
-                    cv2.destroyWindow("video")
-                    os._exit(1)
+                self._capture_frame()
+
+    def _display(self) -> None:
+        """Display loop, shows each newly captured frame & polls the window for the quit key."""
+        shown_frame_id = None
+        while not self._video_stream_is_stopped:
+            latest = self._frames.latest() if self._frames.latest_frame_id != shown_frame_id else None
+            if latest is not None:
+                cv2.imshow(self._window_name, latest.frame)
+                shown_frame_id = latest.frame_id
+            _quit_on_key(cv2.waitKey(1), [self])
 
     def stop_video_stream(self) -> None:
         self._video_stream_is_stopped = True
+
+    def close(self) -> None:
+        """Stops capture & releases the frame source & the shared memory ring buffer if any."""
+        self.stop_video_stream()
+        if self._capture_thread is not None and self._capture_thread is not threading.current_thread():
+            self._capture_thread.join(1)
+        capturing = self._capture_thread is not None and self._capture_thread.is_alive()
+        self.source.release()
+        if isinstance(self._frames, SharedFrameRingBuffer):
+            self._frames.close(unmap=not capturing)
@@ -1 +1,6 @@
-from ai_stream_interact.tts.coqui_ai import TextToSpeechCoqui
+def __getattr__(name: str):
+    """TextToSpeechCoqui is imported lazily as importing torch & coqui is slow."""
+    if name == "TextToSpeechCoqui":
+        from ai_stream_interact.tts.coqui_ai import TextToSpeechCoqui
+        return TextToSpeechCoqui
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,23 +1,11 @@
-import os
 import queue
-import tempfile
-import subprocess
 
 import torch
+import numpy as np
 from TTS.api import TTS
 
 from ai_stream_interact.tts.printout_utils import supress_printouts
-
-
-def _play_sound_w_ffmpeg(file_path: str) -> None:
-    """Plays a file using ffmpeg. Requires ffmpeg to be installed."""
-    devnull = open(os.devnull, "w")
-    subprocess.run(
-        ["ffplay", "-nodisp", "-autoexit", file_path],
-        stdout=devnull,
-        stderr=devnull,
-        shell=False
-    )
+from ai_stream_interact.tts.streaming import StreamingSpeech, FFplayAudioSink
 
 
 class TextToSpeechCoqui:
@@ -28,18 +16,28 @@ class TextToSpeechCoqui:
         device = "cuda" if torch.cuda.is_available() else "cpu"
         with supress_printouts():
             self._tts = TTS(model_name).to(device)
-
-    def tts_from_queue(self, queue: queue.Queue) -> None:
-        """Runs self.tts_from_str on a queue of incoming stream of texts."""
-        while True:
-            text = queue.get()
-            with tempfile.TemporaryDirectory() as tmp:
-                file_path = os.path.join(tmp, "output.wav")
-                self.tts_from_str(text, file_path)
-
-    def tts_from_str(self, text: str, file_path: str) -> None:
-        """Converts text to a .wav sound file then plays the file."""
+        self._speech = StreamingSpeech(
+            synthesize=self._synthesize,
+            sink=FFplayAudioSink(self._tts.synthesizer.output_sample_rate)
+        )
+
+    @property
+    def metrics(self):
+        """Time to first audio & gaps between sentences."""
+        return self._speech.metrics
+
+    def _synthesize(self, text: str) -> np.ndarray:
+        """Synthesizes a sentence to in memory float samples."""
         # TODO the underlying printouts causes some weird behavior (even with supressing) where the user dialogue just freezes. Need to fix this later.
         with supress_printouts():
-            self._tts.tts_to_file(text, file_path=file_path)
-            _play_sound_w_ffmpeg(file_path)
+            return np.asarray(self._tts.tts(text), dtype=np.float32)
+
+    def tts_from_queue(self, queue: queue.Queue) -> None:
+        """Speaks a queue of incoming streamed text sentence by sentence. A None in the queue marks the end of a model output."""
+        self._speech.speak_from_queue(queue, end_of_utterance=None)
+
+    def tts_from_str(self, text: str, file_path: str = None) -> None:
+        """Speaks a text & returns once it's played. If file_path is given the speech is also saved there as a .wav file."""
+        samples = self._speech.speak([text])
+        if file_path and samples:
+            self._tts.synthesizer.save_wav(np.concatenate(samples), file_path)
@@ -0,0 +1,172 @@
+import re
+import time
+import queue
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List
+
+import numpy as np
+
+from ai_stream_interact.utils.metrics import metrics
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_END_OF_TEXT = object()
+
+
+class SentenceSegmenter:
+    """Re-segments streamed text fragments into whole sentences."""
+
+    def __init__(self, min_chars: int = 20) -> None:
+        self._min_chars = min_chars  # shorter sentences are merged
+        self._buffer = ""
+
+    def feed(self, text: str) -> Iterator[str]:
+        """Adds a fragment & yields every sentence it completed."""
+        self._buffer += text
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start:match.start()].strip()
+            if len(sentence) >= self._min_chars:
+                yield sentence
+                start = match.end()
+        self._buffer = self._buffer[start:]
+
+    def flush(self) -> Iterator[str]:
+        """Yields whatever text is left over once the stream ended."""
+        sentence, self._buffer = self._buffer.strip(), ""
+        if sentence:
+            yield sentence
+
+
+class FFplayAudioSink:
+    """Audio sink playing raw float32 mono pcm through a single ffplay process (requires ffmpeg)."""
+
+    def __init__(self, sample_rate: int) -> None:
+        self.sample_rate = sample_rate
+        self._process = None
+
+    def _ensure_started(self) -> None:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                [
+                    "ffplay", "-nodisp", "-loglevel", "quiet", "-fflags", "nobuffer",
+                    "-f", "f32le", "-ar", str(self.sample_rate), "-ac", "1", "-i", "pipe:0"
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                shell=False
+            )
+
+    def write(self, samples: np.ndarray) -> None:
+        self._ensure_started()
+        self._process.stdin.write(np.asarray(samples, dtype=np.float32).tobytes())
+        self._process.stdin.flush()
+
+    def close(self) -> None:
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+
+
+class SpeechMetrics:
+    """Time to first audio (first text fragment -> first audio written) & silent gaps between consecutive sentences, in seconds."""
+
+    def __init__(self, window: int = 256) -> None:
+        self._lock = threading.Lock()
+        self.time_to_first_audio: Deque[float] = deque(maxlen=window)
+        self.sentence_gaps: Deque[float] = deque(maxlen=window)
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            summary = {}
+            for name, values in (("time_to_first_audio", list(self.time_to_first_audio)), ("sentence_gap", list(self.sentence_gaps))):
+                p50, p95 = np.percentile(values, [50, 95]) if values else (0.0, 0.0)
+                summary[f"{name}_p50"] = float(p50)
+                summary[f"{name}_p95"] = float(p95)
+            return summary
+
+
+class StreamingSpeech:
+    """Streams text to speech sentence by sentence, synthesizing the next sentence while the current one plays."""
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], np.ndarray],
+        sink,
+        min_sentence_chars: int = 20,
+        max_pending_audio: int = 2
+    ) -> None:
+        self._synthesize = synthesize
+        self._sink = sink
+        self._min_sentence_chars = min_sentence_chars
+        self._max_pending_audio = max_pending_audio
+        self.metrics = SpeechMetrics()
+        self._playing_until = None
+
+    def speak_from_queue(self, text_queue: queue.Queue, end_of_utterance: object = None) -> None:
+        """Synthesizes text fragments from text_queue forever. Putting end_of_utterance flushes the current partial sentence."""
+        audio = queue.Queue(maxsize=self._max_pending_audio)
+        threading.Thread(target=self._play_forever, args=(audio,), daemon=True).start()
+        segmenter = SentenceSegmenter(self._min_sentence_chars)
+        in_utterance, utterance_started_at = False, None
+        while True:
+            text = text_queue.get()
+            if text is end_of_utterance:
+                self._synthesize_all(segmenter.flush(), utterance_started_at, audio)
+                in_utterance, utterance_started_at = False, None
+                continue
+            if not in_utterance:
+                in_utterance, utterance_started_at = True, time.monotonic()
+            utterance_started_at = self._synthesize_all(segmenter.feed(text), utterance_started_at, audio)
+
+    def speak(self, fragments: List[str]) -> List[np.ndarray]:
+        """Speaks a finite stream of text fragments, returns the audio of every sentence once everything is played."""
+        audio = queue.Queue(maxsize=self._max_pending_audio)
+        played = []
+        player = threading.Thread(target=self._play_until_end, args=(audio, played))
+        player.start()
+        segmenter = SentenceSegmenter(self._min_sentence_chars)
+        utterance_started_at = time.monotonic()
+        for fragment in fragments:
+            utterance_started_at = self._synthesize_all(segmenter.feed(fragment), utterance_started_at, audio)
+        self._synthesize_all(segmenter.flush(), utterance_started_at, audio)
+        audio.put(_END_OF_TEXT)
+        player.join()
+        return played
+
+    def _synthesize_all(self, sentences: Iterator[str], utterance_started_at: float, audio: queue.Queue) -> float:
+        """Synthesizes sentences & queues their audio for playback."""
+        for sentence in sentences:
+            with metrics.span("tts_synthesize"):
+                samples = self._synthesize(sentence)
+            audio.put((samples, utterance_started_at))
+            utterance_started_at = None
+        return utterance_started_at
+
+    def _play(self, samples: np.ndarray, utterance_started_at: float) -> None:
+        now = time.monotonic()
+        with self.metrics._lock:
+            if utterance_started_at is not None:
+                self.metrics.time_to_first_audio.append(now - utterance_started_at)
+                metrics.observe("tts_time_to_first_audio_seconds", now - utterance_started_at)
+            elif self._playing_until is not None:
+                self.metrics.sentence_gaps.append(max(0.0, now - self._playing_until))
+                metrics.observe("tts_sentence_gap_seconds", max(0.0, now - self._playing_until))
+        self._sink.write(samples)
+        self._playing_until = max(now, self._playing_until or now) + len(samples) / self._sink.sample_rate
+
+    def _play_forever(self, audio: queue.Queue) -> None:
+        while True:
+            self._play(*audio.get())
+
+    def _play_until_end(self, audio: queue.Queue, played: List[np.ndarray]) -> None:
+        while True:
+            item = audio.get()
+            if item is _END_OF_TEXT:
+                return
+            self._play(*item)
+            played.append(item[0])
@@ -0,0 +1,138 @@
+import re
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Tuple
+
+# Fields of a detect response, in the order the detect prompt asks for them
+FIELD_LABEL = "label"
+FIELD_DESCRIPTION = "description"
+FIELD_CONFIDENCE = "confidence"
+FIELDS = (FIELD_LABEL, FIELD_DESCRIPTION, FIELD_CONFIDENCE)
+
+_FIELD_HEADERS = {
+    "object detected": FIELD_LABEL,
+    "detailed description": FIELD_DESCRIPTION,
+    "confidence level": FIELD_CONFIDENCE,
+}
+# tolerates markdown the model sometimes adds e.g. "**Object Detected:** cup" or "- Object Detected: cup"
+_HEADER = re.compile(r"^[ \t*#>-]*(object detected|detailed description|confidence level)[ \t*]*:[ \t*]*", re.IGNORECASE | re.MULTILINE)
+_NUMBER = re.compile(r"\d*\.?\d+")
+_SINGLE_LINE_FIELDS = (FIELD_LABEL, FIELD_CONFIDENCE)
+
+REPAIR_PROMPT = """
+                The text below was supposed to be in the following format but isn't. Rewrite it in this format without any extra text:
+                Object Detected: <object identification goes here>
+                Detailed Description: <detailed description goes here>
+                Confidence Level: <a value between 0 and 1>
+
+                Text:
+                """
+
+
+@dataclass
+class DetectionResult:
+    label: str = None
+    description: str = None
+    confidence: float = None  # 0-1
+    repaired: bool = False
+
+    @property
+    def complete(self) -> bool:
+        return all(getattr(self, name) is not None for name in FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class FieldEvent:
+    name: str  # one of FIELDS
+    value: Any
+    result: DetectionResult  # everything parsed so far
+
+
+def _parse_confidence(text: str) -> float:
+    """'0.85', '85%' or '0.85 (high)' -> 0.85. None if there's no number."""
+    match = _NUMBER.search(text)
+    if match is None:
+        return None
+    value = float(match.group())
+    if "%" in text[match.end():match.end() + 2] or value > 1:
+        value /= 100
+    return min(max(value, 0.0), 1.0)
+
+
+def _split_fields(text: str, final: bool) -> List[Tuple[str, str]]:
+    """(field, value) of each complete field of text."""
+    headers = list(_HEADER.finditer(text))
+    fields = []
+    for i, header in enumerate(headers):
+        name = _FIELD_HEADERS[header.group(1).lower()]
+        end = headers[i + 1].start() if i + 1 < len(headers) else None
+        value = text[header.end():end]
+        if end is None and not final:
+            if name not in _SINGLE_LINE_FIELDS or "\n" not in value.lstrip():
+                continue
+            value = value.lstrip().split("\n", 1)[0]
+        fields.append((name, value.strip().strip("*").strip()))
+    return fields
+
+
+class DetectResponseParser:
+    """Incremental parser of streamed detect responses, firing on_event as each field completes."""
+
+    def __init__(
+        self,
+        on_event: Callable[[FieldEvent], None] = None,
+        repair: Callable[[str], str] = None,
+        max_repairs: int = 1
+    ) -> None:
+        self._on_event = on_event
+        self._repair = repair  # raw output -> rewritten output
+        self._max_repairs = max_repairs
+        self._text = ""
+        self.result = DetectionResult()
+
+    def _apply(self, fields: List[Tuple[str, str]]) -> List[FieldEvent]:
+        events = []
+        for name, value in fields:
+            if getattr(self.result, name) is not None:  # first occurrence wins
+                continue
+            value = _parse_confidence(value) if name == FIELD_CONFIDENCE else (value or None)
+            if value is None:
+                continue
+            setattr(self.result, name, value)
+            events.append(FieldEvent(name, value, self.result))
+            if self._on_event:
+                self._on_event(events[-1])
+        return events
+
+    def feed(self, chunk: str) -> List[FieldEvent]:
+        self._text += chunk
+        return self._apply(_split_fields(self._text, final=False))
+
+    def _heuristic(self, text: str) -> List[Tuple[str, str]]:
+        """Last resort for output ignoring the format altogether: first line is the label & the rest the description."""
+        lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+        if not lines:
+            return []
+        fields = [(FIELD_LABEL, lines[0]), (FIELD_DESCRIPTION, " ".join(lines[1:]) or lines[0])]
+        confidence = re.search(r"confiden\w*\W+(\d*\.?\d+\s*%?)", text, re.IGNORECASE)
+        if confidence:
+            fields.append((FIELD_CONFIDENCE, confidence.group(1)))
+        return fields
+
+    def close(self) -> DetectionResult:
+        self._apply(_split_fields(self._text, final=True))
+        for _ in range(self._max_repairs if self._repair else 0):
+            if self.result.complete or not self._text.strip():
+                break
+            try:
+                repaired = self._repair(self._text)
+            except Exception:  # repairing is best effort, the raw output was already presented
+                break
+            self.result.repaired = True
+            self._apply(_split_fields(repaired, final=True))
+        if not self.result.complete and self.result.label is None:
+            self.result.repaired = True
+            self._apply(self._heuristic(self._text))
+        return self.result
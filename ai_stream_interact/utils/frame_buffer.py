@@ -0,0 +1,135 @@
+import time
+import threading
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+
+@dataclass
+class BufferedFrame:
+    frame: np.ndarray
+    timestamp: float  # time.monotonic() at capture time
+    frame_id: int  # monotonically increasing capture counter
+
+
+class FrameRingBuffer:
+    """Preallocated ring buffer of the last n captured frames, written in place by one writer & safe for concurrent readers."""
+
+    def __init__(self, capacity: int, frame_shape: Tuple[int, ...], dtype: np.dtype = np.uint8) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._capacity = capacity
+        self._frames = self._allocate_frames(capacity, frame_shape, np.dtype(dtype))
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._frame_ids = np.full(capacity, -1, dtype=np.int64)  # -1 marks an empty/being written slot
+        self._lock = threading.Lock()
+        self._next_frame_id = 0
+
+    def _allocate_frames(self, capacity: int, frame_shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        return np.empty((capacity, *frame_shape), dtype=dtype)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def frame_shape(self) -> Tuple[int, ...]:
+        return self._frames.shape[1:]
+
+    @property
+    def latest_frame_id(self) -> int:
+        """Id of the most recently committed frame (-1 if none yet). Cheap to poll as it doesn't copy any frame."""
+        with self._lock:
+            return self._next_frame_id - 1
+
+    def _reserve_slot(self) -> Tuple[int, np.ndarray]:
+        """Invalidates the oldest slot and returns it (index, writable view) to be filled in place by the writer."""
+        with self._lock:
+            slot = self._next_frame_id % self._capacity
+            self._frame_ids[slot] = -1
+        return slot, self._frames[slot]
+
+    def _commit_slot(self, slot: int, timestamp: float = None) -> int:
+        """Publishes a filled slot to readers & returns its frame id."""
+        with self._lock:
+            frame_id = self._next_frame_id
+            self._timestamps[slot] = time.monotonic() if timestamp is None else timestamp
+            self._frame_ids[slot] = frame_id
+            self._next_frame_id += 1
+        return frame_id
+
+    def write(self, frame: np.ndarray, timestamp: float = None) -> int:
+        """Copies a frame into the buffer & returns its frame id."""
+        slot, view = self._reserve_slot()
+        np.copyto(view, frame)
+        return self._commit_slot(slot, timestamp)
+
+    def _ordered_valid_slots(self) -> np.ndarray:
+        """Slot indices of all committed frames ordered oldest to newest. Must be called while holding the lock."""
+        valid_slots = np.flatnonzero(self._frame_ids >= 0)
+        return valid_slots[np.argsort(self._frame_ids[valid_slots])]
+
+    def _copy_out(self, slots: np.ndarray) -> List[BufferedFrame]:
+        """Copies frames out of the given slots. Must be called while holding the lock."""
+        return [
+            BufferedFrame(self._frames[slot].copy(), float(self._timestamps[slot]), int(self._frame_ids[slot]))
+            for slot in slots
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(np.count_nonzero(self._frame_ids >= 0))
+
+    def latest(self) -> BufferedFrame:
+        """Returns a copy of the most recent frame or None if the buffer is still empty."""
+        with self._lock:
+            slots = self._ordered_valid_slots()
+            if not len(slots):
+                return None
+            return self._copy_out(slots[-1:])[0]
+
+    def _nearest_slots(self, slots: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Distinct slots (oldest first) of the committed frames nearest to each target time. Must be called while holding the lock."""
+        timestamps = self._timestamps[slots]
+        if len(slots) == 1:
+            return slots
+        right = np.clip(np.searchsorted(timestamps, targets), 1, len(slots) - 1)
+        left = right - 1
+        nearest = np.where(np.abs(timestamps[left] - targets) <= np.abs(timestamps[right] - targets), left, right)
+        return slots[np.unique(nearest)]
+
+    def _spaced_slots(self, nframes: int, interval: float, end_time: float = None) -> np.ndarray:
+        """Slots of get_spaced. Must be called while holding the lock."""
+        slots = self._ordered_valid_slots()
+        if not len(slots):
+            return slots
+        end_time = self._timestamps[slots[-1]] if end_time is None else end_time
+        targets = end_time - interval * np.arange(nframes - 1, -1, -1)
+        return self._nearest_slots(slots, targets)
+
+    def get_spaced(self, nframes: int, interval: float, end_time: float = None) -> List[BufferedFrame]:
+        """Up to nframes distinct frames (oldest first) spaced ~interval seconds apart & ending at end_time."""
+        with self._lock:
+            return self._copy_out(self._spaced_slots(nframes, interval, end_time))
+
+    def fps(self) -> float:
+        """Capture rate over the frames currently held by the buffer."""
+        with self._lock:
+            slots = self._ordered_valid_slots()
+            if len(slots) < 2:
+                return 0.0
+            elapsed = self._timestamps[slots[-1]] - self._timestamps[slots[0]]
+            return float((len(slots) - 1) / elapsed) if elapsed > 0 else 0.0
+
+    def get_window(self, duration: float, max_frames: int = None) -> List[BufferedFrame]:
+        """Returns the frames (oldest first) captured within duration seconds of the latest frame, evenly subsampled down to max_frames if set."""
+        with self._lock:
+            slots = self._ordered_valid_slots()
+            if not len(slots):
+                return []
+            timestamps = self._timestamps[slots]
+            slots = slots[timestamps >= timestamps[-1] - duration]
+            if max_frames and len(slots) > max_frames:
+                slots = slots[np.linspace(0, len(slots) - 1, max_frames).round().astype(int)]
+            return self._copy_out(slots)
@@ -0,0 +1,56 @@
+from typing import List
+
+import numpy as np
+
+from ai_stream_interact.utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+def _gray_thumbnails(frames: List[np.ndarray], size: int = 96) -> np.ndarray:
+    """Stacks cv BGR np.array frames into a (n, size, size) float32 array of grayscale thumbnails."""
+    return np.stack([
+        cv2.resize(
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame,
+            (size, size),
+            interpolation=cv2.INTER_AREA
+        )
+        for frame in frames
+    ]).astype(np.float32)
+
+
+def _sharpness_scores(thumbnails: np.ndarray) -> np.ndarray:
+    """Variance of the Laplacian per thumbnail (higher is sharper), computed for the whole stack at once."""
+    laplacian = (
+        thumbnails[:, :-2, 1:-1] + thumbnails[:, 2:, 1:-1] + thumbnails[:, 1:-1, :-2] + thumbnails[:, 1:-1, 2:]
+        - 4 * thumbnails[:, 1:-1, 1:-1]
+    )
+    return laplacian.reshape(len(thumbnails), -1).var(axis=1)
+
+
+def _pairwise_dissimilarity(thumbnails: np.ndarray) -> np.ndarray:
+    """(n, n) matrix of RMS pixel differences between thumbnails using the gram matrix trick (no n x n x pixels intermediate)."""
+    flat = thumbnails.reshape(len(thumbnails), -1).astype(np.float64)
+    squared_norms = np.einsum("ij,ij->i", flat, flat)
+    squared_distances = squared_norms[:, None] + squared_norms[None, :] - 2 * flat @ flat.T
+    return np.sqrt(np.maximum(squared_distances, 0) / flat.shape[1])
+
+
+def _select_frames(frames: List[np.ndarray], k: int, diversity_weight: float = 0.5) -> List[int]:
+    """Greedily picks the (time ordered) indices of the k sharpest most dissimilar frames."""
+    if len(frames) <= k:
+        return list(range(len(frames)))
+    thumbnails = _gray_thumbnails(frames)
+    sharpness = _sharpness_scores(thumbnails)
+    sharpness = sharpness / sharpness.max() if sharpness.max() > 0 else sharpness
+    dissimilarity = _pairwise_dissimilarity(thumbnails)
+    dissimilarity = dissimilarity / dissimilarity.max() if dissimilarity.max() > 0 else dissimilarity
+    selected = [int(np.argmax(sharpness))]
+    min_dissimilarity = dissimilarity[selected[0]].copy()
+    while len(selected) < k:
+        scores = (1 - diversity_weight) * sharpness + diversity_weight * min_dissimilarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        min_dissimilarity = np.minimum(min_dissimilarity, dissimilarity[best])
+    return sorted(selected)
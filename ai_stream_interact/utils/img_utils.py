@@ -1,21 +1,199 @@
-import glob
+import os
+import math
 import tempfile
-from typing import List
+from typing import List, Dict, Tuple, Union
 
-import cv2
-import PIL
 from PIL import Image
 import numpy as np
 
+from ai_stream_interact.utils.lazy_import import lazy_import
 
-def _img_arrays_to_pil_imgs(frames: np.ndarray) -> List[Image]:
-    """ Writes cv np.array frames and reloads them in PIL.image format """
-    with tempfile.TemporaryDirectory() as tmp:
-        for n, frame in enumerate(frames):
-            cv2.imwrite(f"{tmp}/frame{n}.jpg", frame)
-        images_list = []
-        image_paths = glob.glob(f"{tmp}/*.jpg")
-        for path in image_paths:
-            img = PIL.Image.open(path)
-            images_list.append(img)
-        return images_list
+cv2 = lazy_import("cv2")
+
+
+# mime types of the encodings supported by _img_arrays_to_encoded_imgs
+IMG_FORMAT_MIME_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+# container -> (opencv fourcc, mime type) of the video clip encodings supported by _frames_to_video
+VIDEO_FORMATS = {
+    "webm": ("VP80", "video/webm"),
+    "mp4": ("mp4v", "video/mp4"),
+}
+
+# min per channel difference (0-255) for a mosaic pixel to count as changed in delta mosaics
+_DELTA_THRESHOLD = 16
+
+# an in memory encoded image (or video clip) i.e. {"mime_type": "image/jpeg", "data": b"..."}
+EncodedImage = Dict[str, Union[str, bytes]]
+
+
+def _normalize_img_format(img_format: str) -> str:
+    """Lower cases the format name & validates it's supported."""
+    img_format = img_format.lower()
+    img_format = "jpeg" if img_format == "jpg" else img_format
+    if img_format not in IMG_FORMAT_MIME_TYPES:
+        raise ValueError(f"Unsupported image format {img_format}, must be one of {list(IMG_FORMAT_MIME_TYPES)}")
+    return img_format
+
+
+def _encode_params(img_format: str, quality: int) -> List[int]:
+    """Maps a generic 0-100 quality value to the relevant opencv encoding params."""
+    if img_format == "jpeg":
+        return [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    if img_format == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    if img_format == "png":
+        # png is lossless, so quality maps to compression effort (0-9) instead
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(round((100 - quality) * 9 / 100))]
+    return []
+
+
+def _crop_frame(frame: np.ndarray, crop: Union[str, Tuple[int, int, int, int]]) -> np.ndarray:
+    """Crops a frame to either its "center" square or an (x, y, width, height) region of interest (clipped to the frame)."""
+    height, width = frame.shape[:2]
+    if crop == "center":
+        side = min(height, width)
+        x, y = (width - side) // 2, (height - side) // 2
+        return frame[y:y + side, x:x + side]
+    if isinstance(crop, str):
+        raise ValueError(f"Unsupported crop {crop}, must be 'center' or an (x, y, width, height) tuple")
+    x, y, crop_width, crop_height = crop
+    x, y = min(max(x, 0), width - 1), min(max(y, 0), height - 1)
+    return frame[y:min(y + crop_height, height), x:min(x + crop_width, width)]
+
+
+def _resize_to_max_edge(frame: np.ndarray, max_edge: int) -> np.ndarray:
+    """Downscales a frame so its longest edge is at most max_edge pixels, keeping the aspect ratio. Frames are never upscaled."""
+    height, width = frame.shape[:2]
+    scale = max_edge / max(height, width)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def _preprocess_frames(
+    frames: List[np.ndarray],
+    max_edge: int = None,
+    crop: Union[str, Tuple[int, int, int, int]] = None
+) -> List[np.ndarray]:
+    """Crops then downscales frames before they are encoded & uploaded."""
+    if crop:
+        frames = [_crop_frame(frame, crop) for frame in frames]
+    if max_edge:
+        frames = [_resize_to_max_edge(frame, max_edge) for frame in frames]
+    return frames
+
+
+def _img_arrays_to_pil_imgs(frames: List[np.ndarray]) -> List[Image.Image]:
+    """Converts cv BGR np.array frames to RGB PIL images in memory, keeping frame order."""
+    return [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+
+
+def _img_array_to_bytes(frame: np.ndarray, img_format: str = "jpeg", quality: int = 90) -> bytes:
+    """Encodes a single cv BGR np.array frame to jpeg/png/webp bytes in memory."""
+    img_format = _normalize_img_format(img_format)
+    success, buffer = cv2.imencode(f".{img_format}", frame, _encode_params(img_format, quality))
+    if not success:
+        raise ValueError(f"Unable to encode frame as {img_format}")
+    return buffer.tobytes()
+
+
+def _img_arrays_to_encoded_imgs(
+    frames: List[np.ndarray],
+    img_format: str = "jpeg",
+    quality: int = 90
+) -> List[EncodedImage]:
+    """Encodes cv BGR np.array frames in memory into {"mime_type", "data"} blobs (accepted as-is by most model APIs), keeping frame order."""
+    img_format = _normalize_img_format(img_format)
+    mime_type = IMG_FORMAT_MIME_TYPES[img_format]
+    return [
+        {"mime_type": mime_type, "data": _img_array_to_bytes(frame, img_format, quality)}
+        for frame in frames
+    ]
+
+
+def _frames_to_mosaic(frames: List[np.ndarray], max_edge: int, delta: bool = False) -> np.ndarray:
+    """Tiles same sized frames into a single contact sheet, optionally delta encoded."""
+    ncols = math.ceil(math.sqrt(len(frames)))
+    nrows = math.ceil(len(frames) / ncols)
+    height, width = frames[0].shape[:2]
+    scale = min(1.0, max_edge / max(ncols * width, nrows * height))
+    tile_width, tile_height = max(1, round(width * scale)), max(1, round(height * scale))
+    tiles = [cv2.resize(frame, (tile_width, tile_height), interpolation=cv2.INTER_AREA) for frame in frames]
+    mosaic = np.zeros((nrows * tile_height, ncols * tile_width, *frames[0].shape[2:]), dtype=frames[0].dtype)
+    for i, tile in enumerate(tiles):
+        if delta and i:
+            changed = cv2.absdiff(tile, tiles[i - 1]) > _DELTA_THRESHOLD
+            changed = changed.any(axis=2) if changed.ndim == 3 else changed
+            tile = np.where(changed[..., None] if tile.ndim == 3 else changed, tile, 128).astype(tile.dtype)
+        row, col = divmod(i, ncols)
+        mosaic[row * tile_height:(row + 1) * tile_height, col * tile_width:(col + 1) * tile_width] = tile
+    return mosaic
+
+
+def _frames_to_video(frames: List[np.ndarray], fps: float, max_edge: int = None, video_format: str = "webm") -> EncodedImage:
+    """Encodes same sized cv BGR np.array frames into a short video clip (via a temporary file)."""
+    if video_format not in VIDEO_FORMATS:
+        raise ValueError(f"Unsupported video format {video_format}, must be one of {list(VIDEO_FORMATS)}")
+    fourcc, mime_type = VIDEO_FORMATS[video_format]
+    frames = [_resize_to_max_edge(frame, max_edge) for frame in frames] if max_edge else frames
+    height, width = frames[0].shape[:2]
+    width, height = width - width % 2, height - height % 2  # most codecs want even dimensions
+    fd, path = tempfile.mkstemp(suffix=f".{video_format}")
+    os.close(fd)
+    try:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+        if not writer.isOpened():
+            raise ValueError(f"Unable to encode {video_format} video, opencv was built without its {fourcc} codec")
+        for frame in frames:
+            writer.write(frame[:height, :width] if frame.ndim == 3 else cv2.cvtColor(frame[:height, :width], cv2.COLOR_GRAY2BGR))
+        writer.release()
+        with open(path, "rb") as f:
+            return {"mime_type": mime_type, "data": f.read()}
+    finally:
+        os.remove(path)
+
+
+def _video_to_frames(video: EncodedImage) -> List[np.ndarray]:
+    """Decodes every frame of a video clip encoded by _frames_to_video."""
+    extension = next(name for name, (_, mime_type) in VIDEO_FORMATS.items() if mime_type == video["mime_type"])
+    fd, path = tempfile.mkstemp(suffix=f".{extension}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(video["data"])
+        capture = cv2.VideoCapture(path)
+        frames = []
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(frame)
+        capture.release()
+        return frames
+    finally:
+        os.remove(path)
+
+
+def _color_bits(frame: np.ndarray, grid: int = 4, dead_zone: int = 12) -> np.ndarray:
+    """4 bits per grid cell: whether the cell's average chroma is clearly red/green & yellow/blue (all 0 for gray cells)."""
+    lab = cv2.cvtColor(cv2.resize(frame, (grid, grid), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2LAB).astype(np.int16)
+    chroma = lab[..., 1:] - 128
+    return np.stack([chroma > dead_zone, chroma < -dead_zone], axis=-1).flatten()
+
+
+def _phash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """128 bit perceptual hash of a cv BGR np.array frame (64 bit luma DCT hash + 64 bits of coarse colour)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    resized = cv2.resize(gray, (hash_size * 4, hash_size * 4), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_freqs = cv2.dct(resized)[:hash_size, :hash_size]
+    bits = (low_freqs > np.median(low_freqs.flatten()[1:])).flatten()  # DC term excluded from the median as it only reflects brightness
+    color_bits = _color_bits(frame) if frame.ndim == 3 else np.zeros(64, dtype=bool)
+    return int.from_bytes(np.packbits(np.concatenate([bits, color_bits])).tobytes(), "big")
+
+
+def _hamming_distance(hash_a: int, hash_b: int) -> int:
+    return bin(hash_a ^ hash_b).count("1")
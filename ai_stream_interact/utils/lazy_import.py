@@ -0,0 +1,44 @@
+import importlib
+import threading
+from types import ModuleType
+from typing import Iterable
+
+
+class _LazyModule:
+    """Stands in for a heavy module & only imports it on first attribute access. Safe to use from several threads."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._name}' ({'loaded' if self._module is not None else 'not loaded'})>"
+
+
+def lazy_import(name: str) -> _LazyModule:
+    """Returns a proxy for the module that is imported the first time one of its attributes is used."""
+    return _LazyModule(name)
+
+
+def preload_in_background(names: Iterable[str]) -> threading.Thread:
+    """Imports heavy modules on a daemon thread (e.g. while the user is busy with the first prompts) so they're ready when needed."""
+    def preload() -> None:
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except ImportError:  # surfaced properly by whoever actually needs the module
+                pass
+    thread = threading.Thread(target=preload, name="preload-modules", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Latency buckets (seconds) used for every histogram, from sub millisecond encodes up to slow model responses
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Dict[str, object]) -> LabelsKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelsKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Prometheus style cumulative buckets + sum & count, plus a window of recent values for percentiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window: int = 1024) -> None:
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        p50, p95, p99 = np.percentile(list(self.recent), [50, 95, 99]) if self.recent else (0.0, 0.0, 0.0)
+        return {"count": self.count, "sum": self.sum, "p50": float(p50), "p95": float(p95), "p99": float(p99), "max": self.max}
+
+
+class MetricsRegistry:
+    """In memory, thread safe registry of histograms & counters keyed by name & labels. Cheap enough to record on every call."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelsKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelsKey, float]] = {}
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _labels_key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels_key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """Times the block into the {name}_seconds histogram. Failed blocks also count into {name}_errors_total."""
+        started_at = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.monotonic() - started_at, **labels)
+
+    def timed(self, name: str, **labels) -> Callable:
+        """Decorator version of span."""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def timed_stream(self, stream: Iterable, name: str, **labels) -> Iterator:
+        """Passes a streamed response through while timing time to first chunk ({name}_ttft_seconds) & the whole stream ({name}_seconds)."""
+        started_at = time.monotonic()
+        first = True
+        try:
+            for chunk in stream:
+                if first:
+                    self.observe(f"{name}_ttft_seconds", time.monotonic() - started_at, **labels)
+                    first = False
+                yield chunk
+        except Exception:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.monotonic() - started_at, **labels)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """{"histograms": {name: [{labels, summary}]}, "counters": {name: [{labels, value}]}}."""
+        with self._lock:
+            histograms = {
+                name: [{"labels": dict(key), **histogram.summary()} for key, histogram in series.items()]
+                for name, series in sorted(self._histograms.items())
+            }
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in sorted(self._counters.items())
+            }
+        return {"histograms": histograms, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines += [f"{name}{_format_labels(key)} {value}" for key, value in series.items()]
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, "+Inf"), histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def write(self, path: str) -> None:
+        """Dumps the metrics to path, as json if it ends with .json else in Prometheus text format. Written atomically."""
+        content = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def export_periodically(self, path: str, interval: float = 5.0) -> threading.Thread:
+        """Rewrites the metrics file every interval seconds on a daemon thread (e.g. for a node exporter textfile collector)."""
+        def export() -> None:
+            while True:
+                time.sleep(interval)
+                self.write(path)
+        thread = threading.Thread(target=export, name="metrics-export", daemon=True)
+        thread.start()
+        return thread
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> threading.Thread:
+        """Serves the metrics at http://host:port/metrics (Prometheus text) & /metrics.json on a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = registry.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args) -> None:  # keep the console for the app
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        return thread
+
+
+# shared by the whole app, like the model rate limiters
+metrics = MetricsRegistry()
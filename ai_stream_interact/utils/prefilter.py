@@ -0,0 +1,109 @@
+import threading
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+import numpy as np
+
+from ai_stream_interact.utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+@dataclass
+class PrefilterConfig:
+    model_path: str = None  # onnx image classifier
+    labels_path: str = None  # one class label per line
+    input_size: int = 224  # square input size the model expects
+    mean: Tuple[float, float, float] = (0.485, 0.456, 0.406)  # RGB
+    std: Tuple[float, float, float] = (0.229, 0.224, 0.225)
+    answer_confidence: float = 0.9  # answered locally above this
+    hint_confidence: float = 0.1  # passed on as hints above this
+    max_hints: int = 3
+    empty_frames: bool = True  # answer blank frames locally
+    empty_threshold: float = 8.0  # max per channel pixel std
+
+
+@dataclass
+class PrefilterResult:
+    empty: bool = False
+    labels: List[Tuple[str, float]] = field(default_factory=list)  # (label, confidence) best first
+    answer: str = None  # None if the detect goes to the model
+    hints: str = None
+
+
+def _local_answer(result: PrefilterResult, config: PrefilterConfig) -> str:
+    if result.empty:
+        return (
+            "Object Detected: Nothing\n"
+            "Detailed Description: The frames are blank, no object is in view.\n"
+            "Confidence Level: 1.0"
+        )
+    if result.labels and result.labels[0][1] >= config.answer_confidence:
+        label, confidence = result.labels[0]
+        return (
+            f"Object Detected: {label}\n"
+            "Detailed Description: Identified by the local classifier.\n"
+            f"Confidence Level: {confidence:.2f}"
+        )
+    return None
+
+
+def _hints_prompt(result: PrefilterResult, config: PrefilterConfig) -> str:
+    labels = [f"{label} ({confidence:.2f})" for label, confidence in result.labels[:config.max_hints] if confidence >= config.hint_confidence]
+    if not labels:
+        return None
+    return f"Hint: a local image classifier suggests {', '.join(labels)}. It can be wrong, use the images to decide."
+
+
+class LocalPrefilter:
+    """Cheap on-CPU checks run before a detect goes to the cloud."""
+
+    def __init__(self, config: PrefilterConfig = None) -> None:
+        self._config = config or PrefilterConfig()
+        self._net = None
+        self._labels = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        if self._net is None:
+            self._net = cv2.dnn.readNetFromONNX(self._config.model_path)
+            if self._config.labels_path:
+                with open(self._config.labels_path) as f:
+                    self._labels = [line.strip() for line in f if line.strip()]
+
+    def _is_empty(self, frames: List[np.ndarray]) -> bool:
+        """True if every frame is close to a flat color (per channel)."""
+        for frame in frames:
+            small = cv2.resize(frame, (64, 64), interpolation=cv2.INTER_AREA)
+            if small.reshape(-1, small.shape[2] if small.ndim == 3 else 1).std(axis=0).max() > self._config.empty_threshold:
+                return False
+        return True
+
+    def _classify(self, frames: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """Class probabilities averaged over the frames, best first."""
+        config = self._config
+        size = (config.input_size, config.input_size)
+        blob = cv2.dnn.blobFromImages(frames, 1 / 255, size, swapRB=True, crop=True)
+        blob = (blob - np.array(config.mean, np.float32)[:, None, None]) / np.array(config.std, np.float32)[:, None, None]
+        with self._lock:
+            self._load()
+            self._net.setInput(blob)
+            scores = self._net.forward().reshape(len(frames), -1).astype(np.float64)
+        if not np.allclose(scores.sum(axis=1), 1, atol=1e-3) or scores.min() < 0:  # logits, not probabilities
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+        probabilities = scores.mean(axis=0)
+        top = np.argsort(probabilities)[::-1][:max(self._config.max_hints, 1)]
+        labels = self._labels or []
+        return [(labels[i] if i < len(labels) else f"class {i}", float(probabilities[i])) for i in top]
+
+    def check(self, frames: List[np.ndarray]) -> PrefilterResult:
+        if self._config.empty_frames and self._is_empty(frames):
+            result = PrefilterResult(empty=True)
+        elif self._config.model_path is None:
+            result = PrefilterResult()
+        else:
+            result = PrefilterResult(labels=self._classify(frames))
+        result.answer = _local_answer(result, self._config)
+        result.hints = _hints_prompt(result, self._config)
+        return result
@@ -0,0 +1,279 @@
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import functools
+import threading
+from typing import Callable, Optional, Tuple, Type
+
+from ai_stream_interact.utils.metrics import metrics
+
+
+# Priority lanes, lower values are served first
+PRIORITY_INTERACTIVE = 0  # e.g. chat or a (d) press
+PRIORITY_BACKGROUND = 1  # unattended requests e.g. auto detect
+PRIORITY_LANES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# n seconds between checks of a waiter's cancel token (cancelling doesn't wake the limiter up)
+_CANCEL_POLL_INTERVAL = 0.05
+
+
+class RequestCancelled(Exception):
+    """Raised by a limiter's acquire when the request was cancelled (e.g. superseded by a newer one) before it was sent."""
+
+
+class CancelToken:
+    """Cancellation handle of a request waiting on a rate limiter, until it's sent."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.cancelled = False
+        self.sent = False
+
+    def cancel(self) -> bool:
+        """Returns False if it's too late as the request was already sent."""
+        with self._lock:
+            if not self.sent:
+                self.cancelled = True
+            return self.cancelled
+
+    def mark_sent(self) -> bool:
+        """Returns False if the request was cancelled & must not be sent."""
+        with self._lock:
+            if not self.cancelled:
+                self.sent = True
+            return self.sent
+
+
+class _TokenBucketState:
+    """Token bucket bookkeeping shared by the limiters: refills rate tokens per second up to burst."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive & burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()  # the state can be shared by a sync & an async limiter
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now > self._updated_at:  # no refill while blocked
+            self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+    def try_take(self) -> bool:
+        """Takes a token if one is available."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def give_back(self) -> None:
+        """Returns a token taken by a request that was cancelled before it was sent."""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def time_until_available(self) -> float:
+        """n seconds until a token is available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, self._updated_at - time.monotonic(), (1 - self.tokens) / self.rate)
+
+    def block(self, retry_after: float) -> None:
+        """Grants no tokens for retry_after seconds, then refills from empty."""
+        with self._lock:
+            self._refill()
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.tokens = 0.0
+            self._updated_at = self.blocked_until
+
+
+class _PriorityTokenBucket:
+    """Token bucket served by (priority, arrival order) & paused while a server retry-after is pending."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self._state = _TokenBucketState(rate, burst)
+        self._waiters = []  # heap of (priority, arrival number) tickets
+        self._arrivals = itertools.count()
+
+    def _new_ticket(self, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._arrivals))
+        heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _try_acquire(self, ticket: Tuple[int, int]) -> Optional[float]:
+        """0 if the ticket got a token, else n seconds to wait (None to wait for a change in the queue)."""
+        if self._waiters[0] != ticket:
+            return None
+        blocked_for = self._state.blocked_until - time.monotonic()
+        if blocked_for > 0:
+            return blocked_for
+        if self._state.try_take():
+            heapq.heappop(self._waiters)
+            return 0.0
+        return self._state.time_until_available()
+
+    def _forget(self, ticket: Tuple[int, int]) -> None:
+        """Removes an abandoned (e.g. timed out) ticket."""
+        self._waiters.remove(ticket)
+        heapq.heapify(self._waiters)
+
+    def _try_acquire_unless_cancelled(self, ticket: Tuple[int, int], cancel_token: Optional[CancelToken]) -> Optional[float]:
+        """Same as _try_acquire but raises RequestCancelled (giving the ticket or the just granted token back) if cancel_token was cancelled."""
+        if cancel_token is not None and cancel_token.cancelled:
+            self._forget(ticket)
+            raise RequestCancelled("Cancelled before it was sent")
+        delay = self._try_acquire(ticket)
+        if delay == 0 and cancel_token is not None and not cancel_token.mark_sent():
+            self._state.give_back()
+            raise RequestCancelled("Cancelled before it was sent")
+        return delay
+
+    def _record_wait(self, priority: int, waited: float) -> None:
+        # shown per lane in the (s) metrics panel
+        metrics.observe("rate_limit_wait_seconds", waited, lane=PRIORITY_LANES.get(priority, priority))
+
+
+class TokenBucketRateLimiter(_PriorityTokenBucket):
+    """Thread safe token bucket limiter with a configurable burst & priority lanes."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        super().__init__(rate, burst)
+        self._condition = threading.Condition()
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = None, cancel_token: CancelToken = None) -> float:
+        """Blocks until a token is granted & returns the n seconds spent waiting."""
+        started_at = time.monotonic()
+        with self._condition:
+            ticket = self._new_ticket(priority)
+            while True:
+                try:
+                    delay = self._try_acquire_unless_cancelled(ticket, cancel_token)
+                except RequestCancelled:
+                    self._condition.notify_all()
+                    raise
+                if delay == 0:
+                    self._condition.notify_all()  # the next ticket is now at the head
+                    break
+                if timeout is not None:
+                    remaining = started_at + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._forget(ticket)
+                        self._condition.notify_all()
+                        raise TimeoutError("Timed out waiting on the rate limiter")
+                    delay = remaining if delay is None else min(delay, remaining)
+                if cancel_token is not None:
+                    delay = _CANCEL_POLL_INTERVAL if delay is None else min(delay, _CANCEL_POLL_INTERVAL)
+                self._condition.wait(delay)
+            waited = time.monotonic() - started_at
+            self._record_wait(priority, waited)
+        return waited
+
+    def penalize(self, retry_after: float) -> None:
+        """Honors a server provided retry-after hint: no tokens are granted for retry_after seconds."""
+        with self._condition:
+            self._state.block(retry_after)
+            self._condition.notify_all()
+
+
+class AsyncTokenBucket(_PriorityTokenBucket):
+    """asyncio flavour of TokenBucketRateLimiter. Waiters never block the event loop."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        super().__init__(rate, burst)
+        self._condition = None  # bound to the running loop on first use
+
+    @classmethod
+    def sharing(cls, limiter: _PriorityTokenBucket) -> "AsyncTokenBucket":
+        """AsyncTokenBucket drawing on the same tokens as limiter, e.g. a sync limiter of the same API key."""
+        bucket = cls(limiter._state.rate, limiter._state.burst)
+        bucket._state = limiter._state
+        return bucket
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, cancel_token: CancelToken = None) -> float:
+        """Waits for a token & returns the n seconds spent waiting. Raises RequestCancelled if cancel_token is cancelled first."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        started_at = time.monotonic()
+        async with self._condition:
+            ticket = self._new_ticket(priority)
+            while True:
+                try:
+                    delay = self._try_acquire_unless_cancelled(ticket, cancel_token)
+                except RequestCancelled:
+                    self._condition.notify_all()
+                    raise
+                if delay == 0:
+                    self._condition.notify_all()
+                    break
+                if cancel_token is not None:
+                    delay = _CANCEL_POLL_INTERVAL if delay is None else min(delay, _CANCEL_POLL_INTERVAL)
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        waited = time.monotonic() - started_at
+        self._record_wait(priority, waited)
+        return waited
+
+    async def penalize(self, retry_after: float) -> None:
+        """Honors a server provided retry-after hint: no tokens are granted for retry_after seconds."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            self._state.block(retry_after)
+            self._condition.notify_all()
+
+
+def _retry_after_hint(error: Exception) -> Optional[float]:
+    """Best effort extraction of a server provided retry-after (in seconds) from an API error, None if there's none."""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if hasattr(headers, "get"):
+            retry_after = headers.get("Retry-After")
+    if retry_after is None:
+        # google api errors carry a google.rpc.RetryInfo in their details
+        for detail in getattr(error, "details", None) or []:
+            retry_delay = getattr(detail, "retry_delay", None)
+            if retry_delay is not None:
+                return retry_delay.seconds + retry_delay.nanos / 1e9
+    try:
+        return float(retry_after) if retry_after is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def async_retry(
+    max_tries: int = 5,
+    base_delay: float = 0.5,
+    max_delay: float = 10,
+    exceptions: Tuple[Type[Exception], ...] = (Exception,)
+) -> Callable:
+    """Retries a coroutine function on exceptions with jittered exponential backoff, never on cancelled requests."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(max_tries):
+                try:
+                    return await func(*args, **kwargs)
+                except RequestCancelled:
+                    raise
+                except exceptions:
+                    if attempt == max_tries - 1:
+                        raise
+                    metrics.inc("model_retries_total", call=func.__name__)
+                    await asyncio.sleep(_backoff_delay(attempt, base_delay, max_delay))
+        return wrapper
+    return decorator
@@ -0,0 +1,110 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from ai_stream_interact.utils.img_utils import _hamming_distance
+
+
+@dataclass
+class ResponseCacheConfig:
+    hamming_tolerance: int = 6  # max hamming distance per frame hash
+    max_entries: int = 256  # in memory LRU size
+    ttl: float = 600  # n seconds a cached response stays valid
+    sqlite_path: str = None  # optional persistent tier
+
+
+@dataclass
+class _CacheEntry:
+    frame_hashes: Tuple[int, ...]
+    chunks: List[str]
+    created_at: float
+
+
+class ResponseCache:
+    """Caches streamed model responses by request key (prompt, text parts & config) & perceptual hashes of the prompt frames."""
+
+    def __init__(self, config: ResponseCacheConfig = None) -> None:
+        self._config = config or ResponseCacheConfig()
+        self._entries: "OrderedDict[Tuple[str, Tuple[int, ...]], _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if self._config.sqlite_path:
+            self._db = sqlite3.connect(self._config.sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (prompt TEXT, frame_hashes TEXT, chunks TEXT, created_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_prompt ON responses (prompt)")
+            self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return time.time() - created_at < self._config.ttl
+
+    def _matches(self, frame_hashes: Tuple[int, ...], cached_hashes: Tuple[int, ...]) -> bool:
+        return len(frame_hashes) == len(cached_hashes) and all(
+            _hamming_distance(a, b) <= self._config.hamming_tolerance for a, b in zip(frame_hashes, cached_hashes)
+        )
+
+    def _get_from_memory(self, prompt: str, frame_hashes: Tuple[int, ...]) -> Optional[_CacheEntry]:
+        """Exact key lookup first then a scan over same prompt entries (bounded by max_entries). Must be called while holding the lock."""
+        key = (prompt, frame_hashes)
+        candidates = [key] if key in self._entries else []
+        candidates += [k for k in self._entries if k[0] == prompt and k != key]
+        for candidate in candidates:
+            entry = self._entries[candidate]
+            if not self._is_fresh(entry.created_at):
+                del self._entries[candidate]
+            elif self._matches(frame_hashes, entry.frame_hashes):
+                self._entries.move_to_end(candidate)
+                return entry
+        return None
+
+    def _get_from_db(self, prompt: str, frame_hashes: Tuple[int, ...]) -> Optional[_CacheEntry]:
+        rows = self._db.execute(
+            "SELECT frame_hashes, chunks, created_at FROM responses WHERE prompt = ? AND created_at > ? ORDER BY created_at DESC",
+            (prompt, time.time() - self._config.ttl)
+        ).fetchall()
+        for hashes, chunks, created_at in rows:
+            cached_hashes = tuple(int(h, 16) for h in json.loads(hashes))
+            if self._matches(frame_hashes, cached_hashes):
+                return _CacheEntry(cached_hashes, json.loads(chunks), created_at)
+        return None
+
+    def _put_in_memory(self, prompt: str, entry: _CacheEntry) -> None:
+        """Must be called while holding the lock."""
+        self._entries[(prompt, entry.frame_hashes)] = entry
+        self._entries.move_to_end((prompt, entry.frame_hashes))
+        while len(self._entries) > self._config.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, prompt: str, frame_hashes: List[int]) -> Optional[List[str]]:
+        """Returns the cached response chunks for the prompt & frames or None on a miss."""
+        frame_hashes = tuple(frame_hashes)
+        with self._lock:
+            entry = self._get_from_memory(prompt, frame_hashes)
+            if entry is None and self._db is not None:
+                entry = self._get_from_db(prompt, frame_hashes)
+                if entry is not None:  # promote to the memory tier
+                    self._put_in_memory(prompt, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return list(entry.chunks)
+
+    def put(self, prompt: str, frame_hashes: List[int], chunks: List[str]) -> None:
+        entry = _CacheEntry(tuple(frame_hashes), list(chunks), time.time())
+        with self._lock:
+            self._put_in_memory(prompt, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO responses VALUES (?, ?, ?, ?)",
+                    (prompt, json.dumps([f"{h:032x}" for h in entry.frame_hashes]), json.dumps(entry.chunks), entry.created_at)
+                )
+                self._db.execute("DELETE FROM responses WHERE created_at <= ?", (time.time() - self._config.ttl,))
+                self._db.commit()
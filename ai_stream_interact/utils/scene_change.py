@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from ai_stream_interact.utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+@dataclass
+class AutoDetectConfig:
+    change_threshold: float = 12.0  # mean abs difference (0-255) from the last scene
+    stability_threshold: float = 4.0  # max mean abs difference between samples
+    dwell_time: float = 1.0  # n seconds a new scene must stay stable
+    poll_interval: float = 0.1  # n seconds between scene samples
+    downscale_size: int = 64  # thumbnail size frames are compared at
+
+
+class SceneChangeDetector:
+    """Cheap scene change detection by downscaled grayscale frame differencing, firing once a new scene stays still."""
+
+    def __init__(self, config: AutoDetectConfig = None) -> None:
+        self._config = config or AutoDetectConfig()
+        self._reference = None  # thumbnail of the last detected scene
+        self._previous = None  # thumbnail of the previous sample
+        self._stable_since = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        size = (self._config.downscale_size, self._config.downscale_size)
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    @staticmethod
+    def _distance(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.mean(np.abs(a - b)))
+
+    def reset(self) -> None:
+        self._reference = self._previous = self._stable_since = None
+
+    def update(self, frame: np.ndarray, timestamp: float) -> bool:
+        """Feeds a new sample (timestamp in seconds). Returns True if a detect should be fired for it."""
+        thumbnail = self._thumbnail(frame)
+        changed = self._reference is None or self._distance(thumbnail, self._reference) > self._config.change_threshold
+        stable = self._previous is not None and self._distance(thumbnail, self._previous) <= self._config.stability_threshold
+        self._previous = thumbnail
+        if not changed:
+            self._stable_since = None
+            return False
+        if not stable or self._stable_since is None:  # still moving, (re)start the dwell timer
+            self._stable_since = timestamp
+            return False
+        if timestamp - self._stable_since < self._config.dwell_time:
+            return False
+        self._reference = thumbnail
+        self._stable_since = None
+        return True
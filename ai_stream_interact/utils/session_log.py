@@ -0,0 +1,199 @@
+import os
+import json
+import mmap
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple, Union
+
+from ai_stream_interact.utils.img_utils import EncodedImage
+
+# Files of a session directory
+FRAMES_FILE = "frames.pack"  # encoded images, each stored once
+EVENTS_FILE = "events.jsonl"
+
+SESSION_LOG_VERSION = 1
+
+
+def _image_digest(image: EncodedImage) -> str:
+    return hashlib.sha1(image["data"]).hexdigest()
+
+
+def _request_key(custom_base_prompt: str, image_digests: List[str]) -> str:
+    """Content address of a detect request: its prompt & the digests of its images."""
+    return hashlib.sha1("\n".join([custom_base_prompt or "", *image_digests]).encode()).hexdigest()
+
+
+@dataclass
+class RecordedDetect:
+    job_id: int
+    submitted_at: float  # n seconds into the recording
+    custom_base_prompt: str
+    priority: int
+    parts: List[Union[str, Dict[str, str]]]  # image digests & {"text": ...} parts
+    views: List[str]  # camera name per frame (None for a single camera)
+    queued: float  # n seconds until inference
+    chunks: List[Tuple[float, str]]  # (n seconds into inference, chunk)
+    error: str = None  # repr of the error if the detect failed
+    result: Dict[str, Any] = None  # parsed detect result (None for custom prompts)
+
+    @property
+    def response(self) -> str:
+        return "".join(chunk for _, chunk in self.chunks)
+
+    @property
+    def latency(self) -> float:
+        """n seconds from submission to the last chunk."""
+        return self.queued + (self.chunks[-1][0] if self.chunks else 0.0)
+
+
+class SessionRecorder:
+    """Append only log of a session's detects: content addressed frames, prompts & timed response chunks."""
+
+    def __init__(self, path: str, config: Dict[str, Any] = None) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._known = set(SessionLog._index_frames(SessionLog._read_events(path))) if os.path.exists(os.path.join(path, EVENTS_FILE)) else set()  # dedup across sessions too
+        self._frames = open(os.path.join(path, FRAMES_FILE), "ab")
+        self._events = open(os.path.join(path, EVENTS_FILE), "a+")
+        if self._events.tell():
+            self._events.seek(self._events.tell() - 1)
+            if self._events.read(1) != "\n":  # the previous session was killed mid line
+                self._events.write("\n")
+        self._started_at = time.monotonic()
+        self._write_event({"event": "session", "version": SESSION_LOG_VERSION, "started_at": time.time(), "config": config or {}})
+
+    def _write_event(self, event: Dict[str, Any]) -> None:
+        """Must be called while holding the lock (or from __init__)."""
+        self._events.write(json.dumps(event) + "\n")
+        self._events.flush()
+
+    def _put_image(self, image: EncodedImage) -> str:
+        """Appends the image to the pack unless it's already in there. Must be called while holding the lock."""
+        digest = _image_digest(image)
+        if digest not in self._known:
+            offset = self._frames.tell()
+            self._frames.write(image["data"])
+            self._frames.flush()  # before the event pointing at it
+            self._write_event({"event": "frame", "digest": digest, "offset": offset, "length": len(image["data"]), "mime_type": image["mime_type"]})
+            self._known.add(digest)
+        return digest
+
+    def record_detect(
+        self,
+        job_id: int,
+        submitted_at: float,
+        custom_base_prompt: str,
+        priority: int,
+        images: List[Union[EncodedImage, str]],
+        views: List[str],
+        queued: float,
+        chunks: List[Tuple[float, str]],
+        error: Exception = None,
+        result: Dict[str, Any] = None
+    ) -> None:
+        """Logs a detect once its response is done streaming. submitted_at is a time.monotonic() timestamp, see RecordedDetect for the rest."""
+        with self._lock:
+            parts = [{"text": image} if isinstance(image, str) else self._put_image(image) for image in images]
+            self._write_event({
+                "event": "detect",
+                "job_id": job_id,
+                "submitted_at": round(submitted_at - self._started_at, 4),
+                "custom_base_prompt": custom_base_prompt,
+                "priority": priority,
+                "parts": parts,
+                "views": views,
+                "queued": round(queued, 4),
+                "chunks": [[round(offset, 4), chunk] for offset, chunk in chunks],
+                "error": None if error is None else repr(error),
+                "result": result
+            })
+
+    def close(self) -> None:
+        with self._lock:
+            self._frames.close()
+            self._events.close()
+
+
+@dataclass
+class _FrameIndexEntry:
+    offset: int
+    length: int
+    mime_type: str
+
+
+class SessionLog:
+    """Reads a session directory written by SessionRecorder."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.detects: List[RecordedDetect] = []
+        self.sessions: List[Dict[str, Any]] = []  # session start events
+        events = self._read_events(path)
+        self._index = self._index_frames(events)
+        offset, last_submitted_at = 0.0, 0.0
+        for event in events:
+            if event["event"] == "session":
+                offset = last_submitted_at
+                self.sessions.append(event)
+            elif event["event"] == "detect":
+                last_submitted_at = offset + event["submitted_at"]
+                self.detects.append(RecordedDetect(
+                    job_id=event["job_id"],
+                    submitted_at=last_submitted_at,
+                    custom_base_prompt=event["custom_base_prompt"],
+                    priority=event["priority"],
+                    parts=event["parts"],
+                    views=event["views"],
+                    queued=event["queued"],
+                    chunks=[(chunk_offset, chunk) for chunk_offset, chunk in event["chunks"]],
+                    error=event["error"],
+                    result=event["result"]
+                ))
+        self.detects.sort(key=lambda detect: detect.submitted_at)
+        pack_path = os.path.join(self.path, FRAMES_FILE)
+        self._pack_file = open(pack_path, "rb")
+        self._pack = mmap.mmap(self._pack_file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(pack_path) else b""
+
+    @staticmethod
+    def _read_events(path: str) -> List[Dict[str, Any]]:
+        events = []
+        with open(os.path.join(path, EVENTS_FILE)) as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:  # e.g. a line cut short when the recording session was killed
+                    continue
+        return events
+
+    @staticmethod
+    def _index_frames(events: List[Dict[str, Any]]) -> Dict[str, _FrameIndexEntry]:
+        """Digest -> location in the pack of every frame logged in the events."""
+        return {
+            event["digest"]: _FrameIndexEntry(event["offset"], event["length"], event["mime_type"])
+            for event in events if event["event"] == "frame"
+        }
+
+    def image(self, digest: str) -> EncodedImage:
+        entry = self._index[digest]
+        return {"mime_type": entry.mime_type, "data": bytes(self._pack[entry.offset:entry.offset + entry.length])}
+
+    def images(self, detect: RecordedDetect) -> List[Union[EncodedImage, str]]:
+        """The detect's prompt images (& text parts) exactly as they were sent."""
+        return [part["text"] if isinstance(part, dict) else self.image(part) for part in detect.parts]
+
+    def responses(self) -> Dict[str, RecordedDetect]:
+        """Successful detects by request key (see _request_key), the first one wins for repeat requests."""
+        responses = {}
+        for detect in self.detects:
+            if detect.error is None:
+                image_digests = [part for part in detect.parts if not isinstance(part, dict)]
+                responses.setdefault(_request_key(detect.custom_base_prompt, image_digests), detect)
+        return responses
+
+    def close(self) -> None:
+        if isinstance(self._pack, mmap.mmap):
+            self._pack.close()
+        self._pack_file.close()
@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+import multiprocessing
+import multiprocessing.util
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ai_stream_interact.utils import img_utils
+from ai_stream_interact.utils.frame_buffer import FrameRingBuffer
+
+# (shared memory name, capacity, frame shape, dtype) i.e. all a worker process needs to map a buffer's frames
+SharedBufferSpec = Tuple[str, int, Tuple[int, ...], str]
+
+
+class SharedFrameRingBuffer(FrameRingBuffer):
+    """FrameRingBuffer in shared memory whose pinned slots other processes can read without copies."""
+
+    def __init__(self, capacity: int, frame_shape: Tuple[int, ...], dtype: np.dtype = np.uint8) -> None:
+        self._shm = None
+        super().__init__(capacity, frame_shape, dtype)
+        self._pins = np.zeros(capacity, dtype=np.int32)  # n refs handed out per slot
+        self._cursor = 0  # next slot to write
+        self._scratch = None  # read into & dropped when every slot is pinned
+
+    def _allocate_frames(self, capacity: int, frame_shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        shape = (capacity, *frame_shape)
+        self._shm = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        return np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+
+    @property
+    def spec(self) -> SharedBufferSpec:
+        return self._shm.name, self._capacity, self.frame_shape, self._frames.dtype.str
+
+    def _reserve_slot(self) -> Tuple[Optional[int], np.ndarray]:
+        """Same as FrameRingBuffer._reserve_slot but never hands out a pinned slot, (None, a scratch frame) if every slot is."""
+        with self._lock:
+            for _ in range(self._capacity):
+                slot = self._cursor
+                self._cursor = (self._cursor + 1) % self._capacity
+                if not self._pins[slot]:
+                    break
+            else:
+                if self._scratch is None:
+                    self._scratch = np.empty(self.frame_shape, dtype=self._frames.dtype)
+                return None, self._scratch
+            self._frame_ids[slot] = -1
+        return slot, self._frames[slot]
+
+    def get_spaced_refs(self, nframes: int, interval: float, end_time: float = None) -> List["FrameRef"]:
+        """Same frames as get_spaced but pinned in place instead of copied out. Each ref must be released once used."""
+        with self._lock:
+            slots = self._spaced_slots(nframes, interval, end_time)
+            self._pins[slots] += 1
+            return [FrameRef(self, int(slot), int(self._frame_ids[slot]), float(self._timestamps[slot])) for slot in slots]
+
+    def _unpin(self, slot: int) -> None:
+        with self._lock:
+            self._pins[slot] -= 1
+
+    def close(self, unmap: bool = True) -> None:
+        """Unlinks the shared memory & unmaps it if unmap and no frames are pinned."""
+        self._shm.unlink()
+        if unmap and not self._pins.any():
+            self._frames = np.empty((0, *self.frame_shape), dtype=self._frames.dtype)
+            self._shm.close()
+
+
+@dataclass
+class FrameRef:
+    """A pinned frame of a SharedFrameRingBuffer, valid until released."""
+    buffer: SharedFrameRingBuffer
+    slot: int
+    frame_id: int
+    timestamp: float
+    released: bool = False
+
+    @property
+    def frame(self) -> np.ndarray:
+        """Read only view of the frame in shared memory (no copy)."""
+        view = self.buffer._frames[self.slot]
+        view.flags.writeable = False
+        return view
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.buffer._unpin(self.slot)
+
+
+def _release_refs(refs: List[FrameRef]) -> None:
+    for ref in refs:
+        ref.release()
+
+
+# Worker process side: buffers are mapped on first use & stay mapped for the life of the worker
+_attached: Dict[str, Tuple[SharedMemory, np.ndarray]] = {}
+
+
+def _attach(spec: SharedBufferSpec) -> np.ndarray:
+    name, capacity, frame_shape, dtype = spec
+    if name not in _attached:
+        shm = SharedMemory(name=name)
+        _attached[name] = (shm, np.ndarray((capacity, *frame_shape), dtype=np.dtype(dtype), buffer=shm.buf))
+    return _attached[name][1]
+
+
+def _warm_up(spec: SharedBufferSpec) -> None:
+    _attach(spec)
+
+
+def _detach_all() -> None:
+    """Unmaps every buffer the worker mapped, once no task is using them."""
+    while _attached:
+        _, (shm, _) = _attached.popitem()
+        shm.close()
+
+
+def _init_worker(parent_pid: int) -> None:
+    """Worker initializer: unmaps the buffers on shutdown & exits once the app is gone."""
+    multiprocessing.util.Finalize(None, _detach_all, exitpriority=10)
+
+    def watch() -> None:
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def _encode_shared_frame(
+    spec: SharedBufferSpec,
+    slot: int,
+    max_edge: int,
+    crop: Union[str, Tuple[int, int, int, int]],
+    img_format: str,
+    quality: int,
+    with_hash: bool
+) -> Tuple[img_utils.EncodedImage, int]:
+    """Crops, downscales, encodes & (optionally) hashes a frame straight out of shared memory."""
+    frame = _attach(spec)[slot]
+    image = img_utils._img_arrays_to_encoded_imgs(img_utils._preprocess_frames([frame], max_edge, crop), img_format, quality)[0]
+    return image, img_utils._phash(frame) if with_hash else None
+
+
+class FrameEncoderPool:
+    """Pool of worker processes encoding & hashing pinned frames straight out of shared memory."""
+
+    def __init__(self, processes: int) -> None:
+        self._pool = multiprocessing.get_context("spawn").Pool(processes, initializer=_init_worker, initargs=(os.getpid(),))
+        self._processes = processes
+
+    def warm_up(self, buffers: List[SharedFrameRingBuffer]) -> None:
+        """Starts the workers & maps the buffers in the background so the first detect doesn't pay for it."""
+        def warm_up() -> None:
+            for _ in range(self._processes):
+                for buffer in buffers:
+                    self._pool.apply_async(_warm_up, (buffer.spec,))
+        threading.Thread(target=warm_up, daemon=True).start()
+
+    def encode(
+        self,
+        refs: List[FrameRef],
+        max_edge: int = None,
+        crop: Union[str, Tuple[int, int, int, int]] = None,
+        img_format: str = "jpeg",
+        quality: int = 90,
+        with_hashes: bool = True
+    ) -> Tuple[List[img_utils.EncodedImage], List[int]]:
+        """Encoded images & perceptual hashes (None if with_hashes is False) of the frames, in order. Frames are encoded in parallel."""
+        results = [
+            self._pool.apply_async(_encode_shared_frame, (ref.buffer.spec, ref.slot, max_edge, crop, img_format, quality, with_hashes))
+            for ref in refs
+        ]
+        images, hashes = zip(*[result.get() for result in results]) if results else ((), ())
+        return list(images), list(hashes) if with_hashes else None
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stops the workers, once they're done with the queued work if wait else right away."""
+        if wait:
+            self._pool.close()
+            self._pool.join()
+        else:
+            self._pool.terminate()
@@ -0,0 +1,114 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from ai_stream_interact.utils.metrics import metrics
+from ai_stream_interact.utils.img_utils import _hamming_distance
+from ai_stream_interact.utils.rate_limiter import CancelToken, RequestCancelled
+
+
+@dataclass
+class SingleFlightConfig:
+    hamming_tolerance: int = 6  # max hamming distance per frame hash
+    supersede: bool = True  # newer detects cancel unsent older ones
+
+
+class _Flight:
+    """One upstream call & the chunks it streamed so far, readable by any number of callers."""
+
+    def __init__(self, prompt: str, frame_hashes: Tuple[int, ...]) -> None:
+        self.prompt = prompt
+        self.frame_hashes = frame_hashes
+        self.cancel_token = CancelToken()
+        self._chunks: List[str] = []
+        self._done = False
+        self._error: Exception = None
+        self._condition = threading.Condition()
+
+    def publish(self, chunk: str) -> None:
+        with self._condition:
+            self._chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, error: Exception = None) -> None:
+        with self._condition:
+            self._done = True
+            self._error = error
+            self._condition.notify_all()
+
+    def follow(self) -> Iterator[str]:
+        """Every chunk from the first one on, as they're published. Raises the upstream call's error if it failed."""
+        read = 0
+        while True:
+            with self._condition:
+                while read == len(self._chunks) and not self._done:
+                    self._condition.wait()
+                chunks, done, error = self._chunks[read:], self._done, self._error
+            read += len(chunks)
+            yield from chunks
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """Coalesces concurrent model calls for the same prompt on near identical frames into a single call."""
+
+    def __init__(self, config: SingleFlightConfig = None) -> None:
+        self._config = config or SingleFlightConfig()
+        self._flights: List[_Flight] = []
+        self._lock = threading.Lock()
+
+    def _matches(self, frame_hashes: Tuple[int, ...], flight: _Flight) -> bool:
+        return len(frame_hashes) == len(flight.frame_hashes) and all(
+            _hamming_distance(a, b) <= self._config.hamming_tolerance for a, b in zip(frame_hashes, flight.frame_hashes)
+        )
+
+    def _join_or_start(self, prompt: str, frame_hashes: Tuple[int, ...], supersede: bool) -> Tuple[_Flight, bool]:
+        """The in flight call to share for the request or a new one, along with whether it's new."""
+        with self._lock:
+            for flight in self._flights:
+                if flight.prompt == prompt and not flight.cancel_token.cancelled and self._matches(frame_hashes, flight):
+                    return flight, False
+            if supersede and self._config.supersede:
+                for flight in self._flights:
+                    if flight.prompt == prompt and not flight.cancel_token.sent and flight.cancel_token.cancel():
+                        metrics.inc("single_flight_total", outcome="superseded")
+            flight = _Flight(prompt, frame_hashes)
+            self._flights.append(flight)
+            return flight, True
+
+    def stream(
+        self,
+        prompt: str,
+        frame_hashes: List[int],
+        call: Callable[[CancelToken], Iterable[str]],
+        supersede: bool = False,
+        on_complete: Callable[[List[str]], None] = None
+    ) -> Iterator[str]:
+        """Streams the response to prompt on the frames, sharing a concurrent identical call if there's one."""
+        flight, leader = self._join_or_start(prompt, tuple(frame_hashes), supersede)
+        if not leader:
+            metrics.inc("single_flight_total", outcome="coalesced")
+            yield from flight.follow()
+            return
+        metrics.inc("single_flight_total", outcome="sent")
+        chunks = []
+        try:
+            for chunk in call(flight.cancel_token):
+                chunks.append(chunk)
+                flight.publish(chunk)
+                yield chunk
+        except GeneratorExit:  # the caller stopped reading, callers sharing the call can't get the rest either
+            flight.finish(RequestCancelled("The shared request was abandoned"))
+            raise
+        except Exception as e:
+            flight.finish(e)
+            raise
+        finally:
+            with self._lock:
+                self._flights.remove(flight)
+        flight.finish()
+        if on_complete is not None:
+            on_complete(chunks)
@@ -0,0 +1,227 @@
+"""Benchmarks the capture -> prompt -> response path end to end against the stub backend."""
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # unix only, cpu time falls back to this process's & memory isn't measured
+    resource = None
+
+from ai_stream_interact.sources import open_source
+from ai_stream_interact.streamer import Streamer
+from ai_stream_interact.pipeline import DetectPipeline
+from ai_stream_interact.models import stub
+from ai_stream_interact.utils.metrics import metrics
+from ai_stream_interact.utils.shared_frames import FrameEncoderPool
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+
+# lower is better for all of these, throughput is compared the other way around
+REGRESSION_KEYS = ("latency.p50", "latency.p95", "latency.p99", "cpu_seconds_per_detect")
+
+
+def _rss_bytes() -> int:
+    """Current resident memory, falls back to the peak where /proc isn't available (None if neither is)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return _peak_rss_bytes()
+
+
+def _peak_rss_bytes() -> int:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _cpu_seconds() -> float:
+    """cpu time of this process & its finished (e.g. encoder pool) child processes."""
+    if resource is None:
+        return time.process_time()
+    return sum(usage.ru_utime + usage.ru_stime for usage in map(resource.getrusage, (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)))
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(np.mean(values)), "max": float(max(values))}
+
+
+def _stage_latencies() -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 of the metrics registry's histograms, e.g. encode_seconds or model_detect_ttft_seconds."""
+    latencies = {}
+    for name, series in metrics.snapshot()["histograms"].items():
+        for entry in series:
+            labels = ",".join(f"{key}={value}" for key, value in sorted(entry["labels"].items()))
+            latencies[f"{name}{{{labels}}}" if labels else name] = {key: entry[key] for key in ("count", "p50", "p95", "p99")}
+    return latencies
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    interact = stub.ModelInteract(
+        interaction_frames_config=InteractionFramesConfig(
+            nframes_interact=args.nframes,
+            frame_capture_interval=args.frame_interval,
+            max_edge=args.max_edge,
+            encoder_processes=args.encoder_processes
+        ),
+        tts_model_name=None,
+        stub_config=stub.StubConfig(
+            first_chunk_latency=args.first_chunk_latency,
+            chunk_interval=args.chunk_interval,
+            words_per_chunk=args.words_per_chunk,
+            error_rate=args.error_rate,
+            seed=args.seed
+        ),
+        use_response_cache=args.response_cache,
+        use_single_flight=not args.no_single_flight
+    )
+    interact.streamer = Streamer(open_source(args.source, loop=True), headless=True, shared_memory=bool(args.encoder_processes))
+    interact.streamer.start_video_stream(display=False)
+    if args.encoder_processes:
+        interact._encoder_pool = FrameEncoderPool(args.encoder_processes)
+        interact._encoder_pool.warm_up([interact.streamer._frames])
+    pipeline = DetectPipeline(interact)
+    interact._detect_pipeline = pipeline
+    pipeline.start()
+    time.sleep(args.nframes * args.frame_interval)  # enough stream history for the first detect
+
+    jobs, submitted_at = [], []
+    rss_before, cpu_before = _rss_bytes(), _cpu_seconds()
+    started_at = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):  # model output & progress prints, not what's measured
+        for i in range(args.detects):
+            next_at = started_at + i * args.submit_interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+            submitted_at.append(time.monotonic())
+            # same as a (d) press: frames from the stream history (or refs to them) handed off to the pipeline
+            frames = interact._get_prompt_frame_refs_from_stream() or interact._get_prompt_frames_from_stream()
+            jobs.append(pipeline.submit(frames, None))
+        drained = pipeline.drain(args.timeout)
+    finished_at = time.monotonic()
+    rss_after = _rss_bytes()
+    interact.streamer.stop_video_stream()
+    interact.streamer.close()
+    if interact._encoder_pool is not None:
+        interact._encoder_pool.shutdown(wait=True)  # so the workers' cpu time is counted
+    cpu_seconds = _cpu_seconds() - cpu_before
+
+    # a job is done once presented (or failed / dropped), only parsed ones count as completed detects
+    latencies = [job.done_at - started for job, started in zip(jobs, submitted_at) if job.done.is_set() and job.result is not None]
+    completed = len(latencies)
+    stages = pipeline.metrics_summary()
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    model_calls = sum(entry["count"] for entry in snapshot["histograms"].get("model_detect_seconds", []))
+    single_flight = {entry["labels"]["outcome"]: entry["value"] for entry in counters.get("single_flight_total", [])}
+    return {
+        "version": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "tolerance")},
+        "drained": drained,
+        "detects": {
+            "submitted": len(jobs),
+            "completed": completed,
+            "dropped": stages["preprocess"]["dropped"],
+            "failed": len(jobs) - completed - stages["preprocess"]["dropped"],
+            "model_calls": model_calls,
+            "coalesced": single_flight.get("coalesced", 0),  # shared another detect's model call
+            "superseded": single_flight.get("superseded", 0)  # cancelled by a newer detect before being sent
+        },
+        "duration": finished_at - started_at,
+        "throughput": completed / (finished_at - started_at),  # completed detects per second
+        "latency": _percentiles(latencies),  # submit -> output presented, seconds
+        "cpu_seconds_per_detect": cpu_seconds / max(completed, 1),
+        "memory": {
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "rss_peak": _peak_rss_bytes(),
+            "rss_growth_per_detect": None if rss_before is None else (rss_after - rss_before) / max(completed, 1)
+        },
+        "stages": _stage_latencies()
+    }
+
+
+def _version() -> str:
+    from ai_stream_interact.runners.run_ai import _get_version
+    return _get_version()
+
+
+def _lookup(results: Dict, key: str) -> float:
+    for part in key.split("."):
+        results = results[part]
+    return results
+
+
+def _regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than tolerance (relative)."""
+    regressions = []
+    for key in REGRESSION_KEYS:
+        new, old = _lookup(results, key), _lookup(baseline, key)
+        if new is not None and old and new > old * (1 + tolerance):
+            regressions.append(f"{key}: {old:.4f} -> {new:.4f} (+{100 * (new / old - 1):.0f}%)")
+    if baseline["throughput"] and results["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput: {baseline['throughput']:.2f} -> {results['throughput']:.2f} detects/s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("AI Stream Interact detect path benchmark")
+    parser.add_argument("--detects", type=int, default=50, help="Number of detects to run.")
+    parser.add_argument("--submit-interval", type=float, default=0.25, help="n seconds between detect submissions (like key presses).")
+    parser.add_argument("--source", type=str, default="synthetic:640x480@30", help="Frame source spec, see --source of the cli.")
+    parser.add_argument("--nframes", type=int, default=3, help="Frames per detect.")
+    parser.add_argument("--frame-interval", type=float, default=0.4, help="n seconds between the frames of a detect.")
+    parser.add_argument("--max-edge", type=int, default=None, help="Downscale frames before upload, see --max-edge of the cli.")
+    parser.add_argument("--encoder-processes", type=int, default=0, help="Encode in n processes out of shared memory, see --encoder-processes of the cli.")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the response cache on (synthetic scenes repeat so it's off by default).")
+    parser.add_argument("--no-single-flight", action="store_true", help="Send every detect to the model, see --no-single-flight of the cli.")
+    parser.add_argument("--first-chunk-latency", type=float, default=0.4, help="Stub backend n seconds until the first chunk.")
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="Stub backend n seconds between chunks.")
+    parser.add_argument("--words-per-chunk", type=int, default=2, help="Stub backend words per streamed chunk.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub backend 0-1 share of detects failing.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Max n seconds to wait for the detects to finish.")
+    parser.add_argument("--output", type=str, help="Optional json file to write the results to.")
+    parser.add_argument("--baseline", type=str, help="Results json of a previous run to compare against, exits 1 on a regression.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative slowdown vs the baseline that counts as a regression.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    detects, latency, memory = results["detects"], results["latency"], results["memory"]
+    print(
+        f"{detects['completed']}/{detects['submitted']} detects completed ({detects['dropped']} dropped, {detects['failed']} failed, "
+        f"{detects['coalesced']:.0f} coalesced, {detects['superseded']:.0f} superseded, {detects['model_calls']} model calls) in {results['duration']:.1f}s"
+    )
+    print(f"throughput           {results['throughput']:8.2f} detects/s")
+    if latency["p50"] is not None:
+        print(f"latency              p50 {latency['p50'] * 1000:.0f}ms  p95 {latency['p95'] * 1000:.0f}ms  p99 {latency['p99'] * 1000:.0f}ms")
+    print(f"cpu per detect       {results['cpu_seconds_per_detect'] * 1000:8.1f}ms")
+    if memory["rss_peak"] is not None:
+        print(f"memory               peak rss {memory['rss_peak'] / 2 ** 20:.0f}MB, {memory['rss_growth_per_detect'] / 2 ** 10:.1f}KB rss growth per detect")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = _regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
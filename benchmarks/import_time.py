@@ -0,0 +1,56 @@
+"""Measures cli startup & model backend import time, each run in a fresh interpreter."""
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+
+CONSTRUCT_SNIPPET = """
+import time
+started_at = time.perf_counter()
+import importlib
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+Interact = importlib.import_module("ai_stream_interact.models.{llm}").ModelInteract
+Interact(interaction_frames_config=InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.4), tts_model_name=None)
+print(time.perf_counter() - started_at)
+"""
+
+
+def _wall_time(command: list) -> float:
+    started_at = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started_at
+
+
+def _in_process_time(snippet: str) -> float:
+    return float(subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True).stdout)
+
+
+def _summary(values: list) -> dict:
+    return {"min": min(values), "median": statistics.median(values), "max": max(values)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("AI Stream Interact import time benchmark")
+    parser.add_argument("--llm", type=str, default="gemini", help="Model backend to construct.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", type=str, help="Optional json file to write the results to.")
+    args = parser.parse_args()
+
+    cli = [sys.executable, "-m", "ai_stream_interact.runners.run_ai"]
+    results = {
+        "version_wall_time": _summary([_wall_time(cli + ["--version"]) for _ in range(args.runs)]),
+        "help_wall_time": _summary([_wall_time(cli + ["--help"]) for _ in range(args.runs)]),
+        "time_to_menu": _summary([_in_process_time(CONSTRUCT_SNIPPET.format(llm=args.llm)) for _ in range(args.runs)]),
+    }
+    for name, summary in results.items():
+        print(f"{name:<20} median {summary['median'] * 1000:8.1f}ms  (min {summary['min'] * 1000:.1f}ms, max {summary['max'] * 1000:.1f}ms)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
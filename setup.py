@@ -20,7 +20,6 @@ setup(
         'pygrabber',
         'pynput',
         'python-dotenv',
-        'ratelimit',
         'rich',
         'TTS',
         'google-generativeai>=0.3.2'
@@ -0,0 +1,144 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+from ai_stream_interact.models import gemini_async
+from ai_stream_interact.utils.rate_limiter import (
+    AsyncTokenBucket, CancelToken, RequestCancelled, async_retry, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+)
+
+
+class _FakeChunk:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class FakeAsyncGenerativeModel:
+    """Stands in for genai.GenerativeModel: generate_content_async streams a detect formatted answer after latency seconds."""
+
+    def __init__(self, latency: float = 0.2) -> None:
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _stream(self, call: int):
+        try:
+            await asyncio.sleep(self._latency)
+            for text in [f"Object Detected: fake object {call}\n", "Detailed Description: A fake detection.\n", "Confidence Level: 0.9"]:
+                yield _FakeChunk(text)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            call = self.calls
+        return self._stream(call)
+
+
+def test_async_token_bucket_serves_interactive_before_background():
+    async def run():
+        bucket = AsyncTokenBucket(rate=20, burst=1)
+        await bucket.acquire()  # drain the burst so the waiters below queue up
+        order = []
+
+        async def acquire(name, priority):
+            await bucket.acquire(priority)
+            order.append(name)
+
+        background = [asyncio.create_task(acquire(f"background-{i}", PRIORITY_BACKGROUND)) for i in range(2)]
+        await asyncio.sleep(0)  # background requests arrive first
+        interactive = asyncio.create_task(acquire("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "background-0", "background-1"]
+
+
+def test_async_token_bucket_cancelled_waiter_gives_its_turn_up():
+    async def run():
+        bucket = AsyncTokenBucket(rate=10, burst=1)
+        await bucket.acquire()
+        token = CancelToken()
+        cancelled = asyncio.create_task(bucket.acquire(PRIORITY_INTERACTIVE, token))
+        other = asyncio.create_task(bucket.acquire(PRIORITY_BACKGROUND))
+        await asyncio.sleep(0.01)
+        assert token.cancel()
+        with pytest.raises(RequestCancelled):
+            await cancelled
+        await other
+        return token
+
+    token = asyncio.run(run())
+    assert token.cancelled and not token.sent
+
+
+def test_async_token_bucket_penalize_pauses_grants():
+    async def run():
+        bucket = AsyncTokenBucket(rate=100, burst=5)
+        await bucket.penalize(0.3)
+        started_at = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started_at
+
+    assert asyncio.run(run()) >= 0.29
+
+
+def test_async_retry_retries_until_success():
+    calls = []
+
+    @async_retry(max_tries=3, base_delay=0.001)
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("try again")
+        return "ok"
+
+    assert asyncio.run(flaky()) == "ok"
+    assert len(calls) == 3
+
+
+def test_async_retry_gives_up_on_cancelled_requests():
+    calls = []
+
+    @async_retry(max_tries=5, base_delay=0.001)
+    async def cancelled():
+        calls.append(1)
+        raise RequestCancelled("superseded")
+
+    with pytest.raises(RequestCancelled):
+        asyncio.run(cancelled())
+    assert len(calls) == 1
+
+
+def test_gemini_async_runs_concurrent_detects():
+    interact = gemini_async.ModelInteract(
+        interaction_frames_config=InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.1),
+        tts_model_name=None
+    )
+    interact._rate_limiter = AsyncTokenBucket(rate=100, burst=10)
+    model = FakeAsyncGenerativeModel(latency=0.3)
+    interact.__dict__["multimodal_model"] = model  # overrides the cached property
+    images = [{"mime_type": "image/jpeg", "data": b"frame"}]
+    results = [None] * 4
+
+    def detect(i):
+        results[i] = "".join(interact._ai_detect_object(images))
+
+    threads = [threading.Thread(target=detect, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert model.calls == 4
+    assert model.max_in_flight == 4  # in flight at once rather than one after the other
+    assert sorted(result.splitlines()[0] for result in results) == [f"Object Detected: fake object {i}" for i in range(1, 5)]
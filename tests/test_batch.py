@@ -0,0 +1,78 @@
+import json
+
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+from ai_stream_interact.batch import BatchConfig, BatchRunner, WINDOW_MODE_STRIDE
+from ai_stream_interact.models import stub
+
+SOURCE = "synthetic:160x120@30:300"  # 10s of footage
+
+
+class FlakyBackend(stub.ModelInteract):
+    """Stub backend failing the given detect calls (1 based)."""
+
+    def __init__(self, *args, fail_calls=(), **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._fail_calls = set(fail_calls)
+        self.calls = 0
+
+    def _ai_detect_object(self, images, custom_base_prompt=None, priority=0, cancel_token=None):
+        self.calls += 1
+        if self.calls in self._fail_calls:
+            raise ConnectionError("backend down")
+        yield from super()._ai_detect_object(images, custom_base_prompt, priority, cancel_token)
+
+
+def _backend(**kwargs) -> FlakyBackend:
+    return FlakyBackend(
+        interaction_frames_config=InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.4),
+        tts_model_name=None,
+        use_response_cache=False,
+        use_single_flight=False,
+        **kwargs
+    )
+
+
+def _run(output: str, **kwargs) -> dict:
+    config = BatchConfig(input=SOURCE, output=output, window_mode=WINDOW_MODE_STRIDE, stride=1.0, workers=1)
+    return BatchRunner(_backend(**kwargs), config).run()
+
+
+def _records(output) -> list:
+    """Records of the results file, skipping a line cut short by a killed run."""
+    records = []
+    for line in output.read_text().splitlines():
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+def test_stride_windows_are_labelled_into_jsonl(tmp_path):
+    output = tmp_path / "labels.jsonl"
+    stats = _run(str(output))
+    records = _records(output)
+    assert stats == {"windows": len(records), "skipped": 0, "failed": 0}
+    assert 8 <= len(records) <= 10  # a window per second once a full window of history is in
+    assert all(r["result"]["label"].startswith("stub-object-") and r["nframes"] == 3 for r in records)
+    assert [r["end"] for r in records] == sorted(r["end"] for r in records)
+
+
+def test_resume_skips_done_windows_and_retries_failed_ones(tmp_path):
+    output = tmp_path / "labels.jsonl"
+    _run(str(output), fail_calls={2})
+    first = _records(output)
+    failed = [r["window_id"] for r in first if r["error"] is not None]
+    assert len(failed) == 1
+    # the run is killed mid way: the last records are lost & the one after is cut short
+    lines = output.read_text().splitlines(keepends=True)
+    output.write_text("".join(lines[:4]) + lines[4][:20])
+
+    stats = _run(str(output))
+    assert stats["skipped"] == 3  # the 4 complete records minus the failed one
+    assert stats["failed"] == 0
+    records = _records(output)
+    done = {r["window_id"] for r in records if r["error"] is None}
+    assert done == {r["window_id"] for r in first}
+    assert stats["windows"] == len(first) - 3
+
@@ -0,0 +1,51 @@
+from ai_stream_interact.models.gemini import ChatHistoryConfig, DETECT_TURN_PROMPT, SUMMARY_PROMPT, _ChatSession
+
+DETECT_RESPONSE = "Object Detected: red mug\nDetailed Description: " + "A ceramic mug with a chipped handle. " * 20 + "\nConfidence Level: 0.9"
+
+
+def _texts(contents):
+    return [(content.role, content.parts[0].text) for content in contents]
+
+
+def test_detects_are_remembered_as_one_line_turns():
+    session = _ChatSession(ChatHistoryConfig(max_history_tokens=400))
+    session.append_turn("What's my name?", "You told me it's Sam.")
+    for _ in range(20):
+        session.append_detect(DETECT_RESPONSE)
+
+    texts = _texts(session.contents_for("And the mug?"))
+    assert ("model", "Detected: red mug") in texts
+    assert ("user", "What's my name?") in texts  # 20 detects still fit next to the chat turn
+    assert sum(text == DETECT_TURN_PROMPT for _, text in texts) == 20
+
+
+def test_custom_prompt_detects_keep_their_prompt_and_response():
+    session = _ChatSession()
+    session.append_detect("Two people, one is waving.", custom_base_prompt="How many people are there?")
+    assert _texts(session.contents_for("Who's waving?"))[:2] == [
+        ("user", "How many people are there?"), ("model", "Two people, one is waving.")
+    ]
+
+
+def test_turns_evicted_from_the_window_are_summarized():
+    session = _ChatSession(ChatHistoryConfig(max_history_tokens=60, max_summary_tokens=1000))
+    for i in range(6):
+        session.append_turn(f"Question {i}: " + "words " * 10, f"Answer {i}")
+
+    contents = _texts(session.contents_for("Next"))
+    role, summary = contents[0]
+    assert role == "user" and summary.startswith(SUMMARY_PROMPT)
+    assert "Question 0:" in summary and "-> Answer 0" in summary
+    assert contents[1] == ("model", "Noted.")
+    assert [text for role, text in contents[2:-1] if role == "model"] == ["Answer 4", "Answer 5"]
+    assert contents[-1] == ("user", "Next")
+
+
+def test_summary_keeps_to_its_budget():
+    session = _ChatSession(ChatHistoryConfig(max_history_tokens=10, max_summary_tokens=30))
+    for i in range(50):
+        session.append_turn(f"Question {i}", f"Answer {i}")
+
+    summary = _texts(session.contents_for("Next"))[0][1]
+    assert "Answer 48" in summary and "Answer 0" not in summary
+    assert len(summary) < len(SUMMARY_PROMPT) + 30 * 4 + 40
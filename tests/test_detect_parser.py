@@ -0,0 +1,57 @@
+from ai_stream_interact.utils.detect_parser import DetectResponseParser, FIELD_CONFIDENCE, FIELD_DESCRIPTION, FIELD_LABEL
+
+RESPONSE = "**Object Detected:** coffee mug\nDetailed Description: A white ceramic mug\non a desk.\nConfidence Level: 85%\n"
+
+
+def test_fields_fire_as_soon_as_they_complete_while_streaming():
+    events = []
+    parser = DetectResponseParser(on_event=events.append)
+    for i in range(0, len(RESPONSE), 7):
+        parser.feed(RESPONSE[i:i + 7])
+        if "Detailed" in RESPONSE[:i + 7]:
+            assert events[0].name == FIELD_LABEL  # before the rest of the response arrived
+    result = parser.close()
+    assert [event.name for event in events] == [FIELD_LABEL, FIELD_DESCRIPTION, FIELD_CONFIDENCE]
+    assert (result.label, result.description, result.confidence) == ("coffee mug", "A white ceramic mug\non a desk.", 0.85)
+    assert not result.repaired
+
+
+def test_malformed_output_is_repaired_once():
+    calls = []
+
+    def repair(raw_output: str) -> str:
+        calls.append(raw_output)
+        return "Object Detected: cup\nDetailed Description: A cup.\nConfidence Level: 0.7"
+
+    parser = DetectResponseParser(repair=repair)
+    parser.feed("I think it's a cup, fairly sure.")
+    result = parser.close()
+    assert calls == ["I think it's a cup, fairly sure."]
+    assert (result.label, result.confidence, result.repaired) == ("cup", 0.7, True)
+
+
+def test_partial_output_only_repairs_the_missing_fields():
+    parser = DetectResponseParser(repair=lambda raw: "Object Detected: bowl\nDetailed Description: A bowl.\nConfidence Level: 0.4")
+    parser.feed("Object Detected: cup\nDetailed Description: A cup.")
+    result = parser.close()
+    assert (result.label, result.description, result.confidence) == ("cup", "A cup.", 0.4)  # first occurrence wins
+
+
+def test_failed_repair_falls_back_to_the_heuristic():
+    def repair(raw_output: str) -> str:
+        raise ConnectionError("model down")
+
+    parser = DetectResponseParser(repair=repair, max_repairs=3)
+    parser.feed("A red apple\nsitting on a table, confidence: 90%")
+    result = parser.close()
+    assert (result.label, result.description, result.confidence) == ("A red apple", "sitting on a table, confidence: 90%", 0.9)
+    assert result.repaired
+
+
+def test_unrepairable_output_is_retried_up_to_max_repairs():
+    calls = []
+    parser = DetectResponseParser(repair=lambda raw: calls.append(raw) or "still not the format", max_repairs=2)
+    parser.feed("gibberish")
+    result = parser.close()
+    assert len(calls) == 2
+    assert result.label == "gibberish"  # heuristic
@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ai_stream_interact.utils.frame_buffer import FrameRingBuffer
+
+
+def _frame(value: int) -> np.ndarray:
+    return np.full((4, 4, 3), value % 256, dtype=np.uint8)
+
+
+def _filled(n: int, capacity: int = 8, fps: float = 10.0) -> FrameRingBuffer:
+    buffer = FrameRingBuffer(capacity, (4, 4, 3))
+    for i in range(n):
+        buffer.write(_frame(i), timestamp=i / fps)
+    return buffer
+
+
+def test_keeps_the_last_capacity_frames_oldest_first():
+    buffer = _filled(11, capacity=8)
+    assert len(buffer) == 8
+    assert buffer.latest_frame_id == 10
+    window = buffer.get_window(duration=10)
+    assert [b.frame_id for b in window] == list(range(3, 11))
+    assert all(b.frame[0, 0, 0] == b.frame_id for b in window)
+
+
+def test_empty_buffer():
+    buffer = FrameRingBuffer(4, (4, 4, 3))
+    assert buffer.latest() is None and buffer.latest_frame_id == -1
+    assert buffer.get_spaced(3, 0.1) == [] and buffer.get_window(1.0) == []
+    with pytest.raises(ValueError):
+        FrameRingBuffer(0, (4, 4, 3))
+
+
+def test_spaced_frames_are_the_nearest_to_each_target_time():
+    buffer = _filled(20, capacity=20)  # 0.0 to 1.9s
+    assert [b.timestamp for b in buffer.get_spaced(3, 0.5)] == pytest.approx([0.9, 1.4, 1.9])
+    assert [b.timestamp for b in buffer.get_spaced(3, 0.5, end_time=1.0)] == pytest.approx([0.0, 0.5, 1.0])
+    assert [b.frame_id for b in buffer.get_spaced(3, 0.01)] == [19]  # targets nearest to the same frame get it once
+
+
+def test_window_is_subsampled_evenly():
+    buffer = _filled(20, capacity=20)
+    assert [b.frame_id for b in buffer.get_window(duration=1.0, max_frames=3)] == [9, 14, 19]
+    assert buffer.fps() == pytest.approx(10.0)
+
+
+def test_copies_out_are_never_torn_by_the_writer():
+    buffer = FrameRingBuffer(4, (64, 64, 3))
+    stop = threading.Event()
+
+    def write() -> None:
+        i = 0
+        while not stop.is_set():
+            buffer.write(np.full((64, 64, 3), i % 256, dtype=np.uint8))
+            i += 1
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(500):
+            for b in buffer.get_spaced(3, 0.0) + [buffer.latest()]:
+                if b is not None:
+                    assert (b.frame == b.frame_id % 256).all()
+    finally:
+        stop.set()
+        writer.join()
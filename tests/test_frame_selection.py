@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+from ai_stream_interact.utils.frame_selection import _gray_thumbnails, _pairwise_dissimilarity, _select_frames
+
+
+def _scene(seed: int) -> np.ndarray:
+    """Blocky random 240x320 BGR frame, a different scene per seed."""
+    blocks = np.random.default_rng(seed).integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((20, 20, 1), dtype=np.uint8))
+
+
+def _blurred(frame: np.ndarray) -> np.ndarray:
+    """Same frame with motion blur."""
+    return cv2.GaussianBlur(frame, (21, 21), 8)
+
+
+def test_sharp_frames_are_picked_over_blurred_ones():
+    frames = [_blurred(_scene(1)), _scene(1), _blurred(_scene(2)), _scene(2)]
+    assert _select_frames(frames, 2, diversity_weight=0.5) == [1, 3]
+
+
+def test_diverse_frames_are_picked_over_duplicates():
+    frames = [_scene(1), _scene(1), _scene(1), _scene(2), _scene(3)]
+    assert _select_frames(frames, 3, diversity_weight=0.8) == [0, 3, 4]  # time ordered
+
+
+def test_fewer_frames_than_asked_are_all_kept():
+    assert _select_frames([_scene(1), _scene(2)], 3) == [0, 1]
+
+
+def test_dissimilarity_matches_the_rms_pixel_difference():
+    thumbnails = _gray_thumbnails([_scene(seed) for seed in range(4)])
+    expected = np.sqrt(((thumbnails[:, None] - thumbnails[None, :]).astype(np.float64) ** 2).mean(axis=(2, 3)))
+    np.testing.assert_allclose(_pairwise_dissimilarity(thumbnails), expected, atol=1e-3)
@@ -0,0 +1,47 @@
+import threading
+from types import SimpleNamespace
+
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig, interact_on_key
+from ai_stream_interact.models import stub
+
+
+class KeyBackend(stub.ModelInteract):
+    """Stub backend recording the thread each of its key handlers ran on."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.threads = {}
+        self.done = threading.Event()
+
+    @interact_on_key("d")
+    def ai_detect_object_mode(self) -> None:
+        self.threads["d"] = threading.current_thread().name
+
+    @interact_on_key("p", prompts_user=True)
+    def ask(self) -> None:
+        self.threads["p"] = threading.current_thread().name
+        self.done.set()
+
+
+def _backend() -> KeyBackend:
+    return KeyBackend(interaction_frames_config=InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.1), tts_model_name=None)
+
+
+def test_key_handlers_include_the_base_ones_with_overrides_taking_precedence():
+    handlers = _backend()._key_handlers
+    assert handlers["d"] == "ai_detect_object_mode" and handlers["p"] == "ask"
+    assert {"c", "i", "m", "s"} <= set(handlers)
+    assert stub.ModelInteract(
+        interaction_frames_config=InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.1), tts_model_name=None
+    )._key_handlers.get("p") is None
+
+
+def test_prompting_handlers_run_off_the_handler_pool():
+    backend = _backend()
+    backend._key_handling_enabled = True
+    backend._dispatch_key_press(SimpleNamespace(char="d"))
+    backend._dispatch_key_press(SimpleNamespace(char="p"))
+    assert backend.done.wait(2)
+    backend._key_handler_pool.shutdown(wait=True)
+    assert backend.threads["d"].startswith("key-handler")
+    assert backend.threads["p"].startswith("key-prompt")
@@ -0,0 +1,90 @@
+import time
+import threading
+
+import pytest
+
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig, MULTI_CAMERA_FANOUT, MULTI_CAMERA_MULTIVIEW
+from ai_stream_interact.models import stub
+from ai_stream_interact.multi_streamer import MultiStreamer
+from ai_stream_interact.pipeline import DetectPipeline
+from ai_stream_interact.sources import SyntheticSource
+
+
+class CountingStub(stub.ModelInteract):
+    """Stub backend keeping track of how many detects are in flight at once."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _ai_detect_object(self, *args, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield from super()._ai_detect_object(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def streamer():
+    streamer = MultiStreamer(
+        [SyntheticSource(160, 120, fps=30, seed=0, speed=4), SyntheticSource(160, 120, fps=10, seed=1, speed=4)],
+        headless=True,
+        names=["left", "right"]
+    )
+    streamer.start_video_stream()
+    time.sleep(1)
+    yield streamer
+    streamer.stop_video_stream()
+    streamer.close()
+
+
+def test_synchronized_frames_end_at_the_same_moment(streamer):
+    sync_time = streamer._sync_time()
+    frames = streamer.get_synchronized_frames(3, 0.2)
+    assert list(frames) == ["left", "right"]
+    assert all(len(camera_frames) == 3 and camera_frames[0].shape == (120, 160, 3) for camera_frames in frames.values())
+    for camera, camera_streamer in streamer.streamers.items():
+        buffered = camera_streamer._frames.get_spaced(3, 0.2, sync_time)
+        assert abs(buffered[-1].timestamp - sync_time) < 1 / 10  # nearest frame to the sync time, within a frame of the slowest camera
+        assert [b.timestamp for b in buffered] == sorted(b.timestamp for b in buffered)
+
+
+def _run_detect(streamer, multi_camera_mode):
+    interact = CountingStub(
+        interaction_frames_config=InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.1),
+        tts_model_name=None,
+        multi_camera_mode=multi_camera_mode,
+        stub_config=stub.StubConfig(first_chunk_latency=0.3)
+    )
+    interact.streamer = streamer
+    interact.custom_base_prompt = None
+    interact._detect_pipeline = DetectPipeline(interact)
+    interact._detect_pipeline.start()
+    jobs = []
+    submit = interact._detect_pipeline.submit
+    interact._detect_pipeline.submit = lambda *args, **kwargs: jobs.append(submit(*args, **kwargs))
+    interact._submit_detect()
+    assert interact._detect_pipeline.drain(10)
+    return interact, jobs
+
+
+def test_fanout_sends_one_concurrent_detect_per_camera(streamer):
+    interact, jobs = _run_detect(streamer, MULTI_CAMERA_FANOUT)
+    assert [job.views for job in jobs] == [["left"] * 3, ["right"] * 3]
+    assert all(job.result is not None for job in jobs)
+    assert jobs[0].result.label != jobs[1].result.label
+    assert interact.max_in_flight == 2
+
+
+def test_multiview_sends_a_single_detect_with_every_camera(streamer):
+    interact, jobs = _run_detect(streamer, MULTI_CAMERA_MULTIVIEW)
+    assert len(jobs) == 1
+    assert jobs[0].views == ["left"] * 3 + ["right"] * 3
+    assert sum(not isinstance(image, str) for image in jobs[0].images) == 6
+    assert jobs[0].result is not None
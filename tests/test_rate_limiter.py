@@ -0,0 +1,125 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from ai_stream_interact.utils import rate_limiter
+from ai_stream_interact.utils.metrics import metrics
+from ai_stream_interact.utils.rate_limiter import (
+    AsyncTokenBucket, CancelToken, RequestCancelled, TokenBucketRateLimiter, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+)
+
+
+class FakeClock:
+    """Stands in for the time module in rate_limiter: monotonic only moves when advanced."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def _available_tokens(limiter: TokenBucketRateLimiter) -> int:
+    taken = 0
+    while True:
+        try:
+            limiter.acquire(timeout=0)
+        except TimeoutError:
+            return taken
+        taken += 1
+
+
+def test_burst_then_steady_rate(clock):
+    limiter = TokenBucketRateLimiter(rate=1, burst=3)
+    assert _available_tokens(limiter) == 3
+    clock.advance(1)
+    assert _available_tokens(limiter) == 1
+
+
+def test_retry_after_blocks_then_resumes_at_the_steady_rate(clock):
+    limiter = TokenBucketRateLimiter(rate=1, burst=4)
+    limiter.penalize(10)
+    clock.advance(9)
+    assert _available_tokens(limiter) == 0
+    clock.advance(2)  # 1s past the block
+    assert _available_tokens(limiter) == 1
+
+
+def test_interactive_lane_is_served_before_background():
+    limiter = TokenBucketRateLimiter(rate=20, burst=1)
+    limiter.acquire()  # drain the burst so the waiters below queue up
+    order = []
+
+    def acquire(name, priority):
+        limiter.acquire(priority)
+        order.append(name)
+
+    background = [threading.Thread(target=acquire, args=(f"background-{i}", PRIORITY_BACKGROUND)) for i in range(2)]
+    for thread in background:
+        thread.start()
+    time.sleep(0.01)  # background requests arrive first
+    interactive = threading.Thread(target=acquire, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    for thread in background + [interactive]:
+        thread.join(2)
+    assert order == ["interactive", "background-0", "background-1"]
+
+    waits = {s["labels"]["lane"] for s in metrics.snapshot()["histograms"]["rate_limit_wait_seconds"]}
+    assert {"interactive", "background"} <= waits
+
+
+def test_cancel_before_send_gives_the_turn_up():
+    limiter = TokenBucketRateLimiter(rate=10, burst=1)
+    limiter.acquire()
+    token = CancelToken()
+    errors = []
+
+    def acquire():
+        try:
+            limiter.acquire(cancel_token=token)
+        except RequestCancelled as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=acquire)
+    waiter.start()
+    time.sleep(0.01)
+    assert token.cancel()
+    waiter.join(2)
+    assert len(errors) == 1 and not token.sent
+
+
+class _CancelledOnSend(CancelToken):
+    """Cancelled right as its token is granted."""
+
+    def mark_sent(self) -> bool:
+        self.cancel()
+        return super().mark_sent()
+
+
+def test_token_granted_to_a_cancelled_request_is_given_back(clock):
+    limiter = TokenBucketRateLimiter(rate=1, burst=1)
+    with pytest.raises(RequestCancelled):
+        limiter.acquire(cancel_token=_CancelledOnSend())
+    assert _available_tokens(limiter) == 1
+
+
+def test_sync_and_async_limiters_share_one_budget(clock):
+    limiter = TokenBucketRateLimiter(rate=1, burst=2)
+    bucket = AsyncTokenBucket.sharing(limiter)
+    asyncio.run(bucket.acquire())
+    assert _available_tokens(limiter) == 1
+    asyncio.run(bucket.penalize(5))
+    clock.advance(6)
+    assert _available_tokens(limiter) == 1
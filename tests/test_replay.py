@@ -0,0 +1,83 @@
+import json
+import time
+import threading
+
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+from ai_stream_interact.models import stub
+from ai_stream_interact.pipeline import DetectPipeline, PipelineConfig
+from ai_stream_interact.replay import ReplayConfig, ReplayRunner
+from ai_stream_interact.sources import SyntheticSource
+
+
+class PresentingStub(stub.ModelInteract):
+    """Stub backend keeping every presented output, whose first detect is slow to preprocess."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.presented = []
+        self._preprocessed = 0
+        self._lock = threading.Lock()
+
+    def _frames_to_prompt_imgs(self, *args, **kwargs):
+        with self._lock:
+            self._preprocessed += 1
+            first = self._preprocessed == 1
+        if first:
+            time.sleep(0.3)
+        return super()._frames_to_prompt_imgs(*args, **kwargs)
+
+    def _present_model_output(self, output) -> None:
+        self.presented.append("".join(output))
+
+
+def _interact(**kwargs) -> PresentingStub:
+    return PresentingStub(
+        interaction_frames_config=InteractionFramesConfig(nframes_interact=2, frame_capture_interval=0.1),
+        tts_model_name=None,
+        stub_config=stub.StubConfig(first_chunk_latency=0.05, chunk_interval=0.0),
+        use_response_cache=False,
+        **kwargs
+    )
+
+
+def _scenes(n: int):
+    source = SyntheticSource(96, 72, scene_length=10)
+    return [[source.frame_at(scene * 10 + 9), source.frame_at(scene * 10 + 8)] for scene in range(n)]
+
+
+def _labels(outputs):
+    return [output.splitlines()[0] for output in outputs]
+
+
+def test_in_order_pipeline_presents_in_submission_order():
+    interact = _interact()
+    pipeline = DetectPipeline(interact, PipelineConfig(in_order=True))
+    interact._detect_pipeline = pipeline
+    pipeline.start()
+    jobs = [pipeline.submit(frames) for frames in _scenes(3)]
+    assert pipeline.drain(10)
+    assert _labels(interact.presented) == [f"Object Detected: {job.result.label}" for job in jobs]
+
+
+def test_replay_matches_the_recording_in_recorded_order(tmp_path):
+    session = str(tmp_path / "session")
+    recording = _interact(record_session=session)
+    pipeline = DetectPipeline(recording)
+    recording._detect_pipeline = pipeline
+    pipeline.start()
+    jobs = []
+    for frames in _scenes(4):
+        jobs.append(pipeline.submit(frames))
+        time.sleep(0.05)
+    assert pipeline.drain(10)
+    recording._session_recorder.close()
+    recorded_labels = [job.result.label for job in jobs]
+
+    replaying = _interact()
+    report = str(tmp_path / "report.jsonl")
+    summary = ReplayRunner(replaying, ReplayConfig(session=session, speed=0, output=report, timeout=10)).run()
+
+    assert summary["detects"] == 4 and summary["drained"] and summary["label_mismatches"] == 0
+    assert _labels(replaying.presented) == [f"Object Detected: {label}" for label in recorded_labels]
+    with open(report) as f:
+        assert [json.loads(line)["label"] for line in f] == recorded_labels
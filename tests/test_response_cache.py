@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+from ai_stream_interact.models import stub
+from ai_stream_interact.utils import response_cache
+from ai_stream_interact.utils.img_utils import _phash
+from ai_stream_interact.utils.response_cache import ResponseCache, ResponseCacheConfig
+
+
+class FakeClock:
+    """Stands in for the time module in response_cache: time only moves when advanced."""
+
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+def _scene(seed: int) -> np.ndarray:
+    """Blocky random 240x320 BGR frame, a different scene per seed."""
+    blocks = np.random.default_rng(seed).integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((40, 40, 1), dtype=np.uint8))
+
+
+def _noisy(frame: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Same scene with sensor noise."""
+    noise = np.random.default_rng(seed).integers(-4, 5, frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def test_near_duplicate_frames_hit_and_other_scenes_miss():
+    cache = ResponseCache()
+    cache.put("detect", [_phash(_scene(1)), _phash(_scene(2))], ["Object ", "Detected: cup"])
+    assert cache.get("detect", [_phash(_noisy(_scene(1))), _phash(_noisy(_scene(2), 1))]) == ["Object ", "Detected: cup"]
+    assert cache.get("detect", [_phash(_scene(1)), _phash(_scene(3))]) is None
+    assert cache.get("detect", [_phash(_scene(1))]) is None  # different number of frames
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_same_frames_under_another_request_key_miss():
+    frames = [_phash(_scene(1))]
+    cache = ResponseCache()
+    cache.put("detect", frames, ["cup"])
+    assert cache.get("detect with a custom prompt", frames) is None
+
+    config = InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.1)
+    interact = stub.ModelInteract(interaction_frames_config=config, tts_model_name=None)
+    keys = {
+        interact._request_key([], None),
+        interact._request_key([], "What colour is it?"),
+        interact._request_key(["Camera 0:"], None),
+        stub.ModelInteract(interaction_frames_config=InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.1, max_edge=512),
+                           tts_model_name=None)._request_key([], None),
+    }
+    assert len(keys) == 4
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ResponseCacheConfig(ttl=10))
+    cache.put("detect", [1], ["cup"])
+    clock.advance(9)
+    assert cache.get("detect", [1]) == ["cup"]
+    clock.advance(2)
+    assert cache.get("detect", [1]) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(ResponseCacheConfig(max_entries=2, hamming_tolerance=0))
+    cache.put("detect", [1], ["one"])
+    cache.put("detect", [2], ["two"])
+    assert cache.get("detect", [1]) == ["one"]  # 2 is now the least recently used
+    cache.put("detect", [4], ["four"])
+    assert cache.get("detect", [2]) is None
+    assert cache.get("detect", [1]) == ["one"] and cache.get("detect", [4]) == ["four"]
+
+
+def test_sqlite_tier_outlives_the_process_until_the_ttl(tmp_path, clock):
+    config = ResponseCacheConfig(ttl=10, sqlite_path=str(tmp_path / "responses.db"))
+    frames = [_phash(_scene(1)), (1 << 127) | 5]  # full 128 bit hashes survive the round trip
+    ResponseCache(config).put("detect", frames, ["Object ", "Detected: cup"])
+    restarted = ResponseCache(config)
+    assert restarted.get("detect", [_phash(_noisy(_scene(1))), (1 << 127) | 5]) == ["Object ", "Detected: cup"]
+    clock.advance(11)
+    assert ResponseCache(config).get("detect", frames) is None
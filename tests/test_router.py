@@ -0,0 +1,116 @@
+import time
+import threading
+
+import pytest
+
+from ai_stream_interact.base.ai_interact_base import InteractionFramesConfig
+from ai_stream_interact.models import router, stub
+from ai_stream_interact.models.router import RouterConfig
+from ai_stream_interact.utils.rate_limiter import CancelToken, RequestCancelled
+
+
+class ChatSession(list):
+    """Stands in for gemini's _ChatSession, a list of the recorded prompts & detects."""
+
+    def append_turn(self, prompt: str, response: str) -> None:
+        self.append(prompt)
+
+    def append_detect(self, response: str, custom_base_prompt: str = None) -> None:
+        self.append(f"detect: {response.splitlines()[0]}")
+
+
+class ChatBackend(stub.ModelInteract):
+    """Stub backend keeping a chat history, optionally failing every call or answering slowly."""
+
+    def __init__(self, *args, fail: bool = False, latency: float = 0.0, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._fail = fail
+        self._latency = latency
+        self._chat_session = ChatSession()
+        self.histories = []  # history seen by each chat call
+        self.sent = threading.Event()
+
+    def _ai_interactive_mode(self, prompt: str, cancel_token: CancelToken = None):
+        self.histories.append(list(self._chat_session))
+        time.sleep(self._latency)
+        if self._fail:
+            raise ConnectionError("backend down")
+        if cancel_token is not None and not cancel_token.mark_sent():
+            raise RequestCancelled("Cancelled before it was sent")
+        self.sent.set()
+        yield f"answer to {prompt}"
+        if self._records_history:
+            self._chat_session.append_turn(prompt, f"answer to {prompt}")
+
+    def _ai_detect_object(self, images, custom_base_prompt=None, priority=0, cancel_token=None):
+        time.sleep(self._latency)
+        if self._fail:
+            raise ConnectionError("backend down")
+        response = "".join(super()._ai_detect_object(images, custom_base_prompt, priority, cancel_token))
+        yield response
+        if self._records_history:
+            self._chat_session.append_detect(response, custom_base_prompt)
+
+
+FRAMES_CONFIG = InteractionFramesConfig(nframes_interact=3, frame_capture_interval=0.1)
+
+
+def _router(**config) -> router.ModelInteract:
+    """Router without any backend yet, they're registered by the tests."""
+    return router.ModelInteract(interaction_frames_config=FRAMES_CONFIG, tts_model_name=None, router_config=RouterConfig(backends=[], **config))
+
+
+def _backend(**kwargs) -> ChatBackend:
+    return ChatBackend(interaction_frames_config=FRAMES_CONFIG, tts_model_name=None, stub_config=stub.StubConfig(first_chunk_latency=0.0), **kwargs)
+
+
+def test_default_backends_are_real_ones_only():
+    assert [backend.llm for backend in RouterConfig().backends] == ["gemini"]
+
+
+def test_chat_history_is_kept_when_chat_fails_over():
+    interact = _router(max_error_rate=1.0)
+    primary, fallback = _backend(), _backend()
+    interact.registry.register("primary", primary)
+    interact.registry.register("fallback", fallback)
+    assert "".join(interact._ai_interactive_mode("first")) == "answer to first"
+    primary._fail = True
+    assert "".join(interact._ai_interactive_mode("second")) == "answer to second"
+    assert fallback.histories == [["first"]]  # the fallback backend saw the turn the primary answered
+    assert primary._chat_session is fallback._chat_session == ["first", "second"]
+
+
+def test_slow_backend_is_hedged():
+    interact = _router(hedge_after=0.1)
+    slow, fast = _backend(latency=0.5), _backend()
+    interact.registry.register("slow", slow)
+    interact.registry.register("fast", fast)
+    started_at = time.monotonic()
+    output = "".join(interact._ai_detect_object([{"mime_type": "image/jpeg", "data": b"frame"}]))
+    assert output.startswith("Object Detected: stub-object-")
+    assert time.monotonic() - started_at < 0.5
+    assert interact.router_summary()["fast"]["requests"] == 1
+    time.sleep(0.6)  # the abandoned slow attempt finishes as well
+    assert slow._chat_session is fast._chat_session == [f"detect: {output.splitlines()[0]}"]  # recorded once, by the winner
+
+
+def test_routed_chat_can_be_cancelled_before_it_is_sent():
+    interact = _router()
+    backend = _backend(latency=0.2)
+    interact.registry.register("only", backend)
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(RequestCancelled):
+        "".join(interact._ai_interactive_mode("never sent", token))
+    assert not backend.sent.is_set() and backend._chat_session == []
+
+
+def test_failing_backend_fails_over_then_is_benched():
+    interact = _router(max_error_rate=0.3, bench_time=60)
+    interact.registry.register("broken", _backend(fail=True))
+    interact.registry.register("healthy", _backend())
+    for _ in range(3):
+        assert "".join(interact._ai_detect_object([{"mime_type": "image/jpeg", "data": b"frame"}])).startswith("Object Detected")
+    summary = interact.router_summary()
+    assert summary["broken"]["benched_for"] > 0
+    assert summary["broken"]["requests"] < 3  # benched backends are tried last
@@ -0,0 +1,45 @@
+import numpy as np
+
+from ai_stream_interact.utils.scene_change import AutoDetectConfig, SceneChangeDetector
+
+CONFIG = AutoDetectConfig(dwell_time=1.0, poll_interval=0.1)
+
+
+def _flat(value: int) -> np.ndarray:
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def _feed(detector: SceneChangeDetector, frames, start: float = 0.0):
+    """Timestamps at which the detector fires, sampling each frame every poll interval."""
+    fired = []
+    for i, frame in enumerate(frames):
+        timestamp = start + i * CONFIG.poll_interval
+        if detector.update(frame, timestamp):
+            fired.append(round(timestamp, 1))
+    return fired
+
+
+def test_fires_once_a_new_scene_stays_still_for_the_dwell_time():
+    detector = SceneChangeDetector(CONFIG)
+    assert _feed(detector, [_flat(50)] * 20) == [1.0]  # the first sample starts the dwell timer
+    assert _feed(detector, [_flat(50)] * 20, start=2.0) == []  # same scene, no new detect
+
+
+def test_a_moving_scene_waits_until_it_settles():
+    detector = SceneChangeDetector(CONFIG)
+    _feed(detector, [_flat(50)] * 20)
+    moving = [_flat(100 + 20 * i) for i in range(5)]  # e.g. a hand moving in front of the camera
+    assert _feed(detector, moving + [_flat(200)] * 15, start=2.0) == [3.5]  # the timer restarts at 2.5s when it stops moving
+
+
+def test_small_changes_are_ignored():
+    detector = SceneChangeDetector(CONFIG)
+    _feed(detector, [_flat(50)] * 20)
+    assert _feed(detector, [_flat(58)] * 20, start=2.0) == []  # below the change threshold
+
+
+def test_reset_forgets_the_last_scene():
+    detector = SceneChangeDetector(CONFIG)
+    _feed(detector, [_flat(50)] * 20)
+    detector.reset()
+    assert _feed(detector, [_flat(50)] * 20, start=2.0) == [3.0]
@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+
+from ai_stream_interact.sources import SyntheticSource
+from ai_stream_interact.streamer import Streamer
+from ai_stream_interact.utils import shared_frames
+from ai_stream_interact.utils.shared_frames import FrameEncoderPool, SharedFrameRingBuffer, _release_refs
+
+
+def _filled_buffer(nframes: int = 8) -> SharedFrameRingBuffer:
+    buffer = SharedFrameRingBuffer(nframes, (48, 64, 3))
+    for i in range(nframes):
+        slot, view = buffer._reserve_slot()
+        view[...] = i * 20
+        buffer._commit_slot(slot, float(i))
+    return buffer
+
+
+def test_pinned_slots_are_never_overwritten():
+    buffer = _filled_buffer(4)
+    refs = buffer.get_spaced_refs(1, 1.0)
+    pinned = refs[0].frame.copy()
+    for _ in range(8):
+        slot, view = buffer._reserve_slot()
+        assert slot != refs[0].slot
+        view[...] = 255
+        buffer._commit_slot(slot)
+    assert np.array_equal(refs[0].frame, pinned)
+    _release_refs(refs)
+    buffer.close()
+
+
+def test_encoder_pool_encodes_refs_in_place():
+    buffer = _filled_buffer()
+    pool = FrameEncoderPool(2)
+    refs = buffer.get_spaced_refs(3, 1.0)
+    images, hashes = pool.encode(refs)
+    _release_refs(refs)
+    pool.shutdown(wait=True)
+    buffer.close()
+    assert [image["mime_type"] for image in images] == ["image/jpeg"] * 3
+    assert len({image["data"] for image in images}) == 3 and len(hashes) == 3
+
+
+def test_close_unlinks_and_unmaps():
+    buffer = _filled_buffer()
+    shm = buffer._shm
+    buffer.close()
+    assert shm._buf is None  # unmapped
+
+
+def test_close_keeps_the_mapping_while_frames_are_pinned():
+    buffer = _filled_buffer()
+    refs = buffer.get_spaced_refs(1, 1.0)
+    buffer.close()
+    assert buffer._shm._buf is not None
+    assert refs[0].frame.sum() > 0  # still readable, the mapping goes away with the process
+
+
+def test_worker_mappings_are_closed_on_exit():
+    buffer = _filled_buffer()
+    shared_frames._attach(buffer.spec)
+    (shm, _), = shared_frames._attached.values()
+    shared_frames._detach_all()
+    assert not shared_frames._attached
+    assert shm._buf is None
+    buffer.close()
+
+
+def test_capture_drops_frames_while_every_slot_is_pinned():
+    streamer = Streamer(SyntheticSource(64, 48, fps=30, speed=0), buffer_size=4, headless=True, shared_memory=True)
+    streamer.start_video_stream()
+    try:
+        refs, deadline = [], time.monotonic() + 2
+        while len({ref.slot for ref in refs}) < 4 and time.monotonic() < deadline:  # pin the latest frame until every slot is pinned
+            refs += streamer.get_spaced_refs(1, 1 / 30)
+        latest_frame_id = streamer.get_latest_frame().frame_id
+        time.sleep(0.2)
+        assert streamer._capture_thread.is_alive()
+        assert streamer.metrics()["dropped_frames"] > 0
+        assert streamer.get_latest_frame().frame_id == latest_frame_id
+        _release_refs(refs)
+        time.sleep(0.2)
+        assert streamer.get_latest_frame().frame_id > latest_frame_id  # capture resumes once slots are released
+    finally:
+        streamer.close()
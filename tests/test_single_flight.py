@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from ai_stream_interact.utils.rate_limiter import RequestCancelled
+from ai_stream_interact.utils.single_flight import SingleFlight, SingleFlightConfig
+
+
+class QueuedCall:
+    """Model call that waits for its turn (like the rate limiter) before it's sent & streams its answer."""
+
+    def __init__(self, answer: str) -> None:
+        self.answer = answer
+        self.waiting = threading.Event()
+        self.turn = threading.Event()
+        self.calls = 0
+
+    def __call__(self, cancel_token):
+        self.calls += 1
+        self.waiting.set()
+        self.turn.wait(2)
+        if not cancel_token.mark_sent():
+            raise RequestCancelled("Cancelled before it was sent")
+        yield from self.answer.split(" ")
+
+
+def _stream_on_thread(flights: SingleFlight, prompt: str, frame_hashes, call, supersede: bool = False):
+    """Streams on its own thread, the outcome (chunks or error) lands in the returned dict."""
+    outcome = {}
+
+    def run() -> None:
+        try:
+            outcome["chunks"] = list(flights.stream(prompt, frame_hashes, call, supersede))
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def test_concurrent_near_identical_requests_share_one_call():
+    flights = SingleFlight()
+    call = QueuedCall("a cup")
+    leader, first = _stream_on_thread(flights, "detect", [0b1111], call)
+    call.waiting.wait(2)
+    follower, second = _stream_on_thread(flights, "detect", [0b0111], call)  # 1 bit off
+    call.turn.set()
+    leader.join(2)
+    follower.join(2)
+    assert call.calls == 1
+    assert first["chunks"] == second["chunks"] == ["a", "cup"]
+
+
+def test_newer_detect_supersedes_an_unsent_older_one():
+    flights = SingleFlight(SingleFlightConfig(hamming_tolerance=0))
+    older, newer = QueuedCall("a cup"), QueuedCall("a plate")
+    old_thread, old = _stream_on_thread(flights, "detect", [1], older, supersede=True)
+    older.waiting.wait(2)
+    new_thread, new = _stream_on_thread(flights, "detect", [2], newer, supersede=True)
+    newer.waiting.wait(2)
+    older.turn.set()
+    newer.turn.set()
+    old_thread.join(2)
+    new_thread.join(2)
+    assert isinstance(old["error"], RequestCancelled)
+    assert new["chunks"] == ["a", "plate"]
+
+
+@pytest.mark.parametrize("config, supersede", [(SingleFlightConfig(hamming_tolerance=0), False), (SingleFlightConfig(hamming_tolerance=0, supersede=False), True)])
+def test_no_supersede_unless_asked_and_enabled(config, supersede):
+    flights = SingleFlight(config)
+    older, newer = QueuedCall("a cup"), QueuedCall("a plate")
+    old_thread, old = _stream_on_thread(flights, "detect", [1], older, supersede)
+    older.waiting.wait(2)
+    new_thread, new = _stream_on_thread(flights, "detect", [2], newer, supersede)
+    newer.waiting.wait(2)
+    older.turn.set()
+    newer.turn.set()
+    old_thread.join(2)
+    new_thread.join(2)
+    assert old["chunks"] == ["a", "cup"] and new["chunks"] == ["a", "plate"]
+
+
+def test_sent_request_is_not_superseded():
+    flights = SingleFlight(SingleFlightConfig(hamming_tolerance=0))
+    older, newer = QueuedCall("a cup"), QueuedCall("a plate")
+    older.turn.set()  # sent right away, then stalls mid stream until the newer request arrives
+    streaming, stall = threading.Event(), threading.Event()
+
+    def streaming_call(cancel_token):
+        stream = older(cancel_token)
+        chunk = next(stream)
+        streaming.set()
+        yield chunk
+        stall.wait(2)
+        yield from stream
+
+    old_thread, old = _stream_on_thread(flights, "detect", [1], streaming_call, supersede=True)
+    streaming.wait(2)
+    newer.turn.set()
+    new_thread, new = _stream_on_thread(flights, "detect", [2], newer, supersede=True)
+    new_thread.join(2)
+    stall.set()
+    old_thread.join(2)
+    assert old["chunks"] == ["a", "cup"] and new["chunks"] == ["a", "plate"]
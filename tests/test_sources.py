@@ -0,0 +1,30 @@
+import time
+
+import numpy as np
+
+from ai_stream_interact.sources import SyntheticSource, open_source
+from ai_stream_interact.streamer import Streamer
+
+
+def test_synthetic_frames_are_deterministic():
+    source = open_source("synthetic:64x48@30:5")
+    frames = [frame.copy() for _, frame in source]
+    assert len(frames) == 5 and source.exhausted
+    assert all(np.array_equal(frame, SyntheticSource(64, 48).frame_at(i)) for i, frame in enumerate(frames))
+
+
+def test_recorded_source_timestamps_follow_the_footage_whatever_the_speed():
+    source = SyntheticSource(64, 48, fps=30, nframes=10, speed=0)
+    timestamps = [timestamp for timestamp, _ in source]
+    assert np.allclose(np.diff(timestamps), 1 / 30)
+
+
+def test_playback_is_paced_from_capture_start_not_from_startup():
+    streamer = Streamer(SyntheticSource(64, 48, fps=30), headless=True)  # reads the first frame
+    time.sleep(1)  # e.g. the user going through the menus
+    streamer.start_video_stream()
+    time.sleep(0.5)
+    streamer.stop_video_stream()
+    captured = streamer._frames.latest_frame_id
+    streamer.close()
+    assert captured <= 0.5 * 30 + 3  # frames due during the menus aren't read back to back once capture starts
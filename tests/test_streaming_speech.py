@@ -0,0 +1,127 @@
+import time
+import queue
+import threading
+
+import numpy as np
+
+from ai_stream_interact.tts.streaming import SentenceSegmenter, StreamingSpeech
+
+
+SAMPLE_RATE = 1000
+
+
+class FakeSynthesizer:
+    """Stands in for a tts model: takes latency seconds per sentence & returns duration seconds of samples."""
+
+    def __init__(self, latency: float = 0.1, duration: float = 0.2) -> None:
+        self._latency = latency
+        self._duration = duration
+        self.sentences = []
+        self.started_at = []
+
+    def __call__(self, sentence: str) -> np.ndarray:
+        self.started_at.append(time.monotonic())
+        self.sentences.append(sentence)
+        time.sleep(self._latency)
+        return np.zeros(int(SAMPLE_RATE * self._duration), dtype=np.float32)
+
+
+class FakeSink:
+    """Stands in for an audio device: write blocks for as long as the samples take to play."""
+
+    sample_rate = SAMPLE_RATE
+
+    def __init__(self) -> None:
+        self.writes = []  # (started, finished) per write
+
+    def write(self, samples: np.ndarray) -> None:
+        started_at = time.monotonic()
+        time.sleep(len(samples) / self.sample_rate)
+        self.writes.append((started_at, time.monotonic()))
+
+
+def _segment(fragments, min_chars=20):
+    segmenter = SentenceSegmenter(min_chars)
+    sentences = [sentence for fragment in fragments for sentence in segmenter.feed(fragment)]
+    return sentences + list(segmenter.flush())
+
+
+def test_segmenter_joins_fragments_into_sentences():
+    fragments = ["The camera shows a red ", "mug on a desk. It has a ", "chipped handle! Confid", "ence is high"]
+    assert _segment(fragments) == ["The camera shows a red mug on a desk.", "It has a chipped handle!", "Confidence is high"]
+
+
+def test_segmenter_merges_short_sentences_and_splits_on_newlines():
+    assert _segment(["Hi. ", "This one is long enough.\nObject Detected: mug\n"]) == [
+        "Hi. This one is long enough.", "Object Detected: mug"
+    ]
+    assert _segment(["Hi.\n"], min_chars=0) == ["Hi."]
+
+
+def test_synthesis_overlaps_playback():
+    synthesize, sink = FakeSynthesizer(latency=0.1, duration=0.2), FakeSink()
+    speech = StreamingSpeech(synthesize, sink, min_sentence_chars=5)
+    started_at = time.monotonic()
+    speech.speak(["First sentence here. ", "Second sentence here. ", "Third sentence here."])
+    elapsed = time.monotonic() - started_at
+
+    assert synthesize.sentences == ["First sentence here.", "Second sentence here.", "Third sentence here."]
+    assert len(sink.writes) == 3
+    assert synthesize.started_at[1] < sink.writes[0][1]  # sentence 2 is synthesized while sentence 1 plays
+    assert elapsed < 3 * (0.1 + 0.2)  # sequential synthesis & playback would take 0.9s
+
+
+def test_time_to_first_audio_and_gap_metrics():
+    synthesize, sink = FakeSynthesizer(latency=0.1, duration=0.2), FakeSink()
+    speech = StreamingSpeech(synthesize, sink, min_sentence_chars=5)
+    speech.speak(["First sentence here. ", "Second sentence here. ", "Third sentence here."])
+
+    assert len(speech.metrics.time_to_first_audio) == 1
+    assert 0.1 <= speech.metrics.time_to_first_audio[0] < 0.2
+    assert len(speech.metrics.sentence_gaps) == 2
+    assert max(speech.metrics.sentence_gaps) < 0.05  # synthesis is faster than playback so there are no audible gaps
+    summary = speech.metrics.summary()
+    assert summary["time_to_first_audio_p50"] == speech.metrics.time_to_first_audio[0]
+
+
+def test_speak_from_queue_flushes_on_end_of_utterance():
+    synthesize, sink = FakeSynthesizer(latency=0.01, duration=0.01), FakeSink()
+    speech = StreamingSpeech(synthesize, sink, min_sentence_chars=5)
+    text_queue = queue.Queue()
+    threading.Thread(target=speech.speak_from_queue, args=(text_queue,), daemon=True).start()
+    for fragment in ["A sentence without", " an ending"]:
+        text_queue.put(fragment)
+    text_queue.put(None)
+    deadline = time.monotonic() + 2
+    while not sink.writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert synthesize.sentences == ["A sentence without an ending"]
+    assert len(sink.writes) == 1
+    assert len(speech.metrics.time_to_first_audio) == 1
+
+
+def test_slow_stream_is_not_flushed_mid_sentence():
+    synthesize, sink = FakeSynthesizer(latency=0.01, duration=0.01), FakeSink()
+    speech = StreamingSpeech(synthesize, sink, min_sentence_chars=5)
+    text_queue = queue.Queue()
+    threading.Thread(target=speech.speak_from_queue, args=(text_queue,), daemon=True).start()
+    text_queue.put("A sentence that")
+    time.sleep(1.2)  # the model stalls mid sentence
+    text_queue.put(" took a while.")
+    text_queue.put(None)
+    deadline = time.monotonic() + 2
+    while not sink.writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert synthesize.sentences == ["A sentence that took a while."]
+
+
+def test_speak_alongside_a_running_queue_and_returns_its_audio():
+    synthesize, sink = FakeSynthesizer(latency=0.01, duration=0.05), FakeSink()
+    speech = StreamingSpeech(synthesize, sink, min_sentence_chars=5)
+    threading.Thread(target=speech.speak_from_queue, args=(queue.Queue(),), daemon=True).start()
+    samples = speech.speak(["First sentence here. ", "Second sentence here."])
+
+    assert len(samples) == 2 and all(len(s) == int(SAMPLE_RATE * 0.05) for s in samples)
+    assert len(sink.writes) == 2